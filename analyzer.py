@@ -4,9 +4,14 @@ Analyseur de données ERPsim
 
 import pandas as pd
 from odata_client import ODataClient
+from valuation_tracker import ValuationTracker
+from market_intelligence import MarketIntelligence
+from product_index import ProductIndex
+from anomaly_detector import SalesAnomalyDetector
+from ledger_engine import GeneralLedgerEngine
 from config import settings
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +19,69 @@ logger = logging.getLogger(__name__)
 class ERPSimAnalyzer:
     """Analyseur de données ERPsim"""
 
-    def __init__(self):
-        self.client = ODataClient()
+    # Colonnes lues par méthode (cf. QueryPlanner.declare_needs) ; Market est lue en entier
+    DATA_NEEDS = {
+        'get_sales_summary': {'Sales': ['MATERIAL_NUMBER', 'MATERIAL_DESCRIPTION', 'QUANTITY', 'NET_VALUE', 'COST']},
+        'get_sales_by_area': {'Sales': ['AREA', 'QUANTITY', 'NET_VALUE', 'COST']},
+        'get_sales_by_dc': {'Sales': ['DISTRIBUTION_CHANNEL', 'QUANTITY', 'NET_VALUE', 'COST']},
+        'get_market_share_cube': {
+            'Market': None,
+            'Sales': ['MATERIAL_NUMBER', 'DISTRIBUTION_CHANNEL', 'AREA', 'SIM_ROUND', 'QUANTITY', 'NET_VALUE'],
+        },
+    }
+
+    def __init__(self, client=None, valuation_tracker: Optional[ValuationTracker] = None,
+                 market_intelligence: Optional[MarketIntelligence] = None,
+                 product_index: Optional[ProductIndex] = None,
+                 anomaly_detector: Optional[SalesAnomalyDetector] = None,
+                 ledger: Optional[GeneralLedgerEngine] = None):
+        """
+        Args:
+            client: Source des vues (défaut: ODataClient ; ex: GameSnapshot)
+            valuation_tracker: Suivi de valorisation à partager (défaut: nouveau)
+            market_intelligence: Séries concurrentielles à partager (défaut: nouveau)
+            product_index: Index produit à partager (défaut: nouveau, construit au besoin)
+            anomaly_detector: Détecteur d'anomalies de ventes à partager (défaut: nouveau)
+            ledger: Grand livre à partager (défaut: nouveau)
+        """
+        self.client = client or ODataClient()
         self.company_code = settings.COMPANY_CODE
         self.cache = {}
+        self.valuation_tracker = valuation_tracker or ValuationTracker(self.client)
+        self.market_intelligence = market_intelligence or MarketIntelligence(self.client)
+        self.product_index = product_index or ProductIndex()
+        self.anomaly_detector = anomaly_detector or SalesAnomalyDetector(self.client)
+        self.ledger = ledger or GeneralLedgerEngine(self.client)
+        self._step_key = None
+
+    def get_step_key(self) -> Optional[Tuple[int, int]]:
+        """
+        Retourne le step de jeu courant (SIM_ROUND, SIM_STEP)
+        Vide le cache interne dès que la simulation avance d'un step ; une
+        vue Company_Valuation remise à zéro signale une nouvelle partie
+        (tous les suivis incrémentaux repartent de zéro).
+        """
+        self.valuation_tracker.refresh()
+        if self.valuation_tracker.restarted:
+            logger.info(f"✓ Nouvelle partie détectée (ancien step {self._step_key})")
+            self.reset_trackers()
+            self.valuation_tracker.refresh()
+
+        step = self.valuation_tracker.current_step()
+
+        if step != self._step_key:
+            self.cache = {}
+            self._step_key = step
+
+        return step
+
+    def reset_trackers(self):
+        """Remet à zéro les suivis incrémentaux partagés et le cache (nouvelle partie)"""
+        for tracker in (self.valuation_tracker, self.ledger, self.market_intelligence,
+                        self.anomaly_detector, self.product_index):
+            tracker.reset()
+        self.cache = {}
+        self._step_key = None
 
     def get_company_valuation(self) -> pd.DataFrame:
         """Récupère la valorisation de l'entreprise"""
@@ -213,96 +277,92 @@ class ERPSimAnalyzer:
         """Récupère les données de marché"""
         return self.client.fetch_view("Market", top=10000)
 
+    def get_product_index(self) -> ProductIndex:
+        """Index produit (numéro <-> description), complété au plus une fois par step"""
+        if 'product_index' not in self.cache:
+            self.product_index.build(self.client)
+            self.cache['product_index'] = True
+        return self.product_index
+
+    def get_market_intelligence(self) -> MarketIntelligence:
+        """Séries concurrentielles, complétées au plus une fois par step"""
+        if 'market_intelligence' not in self.cache:
+            self.market_intelligence.refresh()
+            self.cache['market_intelligence'] = True
+        return self.market_intelligence
+
+    def get_anomaly_detector(self) -> SalesAnomalyDetector:
+        """Détecteur d'anomalies de ventes, alimenté au plus une fois par step"""
+        if 'anomaly_detector' not in self.cache:
+            self.anomaly_detector.refresh()
+            self.cache['anomaly_detector'] = True
+        return self.anomaly_detector
+
+    def get_sales_anomalies(self, steps: int = 3) -> pd.DataFrame:
+        """Anomalies de ventes (chutes, pics, dérives) des derniers steps"""
+        return self.get_anomaly_detector().recent(steps)
+
+    def get_ledger(self) -> GeneralLedgerEngine:
+        """Grand livre (Financial_Postings), complété au plus une fois par step"""
+        if 'ledger' not in self.cache:
+            self.ledger.refresh()
+            self.cache['ledger'] = True
+        return self.ledger
+
+    def get_income_statement(self, period: str = 'round') -> pd.DataFrame:
+        """Compte de résultat au dernier step comptabilisé ('step', 'round' ou 'game')"""
+        ledger = self.get_ledger()
+        step = ledger.latest_step()
+        if step is None:
+            return pd.DataFrame(columns=['GL_ACCOUNT', 'GL_ACCOUNT_NAME', 'AMOUNT'])
+        return ledger.income_statement(*step, period=period)
+
+    def get_balance_sheet(self) -> pd.DataFrame:
+        """Bilan au dernier step comptabilisé"""
+        ledger = self.get_ledger()
+        step = ledger.latest_step()
+        if step is None:
+            return pd.DataFrame(columns=['GL_ACCOUNT', 'GL_ACCOUNT_NAME', 'AMOUNT'])
+        return ledger.balance_sheet(*step)
+
+    def get_market_share_cube(self) -> pd.DataFrame:
+        """Cube produit x canal x zone x période (marché / nous), une passe par step"""
+        if 'market_share_cube' not in self.cache:
+            from market_analysis import build_share_cube
+            self.cache['market_share_cube'] = build_share_cube(
+                self.get_market_data(),
+                self.client.fetch_view("Sales", top=10000),
+                self.get_product_index()
+            )
+        return self.cache['market_share_cube']
+
+    def get_market_share(self, by: Sequence[str] = ('MATERIAL_NUMBER',)) -> pd.DataFrame:
+        """
+        Parts de marché et quadrants à la granularité demandée
+
+        Args:
+            by: Combinaison de MATERIAL_NUMBER, DISTRIBUTION_CHANNEL, AREA, PERIOD
+        """
+        from market_analysis import describe_products, share_analysis
+        return describe_products(share_analysis(self.get_market_share_cube(), by), self.product_index)
+
+    def get_market_share_matrix(self) -> Dict[Tuple[str, ...], pd.DataFrame]:
+        """Toutes les granularités à partir du même cube (matrice du dashboard)"""
+        from market_analysis import describe_products, share_matrix
+        return {by: describe_products(df, self.product_index)
+                for by, df in share_matrix(self.get_market_share_cube()).items()}
+
     def get_market_analysis(self) -> pd.DataFrame:
         """
         Compare les ventes de l'entreprise avec le marché (Zmarket).
         Calcule la part de marché et identifie les produits gagnants.
         """
-        # 1. Récupérer les données
-        market_df = self.get_market_data()
-        company_sales = self.get_sales_summary()
-        
-        if market_df.empty:
+        analysis = self.get_market_share(['MATERIAL_NUMBER'])
+        if analysis.empty:
             return pd.DataFrame()
-            
-        # 2. Nettoyer Market Data
-        # On suppose que Market contient tout le marché (concurrents + nous)
-        # Colonnes attendues: MATERIAL_NUMBER, NET_VALUE (ou PRICE * QUANTITY)
-        
-        if 'NET_VALUE' in market_df.columns:
-            market_df['NET_VALUE'] = pd.to_numeric(market_df['NET_VALUE'], errors='coerce')
-        elif 'PRICE' in market_df.columns and 'QUANTITY' in market_df.columns:
-            market_df['NET_VALUE'] = pd.to_numeric(market_df['PRICE'], errors='coerce') * pd.to_numeric(market_df['QUANTITY'], errors='coerce')
-        
-        # Validation des colonnes (Nettoyage des noms)
-        try:
-            # Force les noms de colonnes en string et nettoie
-            market_df.columns = [str(c).strip() for c in market_df.columns]
-            
-            logger.info(f"Market Columns cleaned: {market_df.columns.tolist()}")
-            
-            if 'MATERIAL_NUMBER' not in market_df.columns:
-                logger.warning(f"MATERIAL_NUMBER manquant. Colonnes dispos: {market_df.columns.tolist()}")
-                return pd.DataFrame()
-            
-            if 'NET_VALUE' not in market_df.columns:
-                 # Tentative de récupération alternative
-                 if 'PRICE' in market_df.columns and 'QUANTITY' in market_df.columns:
-                     market_df['NET_VALUE'] = pd.to_numeric(market_df['PRICE'], errors='coerce') * pd.to_numeric(market_df['QUANTITY'], errors='coerce')
-                 else:
-                    logger.warning(f"NET_VALUE manquant. Colonnes dispos: {market_df.columns.tolist()}")
-                    return pd.DataFrame()
-
-            # Agrégation Marché par produit
-            market_summary = market_df.groupby('MATERIAL_NUMBER')['NET_VALUE'].sum().reset_index()
-            market_summary.rename(columns={'NET_VALUE': 'MARKET_VALUE'}, inplace=True)
-            
-        except Exception as e:
-            logger.error(f"Erreur critique dans get_market_analysis: {e}")
-            return pd.DataFrame()
-        
-        # 3. Fusionner avec nos ventes
-        # On utilise company_sales qui est déjà agrégé par produit
-        if company_sales.empty:
-             analysis = market_summary.copy()
-             analysis['MY_VALUE'] = 0
-             analysis['MARKET_SHARE'] = 0
-        else:
-            analysis = pd.merge(market_summary, 
-                                company_sales[['MATERIAL_NUMBER', 'MATERIAL_DESCRIPTION', 'NET_VALUE']], 
-                                on='MATERIAL_NUMBER', 
-                                how='left')
-            analysis.rename(columns={'NET_VALUE': 'MY_VALUE'}, inplace=True)
-            analysis['MY_VALUE'] = analysis['MY_VALUE'].fillna(0)
-            
-        # 4. Calculs KPIs
-        # Part de marché
-        analysis['MARKET_SHARE'] = (analysis['MY_VALUE'] / analysis['MARKET_VALUE'] * 100).fillna(0).round(1)
-        
-        # Classification
-        # Star: Gros marché + Grosse part
-        # Opportunity: Gros marché + Petite part
-        # Niche: Petit marché + Grosse part
-        # Dog: Petit marché + Petite part
-        
-        median_market = analysis['MARKET_VALUE'].median()
-        median_share = analysis['MARKET_SHARE'].median()
-        
-        def classify(row):
-            if row['MARKET_VALUE'] >= median_market:
-                if row['MARKET_SHARE'] >= median_share:
-                    return "⭐ Star"
-                else:
-                    return "🎯 Opportunité"
-            else:
-                if row['MARKET_SHARE'] >= median_share:
-                    return "🛡️ Niche"
-                else:
-                    return "💤 Faible"
-                    
-        analysis['STATUS'] = analysis.apply(classify, axis=1)
-        
-        return analysis.sort_values('MARKET_VALUE', ascending=False)
+
+        columns = ['MATERIAL_NUMBER', 'MARKET_VALUE', 'MATERIAL_DESCRIPTION', 'MY_VALUE', 'MARKET_SHARE', 'STATUS']
+        return analysis[columns].sort_values('MARKET_VALUE', ascending=False)
 
     def get_production_orders(self) -> pd.DataFrame:
         """Récupère les ordres de production"""
@@ -334,20 +394,16 @@ class ERPSimAnalyzer:
         print("="*70 + "\n")
 
         # Valorisation
-        valuation_df = self.get_company_valuation()
-        if not valuation_df.empty:
-            last_val = valuation_df.iloc[-1]
+        self.valuation_tracker.refresh()
+        last_val = self.valuation_tracker.latest()
+        if last_val:
             print("💰 VALORISATION ENTREPRISE")
-            if 'COMPANY_VALUATION' in last_val:
-                print(f"   Company Valuation: €{float(last_val.get('COMPANY_VALUATION', 0)):,.2f}")
+            print(f"   Company Valuation: €{last_val['COMPANY_VALUATION']:,.2f}")
             if 'CREDIT_RATING' in last_val:
-                print(f"   Credit Rating: {last_val.get('CREDIT_RATING', 'N/A')}")
-            if 'PROFIT' in last_val:
-                print(f"   Profit Total: €{float(last_val.get('PROFIT', 0)):,.2f}")
-            if 'BANK_CASH_ACCOUNT' in last_val:
-                print(f"   Cash: €{float(last_val.get('BANK_CASH_ACCOUNT', 0)):,.2f}")
-            if 'BANK_LOAN' in last_val:
-                print(f"   Loan: €{float(last_val.get('BANK_LOAN', 0)):,.2f}")
+                print(f"   Credit Rating: {last_val['CREDIT_RATING']}")
+            print(f"   Profit Total: €{last_val['PROFIT']:,.2f}")
+            print(f"   Cash: €{last_val['BANK_CASH_ACCOUNT']:,.2f}")
+            print(f"   Loan: €{last_val['BANK_LOAN']:,.2f}")
         else:
             print("⚠ Aucune donnée de valorisation disponible")
 
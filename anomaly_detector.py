@@ -0,0 +1,327 @@
+"""
+Détection d'anomalies de ventes au fil de l'eau (vue Sales)
+
+Pour chaque segment produit x canal x zone, la quantité vendue par step
+est suivie par une moyenne et une variance glissantes (exponentielles,
+mises à jour en O(1)) ; chaque nouveau step est comparé à ce profil :
+
+- z-score : écart brutal (rupture de stock, pic de commandes)
+- CUSUM : dérive durable plus faible (concurrent qui nous sous-cote)
+
+Les ventes arrivent par commandes : la variance d'un segment est bien
+supérieure à sa moyenne et un step à 0 ou à quelques commandes de plus
+n'a rien d'exceptionnel. Le z-score n'est donc pas (x - moyenne) / écart-type
+mais la probabilité de queue d'une loi de Poisson sur le nombre de
+commandes équivalent (quantité / dispersion, dispersion = variance / moyenne),
+ramenée à l'échelle normale.
+
+Comme ValuationTracker, seules les nouvelles lignes sont téléchargées
+(`iter_pages` à partir des lignes déjà lues) : le coût d'un step dépend
+des lignes ajoutées et du nombre de segments, pas de l'historique.
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Callable, List, Optional
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DROP, SPIKE, SHIFT_DOWN, SHIFT_UP = 'DROP', 'SPIKE', 'SHIFT_DOWN', 'SHIFT_UP'
+
+KIND_LABELS = {
+    DROP: "chute brutale",
+    SPIKE: "pic",
+    SHIFT_DOWN: "baisse durable",
+    SHIFT_UP: "hausse durable",
+}
+
+# Clé de tri des steps : SIM_ROUND * STEP_BASE + SIM_STEP
+STEP_BASE = 100_000
+
+# |z| maximal (probabilité de queue nulle en flottants)
+MAX_ZSCORE = 20.0
+
+
+class SalesAnomalyDetector:
+    """
+    Profil glissant (moyenne, variance, CUSUM) de la quantité vendue par
+    segment et par step, et journal des alertes levées.
+
+    Un step n'est évalué qu'une fois clos, c'est-à-dire quand des lignes du
+    step suivant arrivent (ou sur `flush`) : un step en cours de
+    remplissage ne déclenche pas de fausse chute. Un segment déjà vu qui ne
+    vend rien sur un step compte pour 0.
+    """
+
+    SEGMENT = ['MATERIAL_NUMBER', 'DISTRIBUTION_CHANNEL', 'AREA']
+    STEP_COLS = ['SIM_ROUND', 'SIM_STEP']
+    STATE = ['MEAN', 'VAR', 'COUNT', 'CUSUM_LOW', 'CUSUM_HIGH', 'LAST_QUANTITY']
+    ALERT_COLUMNS = STEP_COLS + SEGMENT + ['KIND', 'QUANTITY', 'EXPECTED', 'STD', 'ZSCORE']
+
+    def __init__(self, client, window: int = 20, z_threshold: float = 4.0,
+                 cusum_k: float = 0.5, cusum_h: float = 6.0, min_steps: int = 10,
+                 min_std: float = 1.0, min_volume: float = 5.0, page_size: int = 5000):
+        """
+        Args:
+            client: Source des vues
+            window: Fenêtre équivalente de la moyenne glissante, en steps (défaut: un round ;
+                alpha = 2 / (window + 1))
+            z_threshold: |z| à partir duquel un step est signalé
+            cusum_k: Tolérance du CUSUM (en écarts-types)
+            cusum_h: Seuil d'alerte du CUSUM (en écarts-types cumulés)
+            min_steps: Steps observés avant de noter un segment
+            min_std: Écart-type plancher (quantités) ; la dispersion ne descend de toute façon
+                pas sous celle d'une loi de Poisson
+            min_volume: Quantité moyenne par step en dessous de laquelle un segment n'est pas noté
+                (commandes isolées)
+            page_size: Taille des pages lues
+        """
+        self.client = client
+        self.alpha = 2.0 / (window + 1)
+        self.z_threshold = z_threshold
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.min_steps = min_steps
+        self.min_std = min_std
+        self.min_volume = min_volume
+        self.page_size = page_size
+        self._listeners: List[Callable[[pd.DataFrame], None]] = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Oublie le profil et les alertes (nouvelle partie)"""
+        with self._lock:
+            self.state = pd.DataFrame(columns=self.STATE,
+                                      index=pd.MultiIndex.from_arrays([[]] * len(self.SEGMENT), names=self.SEGMENT),
+                                      dtype=float)
+            self.alerts = pd.DataFrame(columns=self.ALERT_COLUMNS)
+            self._rows_seen = 0
+            self._pending = pd.DataFrame(columns=['STEP'] + self.SEGMENT + ['QUANTITY'])
+            self._last_closed = -1
+            self.steps_seen = 0
+
+    def on_alert(self, callback: Callable[[pd.DataFrame], None]):
+        """Enregistre un callback appelé avec les alertes de chaque rafraîchissement"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def refresh(self) -> int:
+        """
+        Télécharge les lignes ajoutées depuis le dernier appel et évalue les steps clos
+
+        Returns:
+            Nombre de nouvelles lignes lues
+        """
+        with self._lock:
+            pages = []
+
+            for page in self.client.iter_pages("Sales", page_size=self.page_size, start=self._rows_seen):
+                self._rows_seen += len(page)
+                pages.append(page)
+
+            if not pages:
+                return 0
+
+            batch = self._compact(pd.concat(pages, ignore_index=True))
+            if not self._pending.empty:
+                batch = (pd.concat([self._pending, batch], ignore_index=True)
+                         .groupby(['STEP'] + self.SEGMENT, as_index=False, sort=False)['QUANTITY'].sum())
+
+            # Le dernier step reçu peut encore se remplir : il attend le suivant
+            last = batch['STEP'].max()
+            self._pending = batch[batch['STEP'].to_numpy() == last]
+            new_alerts = self._evaluate(batch[batch['STEP'].to_numpy() < last])
+
+        self._notify(new_alerts)
+        return sum(len(p) for p in pages)
+
+    def flush(self) -> int:
+        """
+        Évalue le step en attente sans attendre le suivant (fin de partie, rejeu)
+
+        Returns:
+            Nombre d'alertes levées
+        """
+        with self._lock:
+            pending, self._pending = self._pending, self._pending.iloc[0:0]
+            new_alerts = self._evaluate(pending)
+
+        self._notify(new_alerts)
+        return len(new_alerts)
+
+    def _compact(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Quantité par step et segment"""
+        compact = pd.DataFrame(index=df.index)
+        steps = [pd.to_numeric(df[col], errors='coerce').fillna(0).astype(np.int64).to_numpy()
+                 if col in df.columns else np.zeros(len(df), dtype=np.int64) for col in self.STEP_COLS]
+        compact['STEP'] = steps[0] * STEP_BASE + steps[1]
+        for col in self.SEGMENT:
+            compact[col] = df[col].astype(str) if col in df.columns else ''
+        compact['QUANTITY'] = pd.to_numeric(df['QUANTITY'], errors='coerce').fillna(0) \
+            if 'QUANTITY' in df.columns else 0.0
+
+        # Lignes tardives d'un step déjà évalué : la vue est en ajout seul, on les ignore
+        compact = compact[compact['STEP'].to_numpy() > self._last_closed]
+        return compact.groupby(['STEP'] + self.SEGMENT, as_index=False, sort=False)['QUANTITY'].sum()
+
+    def _evaluate(self, closed: pd.DataFrame) -> pd.DataFrame:
+        """Note puis intègre les steps clos, dans l'ordre (vectorisé sur les segments)"""
+        if closed.empty:
+            return self.alerts.iloc[0:0]
+
+        segments = pd.MultiIndex.from_frame(closed[self.SEGMENT])
+        unknown = segments.unique().difference(self.state.index)
+        if len(unknown):
+            added = pd.DataFrame(0.0, index=unknown, columns=self.STATE)
+            self.state = added if self.state.empty else pd.concat([self.state, added])
+
+        # Matrice steps x segments des quantités (0 si le segment n'a rien vendu)
+        step_codes, step_keys = pd.factorize(closed['STEP'].to_numpy(), sort=True)
+        positions = self.state.index.get_indexer(segments)
+        quantities = np.zeros((len(step_keys), len(self.state)))
+        np.add.at(quantities, (step_codes, positions), closed['QUANTITY'].to_numpy(dtype=float))
+
+        mean, var, count, low, high, last_qty = (self.state[col].to_numpy(dtype=float).copy() for col in self.STATE)
+        alpha, k, h = self.alpha, self.cusum_k, self.cusum_h
+        found = []
+
+        for step_key, x in zip(step_keys, quantities):
+            active = (count > 0) | (x > 0)
+            # La variance part de 0 : correction du biais des premiers steps
+            unbiased = var / np.maximum(1.0 - (1.0 - alpha) ** np.maximum(count - 1, 1), alpha)
+            # Taille de commande équivalente (variance / moyenne, au moins 1 = Poisson)
+            std = np.sqrt(np.maximum(np.maximum(unbiased, self.min_std ** 2), mean))
+            dispersion = np.divide(std * std, mean, out=np.ones_like(mean), where=mean > 0)
+            scored = active & (count >= self.min_steps) & (mean >= self.min_volume)
+            z = np.where(scored, self._tail_zscore(x / dispersion, mean / dispersion), 0.0)
+
+            low = np.where(active, np.maximum(0.0, low - z - k), low)
+            high = np.where(active, np.maximum(0.0, high + z - k), high)
+
+            kind = np.select(
+                [scored & (z <= -self.z_threshold), scored & (z >= self.z_threshold),
+                 scored & (low > h), scored & (high > h)],
+                [DROP, SPIKE, SHIFT_DOWN, SHIFT_UP], default=''
+            )
+            flagged = np.flatnonzero(kind != '')
+            if len(flagged):
+                found.append(pd.DataFrame({
+                    'STEP': step_key, 'POSITION': flagged, 'KIND': kind[flagged],
+                    'QUANTITY': x[flagged], 'EXPECTED': mean[flagged], 'STD': std[flagged], 'ZSCORE': z[flagged],
+                }))
+                # Un segment signalé repart d'un CUSUM nul
+                low[flagged] = 0.0
+                high[flagged] = 0.0
+
+            # Moyenne / variance exponentielles (le premier step initialise le profil)
+            first = active & (count == 0)
+            diff = x - mean
+            step_mean = mean + alpha * diff
+            step_var = (1 - alpha) * (var + alpha * diff * diff)
+            mean = np.where(first, x, np.where(active, step_mean, mean))
+            var = np.where(first, 0.0, np.where(active, step_var, var))
+            count = count + active
+            last_qty = np.where(active, x, last_qty)
+
+        self.state = pd.DataFrame({'MEAN': mean, 'VAR': var, 'COUNT': count, 'CUSUM_LOW': low,
+                                   'CUSUM_HIGH': high, 'LAST_QUANTITY': last_qty}, index=self.state.index)
+        self._last_closed = int(step_keys[-1])
+        self.steps_seen += len(step_keys)
+
+        if not found:
+            return self.alerts.iloc[0:0]
+
+        raw = pd.concat(found, ignore_index=True)
+        keys = self.state.index[raw['POSITION'].to_numpy()]
+        new_alerts = pd.DataFrame({
+            'SIM_ROUND': raw['STEP'].to_numpy() // STEP_BASE,
+            'SIM_STEP': raw['STEP'].to_numpy() % STEP_BASE,
+            **{col: keys.get_level_values(col) for col in self.SEGMENT},
+            'KIND': raw['KIND'].to_numpy(),
+            'QUANTITY': raw['QUANTITY'].to_numpy(),
+            'EXPECTED': raw['EXPECTED'].round(1).to_numpy(),
+            'STD': raw['STD'].round(1).to_numpy(),
+            'ZSCORE': raw['ZSCORE'].round(2).to_numpy(),
+        })
+        self.alerts = new_alerts if self.alerts.empty else pd.concat([self.alerts, new_alerts], ignore_index=True)
+        return new_alerts
+
+    @staticmethod
+    def _tail_zscore(orders: np.ndarray, expected: np.ndarray) -> np.ndarray:
+        """
+        z-score équivalent de la probabilité de queue d'une loi de Poisson
+
+        Args:
+            orders: Nombre de commandes observé (non entier)
+            expected: Nombre de commandes attendu
+
+        Returns:
+            z < 0 si le step est en dessous de l'attendu, > 0 au-dessus, 0 au centre
+        """
+        # Import tardif : scipy double le temps de `import analyzer` (dashboard, CLI)
+        from scipy import stats
+
+        below = stats.norm.ppf(stats.poisson.cdf(np.floor(orders), expected))
+        above = stats.norm.isf(stats.poisson.sf(np.ceil(orders) - 1, expected))
+        z = np.where(orders < expected, np.minimum(below, 0.0), np.maximum(above, 0.0))
+        return np.clip(np.nan_to_num(z), -MAX_ZSCORE, MAX_ZSCORE)
+
+    def _notify(self, new_alerts: pd.DataFrame, max_logged: int = 10):
+        """Journalise les nouvelles alertes et les pousse aux callbacks"""
+        if new_alerts.empty:
+            return
+
+        # Les baisses sont journalisées en avertissement, les hausses pour information
+        for row in new_alerts.head(max_logged).itertuples(index=False):
+            log = logger.warning if row.KIND in (DROP, SHIFT_DOWN) else logger.info
+            log(
+                f"⚠ Ventes {KIND_LABELS[row.KIND]}: {row.MATERIAL_NUMBER} {row.DISTRIBUTION_CHANNEL}/{row.AREA} "
+                f"au step {row.SIM_ROUND}-{row.SIM_STEP} : {row.QUANTITY:.0f} u. "
+                f"(attendu {row.EXPECTED:.0f} ± {row.STD:.0f}, z={row.ZSCORE:+.1f})"
+            )
+        if len(new_alerts) > max_logged:
+            logger.info(f"... et {len(new_alerts) - max_logged} autres anomalies de ventes")
+
+        for callback in self._listeners:
+            try:
+                callback(new_alerts)
+            except Exception as e:
+                logger.error(f"✗ Callback d'alerte en échec: {e}")
+
+    def recent(self, steps: int = 3, kinds: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Alertes des derniers steps évalués
+
+        Args:
+            steps: Nombre de steps remontés
+            kinds: Filtre sur les types (DROP, SPIKE, SHIFT_DOWN, SHIFT_UP)
+
+        Returns:
+            DataFrame ALERT_COLUMNS, les plus récentes d'abord
+        """
+        if self.alerts.empty:
+            return self.alerts
+
+        keys = self.alerts['SIM_ROUND'].to_numpy() * STEP_BASE + self.alerts['SIM_STEP'].to_numpy()
+        last_steps = np.unique(keys)[-steps:]
+        mask = np.isin(keys, last_steps)
+        if kinds:
+            mask &= self.alerts['KIND'].isin(kinds).to_numpy()
+        return (self.alerts[mask]
+                .sort_values(self.STEP_COLS + ['ZSCORE'], ascending=[False, False, True], kind='stable')
+                .reset_index(drop=True))
+
+    def baseline(self) -> pd.DataFrame:
+        """Profil courant par segment : moyenne, écart-type, steps observés, CUSUM"""
+        if self.state.empty:
+            return pd.DataFrame(columns=self.SEGMENT + ['MEAN', 'STD', 'COUNT', 'CUSUM_LOW', 'CUSUM_HIGH',
+                                                        'LAST_QUANTITY'])
+
+        profile = self.state.copy()
+        profile['STD'] = np.sqrt(profile.pop('VAR'))
+        profile['COUNT'] = profile['COUNT'].astype(int)
+        return profile.reset_index()[self.SEGMENT + ['MEAN', 'STD', 'COUNT', 'CUSUM_LOW', 'CUSUM_HIGH',
+                                                     'LAST_QUANTITY']]
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Backtest des règles de prix ZMARKET sur l'historique d'une partie
+
+L'historique (partie enregistrée, cf. replay.py, ou partie synthétique) est
+rejoué step par step : à chaque step, les règles de `decide_price_action`
+fixent nos prix à partir de l'état simulé du step précédent (prix marché,
+ventes du round, stock), puis un modèle de réponse de la demande recalcule
+les ventes :
+
+    quantité = quantité enregistrée x (prix simulé / prix enregistré) ^ élasticité
+
+avec l'élasticité du canal (CHANNEL_ELASTICITIES), plafonnée par le stock
+simulé (mêmes entrées de production que la partie réelle). Les prix partent
+de ceux du premier step et ne changent que par les règles (les changements
+faits pendant la partie sont ignorés). Un produit sans vente enregistrée
+sur un step reste sans vente : le modèle ne crée pas de demande.
+
+Le balayage des seuils tourne sur un pool de processus et classe les
+configurations par profit simulé puis valorisation (valorisation finale
+enregistrée + écart de profit, le stock étant valorisé au coût).
+
+    python backtester.py --replay parties/h2_finale --workers 8 -o sweep.csv
+    python backtester.py --synthetic --steps 60 --top 20
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from product_index import ProductIndex
+from sales_engine import CHANNEL_ELASTICITIES, PRICING_RULES, decide_price_action
+
+logger = logging.getLogger(__name__)
+
+# Seuils balayés par défaut (les autres règles gardent leur valeur PRICING_RULES)
+DEFAULT_GRID = {
+    'HIGH_VELOCITY': [25, 50, 100, 200],
+    'LOW_VELOCITY': [5, 10, 20],
+    'HIGH_STOCK': [250, 500, 1000],
+    'BAND_PCT': [0.5, 1.0, 2.0],
+}
+
+
+def _numeric(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    df = df.copy()
+    for col in columns:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+
+class GameHistory:
+    """
+    Historique réduit à ce que consomment les règles de prix
+
+    Tableaux [step, clé] pour chaque couple (produit, canal) ayant un prix,
+    [step, produit] pour le stock.
+    """
+
+    def __init__(self, steps: List[Tuple[int, int]], keys: List[Tuple[str, str]], materials: List[str],
+                 quantity: np.ndarray, revenue: np.ndarray, cost: np.ndarray, price: np.ndarray,
+                 market: np.ndarray, stock: np.ndarray, valuation: np.ndarray):
+        self.steps = steps
+        self.keys = keys
+        self.materials = materials
+        self.key_material = np.array([materials.index(m) for m, _ in keys], dtype=np.int64)
+        self.elasticity = np.array([CHANNEL_ELASTICITIES.get(dc, -2.5) for _, dc in keys])
+        self.rounds = np.array([r for r, _ in steps], dtype=np.int64)
+        self.quantity = quantity
+        self.revenue = revenue
+        self.cost = cost
+        self.price = price
+        self.market = market
+        self.stock = stock
+        self.valuation = valuation
+
+        # Coût unitaire : dernier coût observé pour la clé (0 avant la première vente)
+        unit = pd.DataFrame(np.where(quantity > 0, cost / np.where(quantity > 0, quantity, 1), np.nan))
+        self.unit_cost = unit.ffill().fillna(0).to_numpy()
+
+    @classmethod
+    def from_steps(cls, steps: Iterable[Tuple[Tuple[int, int], Callable[[str], pd.DataFrame]]]) -> 'GameHistory':
+        """
+        Construit l'historique à partir des vues de chaque step
+
+        Args:
+            steps: (step, fonction vue -> DataFrame) dans l'ordre de la partie ;
+                   Sales et Market sont cumulatives, seules leurs nouvelles
+                   lignes sont lues à chaque step
+        """
+        seen = {'Sales': 0, 'Market': 0}
+        period_prices: Dict[Tuple[str, str], List[float]] = {}
+        last_period = -1
+        index = ProductIndex()
+        step_keys, rows = [], []
+
+        for step, view in steps:
+            pricing = _numeric(view('Current_Pricing_Conditions'), ['PRICE'])
+            prices = {}
+            if not pricing.empty:
+                prices = {(m, dc): p for m, dc, p in pricing[['MATERIAL_NUMBER', 'DISTRIBUTION_CHANNEL', 'PRICE']]
+                          .itertuples(index=False)}
+                index.extend(pricing)
+
+            sales = view('Sales')
+            new_sales = _numeric(sales.iloc[seen['Sales']:], ['QUANTITY', 'NET_VALUE', 'COST'])
+            seen['Sales'] = len(sales)
+            sold = {}
+            if not new_sales.empty:
+                grouped = new_sales.groupby(['MATERIAL_NUMBER', 'DISTRIBUTION_CHANNEL'])[['QUANTITY', 'NET_VALUE', 'COST']].sum()
+                sold = {key: tuple(values) for key, values in zip(grouped.index, grouped.to_numpy())}
+
+            # Prix marché : moyenne de la dernière période, comme get_market_price_benchmarks
+            market = view('Market')
+            new_market = _numeric(market.iloc[seen['Market']:], ['AVERAGE_PRICE', 'SIMULATION_PERIOD'])
+            seen['Market'] = len(market)
+            if not new_market.empty and 'SALES_ORGANIZATION' in new_market.columns:
+                new_market = new_market[new_market['SALES_ORGANIZATION'] == 'Market']
+            if not new_market.empty:
+                period = int(new_market['SIMULATION_PERIOD'].max())
+                if period > last_period:
+                    period_prices, last_period = {}, period
+                latest = new_market[new_market['SIMULATION_PERIOD'] == last_period]
+                for desc, dc, avg in latest[['MATERIAL_DESCRIPTION', 'DISTRIBUTION_CHANNEL', 'AVERAGE_PRICE']].itertuples(index=False):
+                    period_prices.setdefault((desc, dc), []).append(avg)
+            segments = list(period_prices)
+            numbers = index.lookup([desc for desc, _ in segments]) if segments else []
+            benchmarks = {(material, dc): float(np.mean(period_prices[(desc, dc)]))
+                          for material, (desc, dc) in zip(numbers, segments)
+                          if material is not None and np.mean(period_prices[(desc, dc)]) > 0}
+
+            inventory = _numeric(view('Current_Inventory'), ['STOCK'])
+            stock = inventory.groupby('MATERIAL_NUMBER')['STOCK'].sum().to_dict() if not inventory.empty else {}
+
+            valuation = _numeric(view('Company_Valuation'), ['COMPANY_VALUATION'])
+            value = float(valuation['COMPANY_VALUATION'].iloc[-1]) if not valuation.empty else 0.0
+
+            step_keys.append(step)
+            rows.append((prices, sold, benchmarks, stock, value))
+
+        keys = sorted({key for prices, *_ in rows for key in prices})
+        materials = sorted({m for m, _ in keys})
+        shape = (len(rows), len(keys))
+        quantity, revenue, cost, price, market = (np.zeros(shape) for _ in range(5))
+        stock = np.zeros((len(rows), len(materials)))
+        valuation = np.zeros(len(rows))
+
+        for t, (prices, sold, benchmarks, stocks, value) in enumerate(rows):
+            for k, key in enumerate(keys):
+                quantity[t, k], revenue[t, k], cost[t, k] = sold.get(key, (0.0, 0.0, 0.0))
+                price[t, k] = prices.get(key, price[t - 1, k] if t else 0.0)
+                market[t, k] = benchmarks.get(key, 0.0)
+            stock[t] = [stocks.get(m, 0.0) for m in materials]
+            valuation[t] = value
+
+        return cls(step_keys, keys, materials, quantity, revenue, cost, price, market, stock, valuation)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def recorded_profit(self) -> float:
+        return float(self.revenue.sum() - self.cost.sum())
+
+
+def history_from_recording(directory: str) -> GameHistory:
+    """Historique d'une partie enregistrée avec replay.py"""
+    from replay import Recording
+
+    recording = Recording(directory)
+    return GameHistory.from_steps(
+        ((s['sim_round'], s['sim_step']), lambda view, i=i: recording.frame(view, i))
+        for i, s in enumerate(recording.steps)
+    )
+
+
+def history_from_synthetic(seed: int = 42, steps: int = 60, sales_per_step: int = 200) -> GameHistory:
+    """Historique d'une partie synthétique (voir synthetic_game.py)"""
+    from synthetic_game import SyntheticGame
+
+    game = SyntheticGame(seed=seed, sales_per_step=sales_per_step)
+
+    def walk():
+        for _ in range(steps):
+            game.advance(1)
+            yield (game.sim_round, game.sim_step), game.view
+
+    return GameHistory.from_steps(walk())
+
+
+def simulate(history: GameHistory, rules: Dict = PRICING_RULES, top_n: Optional[int] = 5) -> Dict:
+    """
+    Rejoue la partie avec les règles données
+
+    Args:
+        history: Historique de la partie
+        rules: Seuils de decide_price_action
+        top_n: Recommandations appliquées à chaque step, comme le tableau du
+               dashboard (produits les plus vendus ; None = toutes)
+
+    Returns:
+        Dict PROFIT, VALUATION, REVENUE, UNITS, LOST_UNITS, PRICE_CHANGES
+    """
+    n_steps, n_keys = history.quantity.shape
+    sold_by_material = np.zeros((n_steps, len(history.materials)))
+    for t in range(n_steps):
+        sold_by_material[t] = np.bincount(history.key_material, history.quantity[t], len(history.materials))
+
+    # Entrées de stock enregistrées (production, livraisons), rejouées à l'identique
+    inflow = np.zeros_like(history.stock)
+    inflow[1:] = history.stock[1:] - history.stock[:-1] + sold_by_material[1:]
+    stock = history.stock[0] + sold_by_material[0]
+
+    price = history.price[0].copy()
+    velocity = np.zeros(n_keys)
+    revenue = units = lost = cogs = 0.0
+    changes = 0
+
+    for t in range(n_steps):
+        if t and history.rounds[t] != history.rounds[t - 1]:
+            velocity[:] = 0
+
+        # Décisions sur l'état de fin du step précédent
+        if t:
+            candidates = np.flatnonzero((history.market[t - 1] > 0) & (velocity > 0) & (price > 0))
+            if top_n is not None:
+                candidates = candidates[np.argsort(-velocity[candidates], kind='stable')][:top_n]
+            for k in candidates:
+                action, _, new_price = decide_price_action(
+                    price[k], history.market[t - 1, k], velocity[k], stock[history.key_material[k]], rules)
+                if action in ('INCREASE', 'DECREASE') and new_price > 0:
+                    price[k] = new_price
+                    changes += 1
+
+        recorded = history.quantity[t]
+        ratio = np.divide(price, history.price[t], out=np.ones(n_keys), where=history.price[t] > 0)
+        demand = recorded * ratio ** history.elasticity
+
+        # Ventes plafonnées par le stock disponible du produit
+        available = stock + inflow[t]
+        wanted = np.bincount(history.key_material, demand, len(history.materials))
+        fill = np.divide(np.maximum(available, 0), wanted, out=np.ones_like(wanted), where=wanted > available)
+        sold = demand * fill[history.key_material]
+        stock = available - np.bincount(history.key_material, sold, len(history.materials))
+
+        unit_price = np.divide(history.revenue[t], recorded, out=history.price[t].copy(), where=recorded > 0)
+        revenue += float((sold * unit_price * ratio).sum())
+        cogs += float((sold * history.unit_cost[t]).sum())
+        units += float(sold.sum())
+        lost += float((demand - sold).sum())
+        velocity += sold
+
+    profit = revenue - cogs
+    return {
+        'PROFIT': round(profit, 2),
+        'VALUATION': round(float(history.valuation[-1]) + profit - history.recorded_profit(), 2),
+        'REVENUE': round(revenue, 2),
+        'UNITS': int(round(units)),
+        'LOST_UNITS': int(round(lost)),
+        'PRICE_CHANGES': changes,
+    }
+
+
+def parameter_grid(grid: Optional[Dict[str, List]] = None) -> List[Dict]:
+    """Combinaisons de seuils (LOW_VELOCITY < HIGH_VELOCITY), complétées par PRICING_RULES"""
+    grid = grid or DEFAULT_GRID
+    names = list(grid)
+    configs = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        rules = dict(PRICING_RULES, **dict(zip(names, values)))
+        if rules['LOW_VELOCITY'] < rules['HIGH_VELOCITY']:
+            configs.append(rules)
+    return configs
+
+
+# Historique partagé par les processus du pool (transmis une fois par processus)
+_worker_history: Optional[GameHistory] = None
+_worker_top_n: Optional[int] = None
+
+
+def _init_worker(history: GameHistory, top_n: Optional[int]):
+    global _worker_history, _worker_top_n
+    _worker_history, _worker_top_n = history, top_n
+
+
+def _simulate_worker(rules: Dict) -> Dict:
+    return simulate(_worker_history, rules, _worker_top_n)
+
+
+def sweep(history: GameHistory, grid: Optional[Dict[str, List]] = None,
+          workers: Optional[int] = None, top_n: Optional[int] = 5) -> pd.DataFrame:
+    """
+    Balaye les seuils et classe les configurations
+
+    Args:
+        history: Historique de la partie
+        grid: Valeurs testées par seuil (défaut: DEFAULT_GRID)
+        workers: Processus (défaut: nombre de CPU ; 1 = dans ce processus)
+        top_n: Voir simulate
+
+    Returns:
+        DataFrame trié (RANK, seuils balayés, PROFIT, VALUATION, ...)
+    """
+    grid = grid or DEFAULT_GRID
+    configs = parameter_grid(grid)
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = [simulate(history, rules, top_n) for rules in configs]
+    else:
+        chunksize = max(1, len(configs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(history, top_n)) as pool:
+            results = list(pool.map(_simulate_worker, configs, chunksize=chunksize))
+    logger.info(f"✓ {len(configs)} configurations simulées en {time.perf_counter() - start:.1f}s ({workers} processus)")
+
+    ranking = pd.DataFrame([dict({name: rules[name] for name in grid}, **result)
+                            for rules, result in zip(configs, results)])
+    if ranking.empty:
+        return ranking
+    ranking['DELTA_PROFIT'] = (ranking['PROFIT'] - history.recorded_profit()).round(2)
+    ranking = ranking.sort_values(['PROFIT', 'VALUATION'], ascending=False, kind='stable').reset_index(drop=True)
+    ranking.insert(0, 'RANK', np.arange(1, len(ranking) + 1))
+    return ranking
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backtest des seuils de prix ZMARKET")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--replay', metavar='DIR', help="Partie enregistrée (replay.py record)")
+    source.add_argument('--synthetic', action='store_true', help="Partie synthétique")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--steps', type=int, default=60)
+    parser.add_argument('--sales-per-step', type=int, default=200)
+    parser.add_argument('--workers', type=int, help="Processus (défaut: nombre de CPU)")
+    parser.add_argument('--all-products', action='store_true',
+                        help="Appliquer les règles à tous les produits (défaut: top 5 du dashboard)")
+    parser.add_argument('--top', type=int, default=10, help="Configurations affichées")
+    parser.add_argument('-o', '--output', help="Classement complet (CSV)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(message)s', stream=sys.stderr)
+
+    if args.replay:
+        history = history_from_recording(args.replay)
+    else:
+        history = history_from_synthetic(args.seed, args.steps, args.sales_per_step)
+    logger.info(f"✓ Historique: {len(history)} steps, {len(history.keys)} produits/canaux")
+
+    ranking = sweep(history, workers=args.workers, top_n=None if args.all_products else 5)
+    if ranking.empty:
+        logger.error("✗ Aucune configuration simulée")
+        return 1
+
+    default = simulate(history, PRICING_RULES, None if args.all_products else 5)
+    print(f"Partie enregistrée : profit {history.recorded_profit():,.2f}, valorisation {history.valuation[-1]:,.2f}")
+    print(f"Seuils actuels     : profit {default['PROFIT']:,.2f}, valorisation {default['VALUATION']:,.2f}\n")
+    print(ranking.head(args.top).to_string(index=False))
+    if args.output:
+        ranking.to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
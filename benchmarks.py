@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Banc de mesure des moteurs sur des volumes de données croissants
+
+Chaque méthode publique de ERPSimAnalyzer, SalesEngine, ProcurementEngine et
+FinanceEngine est exécutée sur une partie synthétique (voir synthetic_game.py)
+de 10k, 100k, 1M puis 10M lignes de ventes, servie en mémoire. Pour chaque
+(méthode, taille) on mesure :
+
+- la latence (min / médiane / moyenne sur `--repeat` appels)
+- le pic mémoire pendant l'appel (tracemalloc, appel séparé)
+- les allocations encore vivantes après l'appel (octets et blocs)
+
+Les résultats sont écrits en JSON (avec version Python/pandas, commit git)
+pour comparer deux exécutions :
+
+    python benchmarks.py --sizes 10000 100000 -o bench_results/avant.json
+    python benchmarks.py --sizes 10000 100000 --compare bench_results/avant.json
+
+`--compare` signale les méthodes plus lentes que la référence au-delà du
+seuil (code retour 1), ce qui permet de l'utiliser en intégration continue.
+Les moteurs lisent normalement `top=10000` lignes ; le client du banc ignore
+ce plafond par défaut pour mesurer le coût réel du traitement à chaque taille
+(`--honor-top` pour le respecter).
+"""
+
+import argparse
+import gc
+import inspect
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from frame_client import FrameClient
+
+logger = logging.getLogger(__name__)
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+RESULTS_DIR = 'bench_results'
+
+# Objets mesurés (clés de build_context) et méthodes exclues
+ENGINES = ['analyzer', 'sales', 'procurement', 'finance']
+EXCLUDED = {'print_summary'}
+
+# Valeurs des arguments obligatoires, par nom de paramètre
+ARGUMENTS = {
+    'material_number': 'F13',
+    'current_price': 7.80,
+    'current_profit': 1_000_000.0,
+    'current_loan': 2_000_000.0,
+}
+
+# Ralentissement (médiane) au-delà duquel une méthode est signalée
+REGRESSION_THRESHOLD = 1.25
+
+
+def build_context(client) -> Dict[str, object]:
+    """Analyseur et moteurs neufs (caches vides) branchés sur le client"""
+    from analyzer import ERPSimAnalyzer
+    from sales_engine import SalesEngine
+    from procurement_engine import ProcurementEngine
+    from finance_engine import FinanceEngine
+
+    analyzer = ERPSimAnalyzer(client=client)
+    return {
+        'analyzer': analyzer,
+        'sales': SalesEngine(analyzer, client=client),
+        'procurement': ProcurementEngine(analyzer, client=client),
+        'finance': FinanceEngine(analyzer, client=client),
+    }
+
+
+def discover_methods(context: Dict[str, object]) -> List[Tuple[str, str, Dict]]:
+    """(moteur, méthode, arguments) de chaque méthode publique mesurable"""
+    methods = []
+    for engine in ENGINES:
+        obj = context[engine]
+        for name, member in inspect.getmembers(type(obj), inspect.isfunction):
+            if name.startswith('_') or name in EXCLUDED:
+                continue
+            if isinstance(inspect.getattr_static(type(obj), name), staticmethod):
+                continue
+            params = list(inspect.signature(member).parameters.values())[1:]
+            required = [p.name for p in params if p.default is inspect.Parameter.empty
+                        and p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)]
+            missing = [p for p in required if p not in ARGUMENTS]
+            if missing:
+                logger.warning(f"⚠ {type(obj).__name__}.{name} ignorée (arguments: {', '.join(missing)})")
+                continue
+            methods.append((engine, name, {p: ARGUMENTS[p] for p in required}))
+    return methods
+
+
+def measure(call: Callable[[], Callable[[], object]], repeat: int) -> Dict:
+    """
+    Mesure une méthode
+
+    Args:
+        call: Fabrique appelée avant chaque mesure (contexte neuf) et
+              retournant la fonction à chronométrer
+        repeat: Nombre d'appels chronométrés
+    """
+    timings = []
+    for _ in range(repeat):
+        func = call()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    # Mémoire sur un appel séparé (tracemalloc ralentit l'exécution)
+    func = call()
+    result = None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        blocks_before = sum(s.count for s in tracemalloc.take_snapshot().statistics('filename'))
+        result = func()
+        after, peak = tracemalloc.get_traced_memory()
+        blocks_after = sum(s.count for s in tracemalloc.take_snapshot().statistics('filename'))
+    finally:
+        tracemalloc.stop()
+    del result
+
+    return {
+        'latency_s': {
+            'min': round(min(timings), 6),
+            'median': round(float(np.median(timings)), 6),
+            'mean': round(float(np.mean(timings)), 6),
+        },
+        'peak_bytes': int(peak - before),
+        'retained_bytes': int(after - before),
+        'retained_blocks': int(blocks_after - blocks_before),
+    }
+
+
+def run_suite(sizes: List[int], only: Optional[str] = None, repeat: int = 3, budget: float = 60.0,
+              seed: int = 42, honor_top: bool = False, text_decimals: bool = False) -> Dict:
+    """
+    Exécute le banc sur chaque taille
+
+    Une méthode dont la latence médiane dépasse `budget` secondes n'est pas
+    mesurée sur les tailles suivantes (entrée marquée `skipped`).
+    """
+    from synthetic_game import SyntheticGame
+
+    pattern = re.compile(only) if only else None
+    over_budget: Dict[str, int] = {}
+    results = []
+
+    for size in sizes:
+        start = time.perf_counter()
+        game = SyntheticGame.for_rows(size, seed=seed)
+        client = FrameClient(game, honor_top=honor_top, text_decimals=text_decimals).preload()
+        logger.info(f"✓ Partie de {size:,} lignes générée en {time.perf_counter() - start:.1f}s")
+
+        for engine, method, kwargs in discover_methods(build_context(client)):
+            name = f"{engine}.{method}"
+            if pattern and not pattern.search(name):
+                continue
+            entry = {'method': name, 'size': size}
+
+            if name in over_budget:
+                entry.update(skipped=True, reason=f"> {budget}s à {over_budget[name]:,} lignes")
+                results.append(entry)
+                continue
+
+            def call(engine=engine, method=method, kwargs=kwargs):
+                bound = getattr(build_context(client)[engine], method)
+                return lambda: bound(**kwargs)
+
+            try:
+                entry.update(measure(call, repeat))
+            except Exception as e:
+                logger.error(f"✗ {name} ({size:,} lignes): {e}")
+                entry.update(error=str(e))
+                results.append(entry)
+                continue
+
+            results.append(entry)
+            median = entry['latency_s']['median']
+            logger.info(f"{name:<50} {size:>11,} {median * 1000:>10.1f} ms  pic {entry['peak_bytes'] / 1e6:>8.1f} Mo")
+            if median > budget:
+                over_budget[name] = size
+
+        del client, game
+        gc.collect()
+
+    return {'meta': run_metadata(seed, repeat, honor_top, text_decimals), 'results': results}
+
+
+def run_metadata(seed: int, repeat: int, honor_top: bool, text_decimals: bool) -> Dict:
+    """Contexte de l'exécution (pour comparer deux fichiers de résultats)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'repeat': repeat,
+        'honor_top': honor_top,
+        'text_decimals': text_decimals,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = REGRESSION_THRESHOLD) -> pd.DataFrame:
+    """
+    Latence médiane et pic mémoire de deux exécutions, par (méthode, taille)
+
+    Returns:
+        DataFrame (METHOD, SIZE, BASE_MS, CURRENT_MS, RATIO, BASE_PEAK_MB,
+        CURRENT_PEAK_MB, REGRESSION), trié par ratio décroissant
+    """
+    def index(run):
+        return {(r['method'], r['size']): r for r in run['results'] if 'latency_s' in r}
+
+    base, cur = index(baseline), index(current)
+    rows = []
+    for key in sorted(base.keys() & cur.keys()):
+        b, c = base[key], cur[key]
+        b_ms, c_ms = b['latency_s']['median'] * 1000, c['latency_s']['median'] * 1000
+        ratio = c_ms / b_ms if b_ms else float('inf')
+        rows.append({
+            'METHOD': key[0], 'SIZE': key[1],
+            'BASE_MS': round(b_ms, 2), 'CURRENT_MS': round(c_ms, 2), 'RATIO': round(ratio, 2),
+            'BASE_PEAK_MB': round(b['peak_bytes'] / 1e6, 2), 'CURRENT_PEAK_MB': round(c['peak_bytes'] / 1e6, 2),
+            'REGRESSION': ratio > threshold
+        })
+    if not rows:
+        return pd.DataFrame(columns=['METHOD', 'SIZE', 'BASE_MS', 'CURRENT_MS', 'RATIO',
+                                     'BASE_PEAK_MB', 'CURRENT_PEAK_MB', 'REGRESSION'])
+    return pd.DataFrame(rows).sort_values('RATIO', ascending=False, ignore_index=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Banc de mesure des moteurs ERPsim")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="Lignes de ventes par partie")
+    parser.add_argument('--only', help="Regex sur 'moteur.méthode' (ex: 'sales\\.|reorder')")
+    parser.add_argument('--repeat', type=int, default=3, help="Appels chronométrés par mesure")
+    parser.add_argument('--budget', type=float, default=60.0,
+                        help="Latence (s) au-delà de laquelle les tailles suivantes sont sautées")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--honor-top', action='store_true', help="Respecter le `top` des moteurs")
+    parser.add_argument('--text-decimals', action='store_true', help="Décimaux en texte (réponse OData brute)")
+    parser.add_argument('-o', '--output', help=f"Fichier JSON (défaut: {RESULTS_DIR}/bench_<date>.json)")
+    parser.add_argument('--compare', metavar='BASELINE', help="Résultats de référence à comparer")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    # Les moteurs journalisent chaque lecture : seul le banc reste en INFO
+    logging.basicConfig(level=logging.WARNING, format='%(message)s', stream=sys.stderr)
+    logger.setLevel(logging.INFO)
+
+    run = run_suite(args.sizes, args.only, args.repeat, args.budget, args.seed,
+                    args.honor_top, args.text_decimals)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+    logger.info(f"✓ Résultats: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        report = compare(baseline, run, args.threshold)
+        print(report.to_string(index=False) if not report.empty else "(aucune mesure commune)")
+        regressions = report[report['REGRESSION']]
+        if not regressions.empty:
+            logger.warning(f"⚠ {len(regressions)} mesure(s) plus lente(s) que la référence (x{args.threshold})")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
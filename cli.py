@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Interface en ligne de commande ERPsim (non interactive)
+
+Une commande = une réponse, en tableau lisible ou en format machine
+(JSON, CSV, Parquet) pour les scripts et les tâches cron.
+
+    python cli.py summary --format json
+    python cli.py sales --by area --format csv -o ventes_zone.csv
+    python cli.py reorder --format json
+    python cli.py competitors wars --threshold 3
+    python cli.py anomalies --steps 5 --kinds DROP SHIFT_DOWN
+    python cli.py ledger income --period round
+    python cli.py export rapport.xlsx
+    python cli.py --profile cprofile --metrics run.prom prices
+
+Les modules lourds (pandas, client OData, moteurs) ne sont importés que
+par la commande qui en a besoin : `--help` et les erreurs d'arguments
+répondent immédiatement.
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+FORMATS = ('table', 'json', 'csv', 'parquet')
+
+SALES_VIEWS = {
+    'product': 'get_sales_summary',
+    'area': 'get_sales_by_area',
+    'dc': 'get_sales_by_dc'
+}
+
+
+def _analyzer():
+    from analyzer import ERPSimAnalyzer
+    return ERPSimAnalyzer()
+
+
+# --- Commandes (chacune retourne un DataFrame ou un dict) ---
+
+def cmd_summary(args):
+    from config import settings
+
+    analyzer = _analyzer()
+    tracker = analyzer.valuation_tracker
+    tracker.refresh()
+    latest = tracker.latest() or {}
+    step = tracker.current_step()
+
+    summary = {
+        'company_code': settings.COMPANY_CODE,
+        'sim_round': step[0] if step else None,
+        'sim_step': step[1] if step else None,
+        'company_valuation': float(latest.get('COMPANY_VALUATION', 0) or 0),
+        'credit_rating': latest.get('CREDIT_RATING'),
+        'profit': float(latest.get('PROFIT', 0) or 0),
+        'cash': float(latest.get('BANK_CASH_ACCOUNT', 0) or 0),
+        'loan': float(latest.get('BANK_LOAN', 0) or 0)
+    }
+
+    sales = analyzer.get_sales_summary()
+    summary['revenue'] = float(sales['NET_VALUE'].sum()) if not sales.empty else 0.0
+    summary['top_product'] = sales.iloc[0]['MATERIAL_NUMBER'] if not sales.empty else None
+
+    inventory = analyzer.get_current_inventory()
+    if not inventory.empty and 'STOCK' in inventory.columns:
+        finished = inventory[inventory['STORAGE_LOCATION'] == '02'] if 'STORAGE_LOCATION' in inventory.columns else inventory
+        summary['finished_goods_stock'] = float(finished['STOCK'].sum())
+    else:
+        summary['finished_goods_stock'] = 0.0
+
+    return summary
+
+
+def cmd_sales(args):
+    return getattr(_analyzer(), SALES_VIEWS[args.by])()
+
+
+def cmd_inventory(args):
+    return _analyzer().get_current_inventory()
+
+
+def cmd_reorder(args):
+    import pandas as pd
+    from procurement_engine import ProcurementEngine
+
+    reorders = ProcurementEngine(_analyzer()).check_reorder_needed()
+    if not reorders:
+        return pd.DataFrame()
+    return pd.DataFrame.from_dict(reorders, orient='index').rename_axis('MATERIAL_NUMBER').reset_index()
+
+
+def cmd_prices(args):
+    from sales_engine import SalesEngine
+
+    return SalesEngine(_analyzer()).recommend_price_adjustments()
+
+
+def cmd_competitors(args):
+    intelligence = _analyzer().get_market_intelligence()
+    if args.view == 'moves':
+        return intelligence.competitor_moves(args.threshold)
+    if args.view == 'wars':
+        return intelligence.price_wars(args.threshold)
+    return intelligence.share_trends(by=args.by)
+
+
+def cmd_anomalies(args):
+    return _analyzer().get_anomaly_detector().recent(args.steps, kinds=args.kinds)
+
+
+def cmd_ledger(args):
+    analyzer = _analyzer()
+    if args.statement == 'balance':
+        return analyzer.get_balance_sheet()
+    return analyzer.get_income_statement(args.period)
+
+
+def cmd_export(args):
+    from export_pipeline import export_report
+
+    job = export_report(
+        _analyzer(), args.path, fmt=args.export_format, summary=True,
+        on_progress=lambda progress, message: print(f"[{progress:>4.0%}] {message}", file=sys.stderr)
+    )
+    return {'status': job.status, 'path': job.path, 'rows': job.rows_written, 'error': job.error}
+
+
+# --- Sortie ---
+
+def write_output(result, fmt: str, output: str = None):
+    """Écrit un DataFrame ou un dict dans le format demandé (stdout par défaut)"""
+    import pandas as pd
+
+    if isinstance(result, dict):
+        if fmt in ('json', 'table'):
+            text = json.dumps(result, ensure_ascii=False, indent=2, default=str)
+            _write_text(text, output)
+            return
+        result = pd.DataFrame([result])
+
+    if fmt == 'table':
+        _write_text(result.to_string(index=False) if not result.empty else "(aucune donnée)", output)
+    elif fmt == 'json':
+        _write_text(result.to_json(orient='records', force_ascii=False, date_format='iso'), output)
+    elif fmt == 'csv':
+        _write_text(result.to_csv(index=False), output)
+    elif fmt == 'parquet':
+        result.to_parquet(output, index=False)
+
+
+def _write_text(text: str, output: str = None):
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text if text.endswith('\n') else text + '\n')
+    else:
+        print(text)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='erpsim', description="Analyse ERPsim en ligne de commande")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Afficher les logs (stderr)")
+    parser.add_argument('--metrics', metavar='FICHIER', help="Écrire les métriques Prometheus de l'exécution")
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'], help="Profiler la commande")
+    parser.add_argument('--profile-output', metavar='FICHIER',
+                        help="Profil (.prof pour cProfile, .html pour pyinstrument), sinon résumé sur stderr")
+
+    # Options de sortie communes à toutes les commandes de données
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('-f', '--format', choices=FORMATS, default='table', help="Format de sortie (défaut: table)")
+    output.add_argument('-o', '--output', help="Fichier de sortie (obligatoire pour parquet)")
+
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('summary', parents=[output], help="Valorisation, cash, dette, CA")
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser('sales', parents=[output], help="Ventes par produit, zone ou canal")
+    p.add_argument('--by', choices=list(SALES_VIEWS), default='product')
+    p.set_defaults(func=cmd_sales)
+
+    p = sub.add_parser('inventory', parents=[output], help="Stock actuel")
+    p.set_defaults(func=cmd_inventory)
+
+    p = sub.add_parser('reorder', parents=[output], help="Matériaux à réapprovisionner")
+    p.set_defaults(func=cmd_reorder)
+
+    p = sub.add_parser('prices', parents=[output], help="Ajustements de prix recommandés")
+    p.set_defaults(func=cmd_prices)
+
+    p = sub.add_parser('competitors', parents=[output], help="Mouvements concurrents, guerres des prix, parts")
+    p.add_argument('view', nargs='?', choices=['moves', 'wars', 'shares'], default='moves')
+    p.add_argument('--threshold', type=float, default=5.0, help="Variation de prix signalée (%%, défaut: 5)")
+    p.add_argument('--by', nargs='+', choices=['MATERIAL_DESCRIPTION', 'DISTRIBUTION_CHANNEL', 'AREA'],
+                   help="Niveau des parts de marché (défaut: produit x canal x zone)")
+    p.set_defaults(func=cmd_competitors)
+
+    p = sub.add_parser('anomalies', parents=[output], help="Chutes, pics et dérives de ventes par segment")
+    p.add_argument('--steps', type=int, default=3, help="Steps clos remontés (défaut: 3)")
+    p.add_argument('--kinds', nargs='+', choices=['DROP', 'SPIKE', 'SHIFT_DOWN', 'SHIFT_UP'],
+                   help="Types d'anomalies (défaut: tous)")
+    p.set_defaults(func=cmd_anomalies)
+
+    p = sub.add_parser('ledger', parents=[output], help="Compte de résultat ou bilan (grand livre)")
+    p.add_argument('statement', nargs='?', choices=['income', 'balance'], default='income')
+    p.add_argument('--period', choices=['step', 'round', 'game'], default='round',
+                   help="Période du compte de résultat (défaut: round)")
+    p.set_defaults(func=cmd_ledger)
+
+    p = sub.add_parser('export', help="Rapport complet (Excel, Parquet ou CSV)")
+    p.add_argument('path', nargs='?', help="Fichier .xlsx ou dossier (défaut: erpsim_report_<société>.xlsx)")
+    p.add_argument('--format', dest='export_format', choices=['xlsx', 'parquet', 'csv'])
+    p.set_defaults(func=cmd_export, format='json', output=None)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.format == 'parquet' and not args.output:
+        parser.error("--format parquet nécessite --output")
+
+    # Avant tout import du client OData (qui configure le logging en INFO)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        stream=sys.stderr)
+
+    if args.command == 'export' and not args.path:
+        from config import settings
+        args.path = f"erpsim_report_{settings.COMPANY_CODE}.xlsx"
+
+    if args.metrics:
+        import metrics
+        metrics.enable()
+
+    if args.profile:
+        import metrics
+        with metrics.profiling(args.profile, args.profile_output):
+            result = args.func(args)
+    else:
+        result = args.func(args)
+    write_output(result, args.format, args.output)
+
+    if args.metrics:
+        metrics.write_file(args.metrics)
+
+    if args.command == 'export':
+        return 0 if result['status'] == 'done' else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,26 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     REFRESH_RATE: int = 30
 
+    # Service de données partagé (voir data_service.py)
+    # Si défini, les clients OData passent par ce service au lieu de SAP
+    DATA_SERVICE_URL: Optional[str] = None
+    DATA_SERVICE_PORT: int = 8765
+
+    # Rejeu d'une partie enregistrée (voir replay.py), prioritaire sur SAP
+    # REPLAY_SPEED : 1 = temps réel, 10 = dix fois plus vite, 0 = step à la demande
+    REPLAY_DIR: Optional[str] = None
+    REPLAY_SPEED: float = 1.0
+
+    # Journal des temps de rendu (voir instrumentation.py), vide = désactivé
+    PERF_LOG_FILE: Optional[str] = "perf_log.jsonl"
+    PERF_LOG_MAX_BYTES: int = 5_000_000
+    PERF_LOG_BACKUPS: int = 3
+
+    # Métriques Prometheus (voir metrics.py), désactivées par défaut
+    METRICS_ENABLED: bool = False
+    METRICS_FILE: Optional[str] = None
+    METRICS_PORT: Optional[int] = None
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
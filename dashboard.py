@@ -7,7 +7,13 @@ from analyzer import ERPSimAnalyzer
 from sales_engine import SalesEngine
 from finance_engine import FinanceEngine
 from procurement_engine import ProcurementEngine
+from derived_graph import build_default_graph
+from export_pipeline import ExportJob
 from config import settings
+import instrumentation as perf
+import metrics
+import os
+import tempfile
 import time
 
 # --- Configuration de la page ---
@@ -18,6 +24,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Trace des temps de ce rerun (panneau ⏱️ Performance dans la sidebar)
+trace = perf.begin_trace("rerun")
+
+# Métriques Prometheus (optionnelles, une seule activation par processus)
+if settings.METRICS_ENABLED:
+    metrics.enable()
+    if settings.METRICS_PORT:
+        metrics.start_server(settings.METRICS_PORT)
+
 # --- CSS Personnalisé ---
 st.markdown("""
 <style>
@@ -51,7 +66,9 @@ def get_engines(_analyzer):
     return {
         'sales': SalesEngine(_analyzer),
         'finance': FinanceEngine(_analyzer),
-        'procurement': ProcurementEngine(_analyzer)
+        'procurement': ProcurementEngine(_analyzer),
+        # Résultats dérivés recalculés seulement si leurs vues sources changent
+        'derived': build_default_graph(_analyzer)
     }
 
 try:
@@ -61,11 +78,36 @@ except Exception as e:
     st.error(f"Erreur connexion: {e}")
     st.stop()
 
+# --- Cache des calculs (méthode, arguments, step de jeu) ---
+# Les interactions UI (cases à cocher, toggles) ne relancent que le travail
+# pandas local : les appels SAP ne sont refaits qu'au changement de step
+# ou à l'expiration du TTL.
+@st.cache_data(ttl=settings.REFRESH_RATE, show_spinner=False)
+def cached_call(target: str, method: str, step_key, *args):
+    perf.mark_computed()
+    obj = analyzer if target == 'analyzer' else engines[target]
+    return getattr(obj, method)(*args)
+
+with perf.section("analyzer.get_step_key", kind='call'):
+    step_key = analyzer.get_step_key()
+
+def cached(target: str, method: str, *args):
+    label = f"{target}.{method}({args[0]})" if args and isinstance(args[0], str) else f"{target}.{method}"
+    with perf.section(label, kind='call') as record:
+        record.computed = False
+        result = cached_call(target, method, step_key, *args)
+    perf.record_cache('dashboard', not record.computed)
+    return result
+
+def derived(name: str):
+    return cached('derived', 'get', name, step_key)
+
 # --- Sidebar ---
 with st.sidebar:
     st.title("🎛️ Contrôle")
     if st.button("🔄 Rafraîchir Données", type="primary"):
         st.cache_data.clear()
+        analyzer.cache = {}
         st.rerun()
     st.divider()
     st.divider()
@@ -77,7 +119,7 @@ with st.sidebar:
     st.subheader("🎯 Filtre Produits")
     
     # 1. Récupérer tous les produits
-    all_products = engines['sales'].get_active_products() 
+    all_products = cached('sales', 'get_active_products') 
     
     active_products = []
     
@@ -103,57 +145,57 @@ with st.sidebar:
 
     st.info("💡 **Conseil du jour:** Rembourser la dette est souvent l'action la plus rentable pour la valorisation.")
 
-    # --- DEBUG SECTION ---
-    with st.expander("🛠️ Debug Info (Si données vides)"):
-        st.write("Active Products:", len(active_products))
-        st.write("Connection URL:", settings.ODATA_BASE_URL)
-        
-        if st.button("Test Raw Data"):
-            raw_sales = analyzer.get_sales_summary()
-            st.write("Sales Shape:", raw_sales.shape)
-            st.dataframe(raw_sales.head())
-            
-            raw_market = analyzer.get_market_analysis()
-            st.write("Market Shape:", raw_market.shape)
-            st.dataframe(raw_market.head())
-
 
 # --- Header KPIs ---
 st.title(f"🚀 ERPsim Strategy - {settings.COMPANY_CODE}")
 
-with st.spinner('Chargement...'):
-    val_df = analyzer.get_company_valuation()
-    if not val_df.empty:
-        latest = val_df.iloc[-1]
+with st.spinner('Chargement...'), perf.section("KPIs"):
+    tracker = analyzer.valuation_tracker
+    latest = tracker.latest()
+    if latest:
+        deltas = tracker.deltas()
         col1, col2, col3, col4, col5 = st.columns(5)
-        col1.metric("Valorisation", f"€{float(latest.get('COMPANY_VALUATION', 0)):,.0f}")
-        col2.metric("Cash (Banque)", f"€{float(latest.get('BANK_CASH_ACCOUNT', 0)):,.0f}")
-        col3.metric("Profit Net", f"€{float(latest.get('PROFIT', 0)):,.0f}")
-        col4.metric("Dette Bancaire", f"€{float(latest.get('BANK_LOAN', 0)):,.0f}")
+        col1.metric("Valorisation", f"€{float(latest.get('COMPANY_VALUATION', 0)):,.0f}", f"€{deltas['COMPANY_VALUATION']:,.0f}")
+        col2.metric("Cash (Banque)", f"€{float(latest.get('BANK_CASH_ACCOUNT', 0)):,.0f}", f"€{deltas['BANK_CASH_ACCOUNT']:,.0f}")
+        col3.metric("Profit Net", f"€{float(latest.get('PROFIT', 0)):,.0f}", f"€{deltas['PROFIT']:,.0f}")
+        col4.metric("Dette Bancaire", f"€{float(latest.get('BANK_LOAN', 0)):,.0f}", f"€{deltas['BANK_LOAN']:,.0f}", delta_color="inverse")
         col5.metric("Rating", latest.get('CREDIT_RATING', 'N/A'))
+
+        # Mini-tendances (moyenne glissante)
+        if len(tracker.series) > 1:
+            with st.expander("📈 Tendances"):
+                trend = tracker.rolling(window=5).tail(30)
+                st.line_chart(trend[['COMPANY_VALUATION', 'BANK_CASH_ACCOUNT', 'BANK_LOAN']], height=180)
     else:
         st.warning("Pas de données KPI")
 
 st.markdown("---")
 
-# --- Tabs ---
-tab_sales, tab_inventory, tab_market, tab_marketing, tab_invest, tab_actions = st.tabs([
-    "📈 VENTES (Produits)", 
-    "📦 STOCKS (Finis)", 
-    "🏆 MARCHÉ (Zmarket)",
-    "📣 MARKETING (Ciblé)", 
-    "💰 INVESTISSEMENT (Stratégie)",
-    "⚡ ACTIONS"
-])
+# --- Sections ---
+# Chaque section est une fonction : seule la section affichée est calculée
+# (contrairement à st.tabs qui exécute aussi les onglets cachés).
+# st.fragment limite les reruns des widgets internes à la section elle-même.
 
 # --- 1. VENTES ---
-with tab_sales:
+@st.fragment
+@perf.timed("Ventes")
+def render_sales():
     st.subheader("Analyse des Ventes & Prix (Produits Finis uniquement)")
     
     # Récupérer les données
-    sales_summary = analyzer.get_sales_summary()
-    recos = engines['sales'].recommend_price_adjustments()
-    
+    sales_summary = derived('sales_summary')
+    recos = derived('price_recommendations')
+
+    # Alertes du détecteur d'anomalies (baisses seulement, produits cochés)
+    anomalies = cached('analyzer', 'get_sales_anomalies')
+    if not anomalies.empty:
+        drops = anomalies[anomalies['KIND'].isin(['DROP', 'SHIFT_DOWN']) &
+                          anomalies['MATERIAL_NUMBER'].isin(active_products)]
+        if not drops.empty:
+            st.warning(f"⚠ {len(drops)} chute(s) de ventes détectée(s) sur les derniers steps")
+            with st.expander("Détail des anomalies"):
+                st.dataframe(drops, use_container_width=True)
+
     if not sales_summary.empty:
         # Filtrage: Ne garder que ce qui a un prix définit (Produits finis)
         # On utilise la liste 'active_products' définie dans la sidebar
@@ -217,10 +259,11 @@ with tab_sales:
     # --- 2. Analyse Détaillée (Région & Magasins) ---
     st.subheader("📊 Analyse Détaillée : Marges & Prix")
     
-    tab_geo, tab_store = st.tabs(["🌍 Par Région", "🏪 Par Type de Magasin (DC)"])
+    detail_view = st.radio("Vue détaillée", ["🌍 Par Région", "🏪 Par Type de Magasin (DC)"],
+                           horizontal=True, key="sales_detail_view", label_visibility="collapsed")
     
-    with tab_geo:
-        sales_geo = analyzer.get_sales_by_product_and_area()
+    if detail_view == "🌍 Par Région":
+        sales_geo = cached('analyzer', 'get_sales_by_product_and_area')
         if not sales_geo.empty:
             # Filtre Produit
             if active_products:
@@ -247,8 +290,8 @@ with tab_sales:
         else:
             st.info("Pas de données régionales.")
 
-    with tab_store:
-        sales_dc = analyzer.get_sales_by_product_and_dc()
+    else:
+        sales_dc = cached('analyzer', 'get_sales_by_product_and_dc')
         if not sales_dc.empty:
             # Filtre Produit
             if active_products:
@@ -280,7 +323,7 @@ with tab_sales:
     
     with col3:
         st.subheader("🌍 Répartition Géographique (Globale)")
-        sales_geo = analyzer.get_sales_by_area()
+        sales_geo = derived('sales_by_area')
         if not sales_geo.empty:
             fig = px.pie(sales_geo, values='NET_VALUE', names='AREA', title="CA par Région")
             st.plotly_chart(fig, use_container_width=True)
@@ -289,7 +332,7 @@ with tab_sales:
 
     with col4:
         st.subheader("📦 Répartition par Canal (Globale)")
-        sales_dc = analyzer.get_sales_by_dc()
+        sales_dc = derived('sales_by_dc')
         if not sales_dc.empty:
              fig = px.pie(sales_dc, values='NET_VALUE', names='DISTRIBUTION_CHANNEL', title="CA par Canal")
              st.plotly_chart(fig, use_container_width=True)
@@ -297,10 +340,12 @@ with tab_sales:
              st.info("Pas de données.")
 
 # --- 2. STOCKS ---
-with tab_inventory:
+@st.fragment
+@perf.timed("Stocks")
+def render_inventory():
     st.subheader("📦 Stock Produits Finis")
     
-    inventory = analyzer.get_current_inventory()
+    inventory = cached('analyzer', 'get_current_inventory')
     
     if not inventory.empty:
         # FILTRE: Uniquement produits finis (active_products)
@@ -338,10 +383,21 @@ with tab_inventory:
         st.info("Inventaire vide.")
 
 # --- 3. MARCHÉ (Zmarket) ---
-with tab_market:
+MARKET_GRANULARITIES = {
+    "Produit": ('MATERIAL_NUMBER',),
+    "Produit x Canal": ('MATERIAL_NUMBER', 'DISTRIBUTION_CHANNEL'),
+    "Produit x Zone": ('MATERIAL_NUMBER', 'AREA'),
+    "Produit x Canal x Zone": ('MATERIAL_NUMBER', 'DISTRIBUTION_CHANNEL', 'AREA'),
+    "Canal x Zone": ('DISTRIBUTION_CHANNEL', 'AREA'),
+    "Produit x Période": ('MATERIAL_NUMBER', 'PERIOD'),
+}
+
+@st.fragment
+@perf.timed("Marché")
+def render_market():
     st.subheader("🏆 Analyse du Marché (Zmarket vs Nous)")
     
-    market_analysis = analyzer.get_market_analysis()
+    market_analysis = derived('market_analysis')
     
     if not market_analysis.empty:
         # Toggle pour voir tout le marché ou juste nos produits
@@ -359,17 +415,31 @@ with tab_market:
         col_m1.metric("Taille Marché Total", f"€{total_market:,.0f}")
         col_m2.metric("Nos Ventes Totales", f"€{my_total:,.0f}")
         col_m3.metric("Part de Marché Globale", f"{global_share:.1f}%")
-        
+
+        # Granularité de la matrice (toutes calculées à partir du même cube)
+        granularity = st.selectbox("Granularité", list(MARKET_GRANULARITIES), key="market_granularity")
+        by = MARKET_GRANULARITIES[granularity]
+        if granularity == "Produit":
+            segments = market_analysis
+        else:
+            segments = derived('market_share_matrix').get(by, pd.DataFrame())
+            if not show_all and active_products and 'MATERIAL_NUMBER' in by and not segments.empty:
+                segments = segments[segments['MATERIAL_NUMBER'].isin(active_products)]
+        if segments.empty:
+            st.info("Pas de données marché à cette granularité.")
+            return
+        segments = segments.assign(SEGMENT=segments[list(by)].astype(str).agg(' / '.join, axis=1))
+
         # Graphique Scatter: Part de marché vs Taille du marché
         fig_market = px.scatter(
-            market_analysis, 
+            segments,
             x='MARKET_VALUE', 
             y='MARKET_SHARE',
             size='MARKET_VALUE',
             color='STATUS',
-            hover_name='MATERIAL_NUMBER',
-            text='MATERIAL_NUMBER',
-            title="Matrice Opportunités : Taille Marché vs Part de Marché",
+            hover_name='SEGMENT',
+            text='SEGMENT' if len(segments) <= 20 else None,
+            title=f"Matrice Opportunités ({granularity}) : Taille Marché vs Part de Marché",
             color_discrete_map={
                 "⭐ Star": "green", 
                 "🎯 Opportunité": "blue", 
@@ -378,14 +448,14 @@ with tab_market:
             }
         )
         # Ligne médiane pour visualiser les quadrants
-        fig_market.add_hline(y=market_analysis['MARKET_SHARE'].median(), line_dash="dash", line_color="red", annotation_text="Part Median")
-        fig_market.add_vline(x=market_analysis['MARKET_VALUE'].median(), line_dash="dash", line_color="red", annotation_text="Taille Median")
+        fig_market.add_hline(y=segments['MARKET_SHARE'].median(), line_dash="dash", line_color="red", annotation_text="Part Median")
+        fig_market.add_vline(x=segments['MARKET_VALUE'].median(), line_dash="dash", line_color="red", annotation_text="Taille Median")
         
         st.plotly_chart(fig_market, use_container_width=True)
         
-        st.markdown("### 📋 Détail par Produit")
+        st.markdown(f"### 📋 Détail par {granularity}")
         st.dataframe(
-            market_analysis[['MATERIAL_NUMBER', 'MARKET_VALUE', 'MY_VALUE', 'MARKET_SHARE', 'STATUS']]
+            segments[list(by) + ['MARKET_VALUE', 'MY_VALUE', 'MARKET_SHARE', 'STATUS']]
             .style
             .format({'MARKET_VALUE': '€{:,.0f}', 'MY_VALUE': '€{:,.0f}', 'MARKET_SHARE': '{:.1f}%'})
             .background_gradient(subset=['MARKET_SHARE'], cmap='Greens')
@@ -397,10 +467,12 @@ with tab_market:
         st.info("Données Zmarket non disponibles pour le moment.")
 
 # --- 4. MARKETING ---
-with tab_marketing:
+@st.fragment
+@perf.timed("Marketing")
+def render_marketing():
     st.subheader("🎯 Stratégie Marketing Ciblée")
     
-    reco_marketing = engines['sales'].recommend_marketing_strategy()
+    reco_marketing = cached('sales', 'recommend_marketing_strategy')
     
     # Filtrer avec le sélecteur sidebar
     if not reco_marketing.empty and active_products:
@@ -426,24 +498,27 @@ with tab_marketing:
         st.warning("Impossible de générer la stratégie marketing (manque de données).")
 
 # --- 5. INVESTISSEMENT ---
-with tab_invest:
+@st.fragment
+@perf.timed("Investissement")
+def render_invest():
     st.header("💰 Stratégie d'Investissement & Cash Flow")
     
     # Calculs Financiers
-    fin_analysis = engines['finance'].analyze_cash_position()
+    fin_analysis = cached('finance', 'analyze_cash_position')
     
     if fin_analysis:
         current_profit = fin_analysis.get('profit', 0)
-        current_net_debt = fin_analysis.get('net_debt', 0)
+        current_loan = fin_analysis.get('loan', 0)
         
         # --- SECTION DETTE ---
         st.subheader("1. Gestion de la Dette (Impact Valorisation)")
         
-        impact_data = engines['finance'].calculate_valuation_impact(current_profit, current_net_debt)
+        impact_data = cached('finance', 'calculate_valuation_impact', current_profit, current_loan)
         
         col_d1, col_d2 = st.columns(2)
         with col_d1:
-            st.metric("Dette Nette Actuelle", f"€{current_net_debt:,.0f}", delta_color="inverse")
+            st.metric("Emprunt Actuel", f"€{current_loan:,.0f}", delta_color="inverse")
+            st.metric("Dette Nette", f"€{fin_analysis.get('net_debt', 0):,.0f}", delta_color="inverse")
             st.metric("Cote Actuelle (Estimée)", f"{fin_analysis.get('credit_rating', 'N/A')}")
         
         with col_d2:
@@ -453,15 +528,41 @@ with tab_invest:
             if impact_data['is_optimized']:
                 st.success("✅ Dette Optimisée ! Vous avez le meilleur taux.")
             else:
-                if current_net_debt > 1_000_000:
-                    pay_amount = current_net_debt - 1_000_000
-                    st.error(f"👉 **ACTION:** Remboursez €{pay_amount:,.0f} pour viser AAA+.")
-        
+                advice = cached('finance', 'get_debt_payoff_recommendation')
+                if advice.get('action') == 'PAYER DETTE':
+                    st.error(f"👉 **ACTION:** Remboursez €{advice['amount_to_pay']:,.0f} "
+                             f"(emprunt visé : €{advice['target_loan']:,.0f}).")
+                elif advice:
+                    st.warning(f"⚠️ {advice['reason']}")
+
+        # Courbe de remboursement (grille montant x jour)
+        payoff = cached('finance', 'simulate_debt_payoff_grid')
+        if payoff and not payoff['grid'].empty:
+            grid = payoff['grid']
+            # Meilleur jour faisable pour chaque montant (à défaut, le meilleur jour)
+            curve = (grid.sort_values(['FEASIBLE', 'VALUATION'], ascending=False)
+                     .drop_duplicates('AMOUNT').sort_values('AMOUNT'))
+            fig_payoff = px.line(
+                curve, x='AMOUNT', y='VALUATION', markers=True,
+                color='FEASIBLE', hover_data=['STEP', 'LOAN_AFTER', 'RATING', 'MIN_CASH'],
+                title="Valorisation selon le montant remboursé",
+                color_discrete_map={True: "green", False: "grey"}
+            )
+            optimum = payoff['optimum']
+            if optimum:
+                fig_payoff.add_vline(x=optimum['AMOUNT'], line_dash="dash", line_color="red", annotation_text="Optimum")
+            st.plotly_chart(fig_payoff, use_container_width=True)
+            if optimum:
+                st.info(f"🎯 **Optimum :** rembourser €{optimum['AMOUNT']:,.0f} au jour {int(optimum['STEP'])} "
+                        f"→ {optimum['RATING']} ({optimum['DISCOUNT_RATE']:.1%}), valorisation €{optimum['VALUATION']:,.0f}")
+            else:
+                st.warning("Aucun remboursement ne respecte le plancher de liquidité.")
+
         st.divider()
         
         # --- SECTION STOCK ---
         st.subheader("2. Coût du Stock (Cash Trap)")
-        stock_costs = engines['finance'].calculate_stock_costs()
+        stock_costs = cached('finance', 'calculate_stock_costs')
         
         if stock_costs:
             col_s1, col_s2 = st.columns(2)
@@ -476,6 +577,18 @@ with tab_invest:
                     st.write("👉 Arrêtez les achats de matières premières immédiatement.")
                 else:
                     st.success("✅ Niveau de stock acceptable (< 250k).")
+
+            # Capital immobilisé par catégorie et par matériau
+            col_c1, col_c2 = st.columns(2)
+            with col_c1:
+                fig_cat = px.pie(stock_costs['by_category'], values='TIED_UP_CAPITAL', names='CATEGORY',
+                                 title="Capital immobilisé par catégorie")
+                st.plotly_chart(fig_cat, use_container_width=True)
+            with col_c2:
+                fig_mat = px.bar(stock_costs['by_material'].head(10), x='TIED_UP_CAPITAL', y='MATERIAL_NUMBER',
+                                 orientation='h', title="Top 10 matériaux (capital immobilisé)")
+                fig_mat.update_layout(yaxis={'categoryorder': 'total ascending'})
+                st.plotly_chart(fig_mat, use_container_width=True)
         
         st.divider()
         
@@ -485,7 +598,7 @@ with tab_invest:
         col_i1, col_i2 = st.columns(2)
         with col_i1:
             daily_changeovers = st.slider("Changements de produits par jour (Est.)", 1, 10, 3)
-            roi_data = engines['finance'].calculate_setup_roi(daily_changeovers)
+            roi_data = cached('finance', 'calculate_setup_roi', daily_changeovers)
             
         with col_i2:
             st.metric("Gain quotidien estimé", f"€{roi_data['daily_gain']:,.0f}")
@@ -496,20 +609,93 @@ with tab_invest:
             else:
                 st.warning("Investissement risqué si la simulation est presque finie.")
 
+    st.divider()
+
+    # --- SECTION GRAND LIVRE ---
+    st.subheader("4. Grand Livre (Financial_Postings)")
+    period = st.radio("Période du compte de résultat", ['step', 'round', 'game'], index=1,
+                      horizontal=True, key="ledger_period")
+    income = cached('analyzer', 'get_income_statement', period)
+    balance = cached('analyzer', 'get_balance_sheet')
+
+    if income.empty and balance.empty:
+        st.info("Aucune écriture comptable disponible.")
+    else:
+        col_l1, col_l2 = st.columns(2)
+        with col_l1:
+            # Convention du grand livre : crédit négatif, le résultat net vaut -somme
+            st.metric("Résultat Net", f"€{-income['AMOUNT'].sum():,.0f}")
+            st.dataframe(income, use_container_width=True)
+        with col_l2:
+            st.metric("Total Bilan (débits)", f"€{balance['AMOUNT'].clip(lower=0).sum():,.0f}")
+            st.dataframe(balance, use_container_width=True)
+
 # --- 6. ACTIONS ---
-with tab_actions:
+# Suivi de l'export en cours (rafraîchi chaque seconde, sans bloquer l'UI)
+@st.fragment(run_every=1)
+def render_export_progress():
+    job = st.session_state.get('export_job')
+    if job is None:
+        return
+    if job.status in ('pending', 'running'):
+        st.progress(job.progress, text=job.message or "Démarrage...")
+    else:
+        # Export terminé : rerun complet pour afficher le téléchargement
+        st.rerun(scope="app")
+
+
+@perf.timed("Actions")
+def render_actions():
     st.subheader("⚡ Actions Rapides")
     col1, col2 = st.columns(2)
     with col1:
-        if st.button("📥 Télécharger Rapport Excel Global"):
-            with st.spinner("Génération..."):
-                report = analyzer.generate_performance_report()
-                import io
-                buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                     for name, df in report.items():
-                         if not df.empty: df.to_excel(writer, sheet_name=name[:30], index=False)
-                st.download_button("Télécharger .xlsx", buffer, "erpsim_report.xlsx")
+        job = st.session_state.get('export_job')
+
+        if st.button("📥 Télécharger Rapport Excel Global", disabled=job is not None and job.status == 'running'):
+            export_path = os.path.join(tempfile.gettempdir(), f"erpsim_report_{settings.COMPANY_CODE}_{int(time.time())}.xlsx")
+            st.session_state['export_job'] = ExportJob(analyzer, export_path).start()
+            job = st.session_state['export_job']
+
+        if job is not None:
+            if job.status in ('pending', 'running'):
+                render_export_progress()
+            elif job.status == 'done':
+                with open(job.path, 'rb') as f:
+                    st.download_button("Télécharger .xlsx", f, "erpsim_report.xlsx")
+            else:
+                st.error(job.message)
     
     with col2:
         st.write("Autres actions à venir...")
+
+
+PAGES = {
+    "📈 VENTES (Produits)": render_sales,
+    "📦 STOCKS (Finis)": render_inventory,
+    "🏆 MARCHÉ (Zmarket)": render_market,
+    "📣 MARKETING (Ciblé)": render_marketing,
+    "💰 INVESTISSEMENT (Stratégie)": render_invest,
+    "⚡ ACTIONS": render_actions
+}
+
+page = st.radio("Section", list(PAGES.keys()), horizontal=True, key="page", label_visibility="collapsed")
+PAGES[page]()
+
+# --- Panneau de performance (remplace l'ancien Debug Info) ---
+perf.end_trace(trace)
+if settings.METRICS_ENABLED and settings.METRICS_FILE:
+    metrics.write_file(settings.METRICS_FILE)
+with st.sidebar:
+    with st.expander(f"⏱️ Performance ({trace.total_ms:,.0f} ms, {trace.odata_calls} appels SAP)"):
+        st.caption(f"Connexion: {settings.ODATA_BASE_URL} — Produits actifs: {len(active_products)}")
+        col_p1, col_p2, col_p3 = st.columns(3)
+        col_p1.metric("Rerun", f"{trace.total_ms:,.0f} ms")
+        col_p2.metric("SAP", f"{trace.odata_ms:,.0f} ms")
+        col_p3.metric("Reçu", f"{trace.odata_bytes / 1024:,.0f} Ko")
+        cache_memory = engines['derived'].snapshot.memory_report()
+        if cache_memory['saved_bytes'] > 0:
+            st.caption(f"Vues en cache: {cache_memory['after_bytes'] / 1e6:,.1f} Mo "
+                       f"(au lieu de {cache_memory['before_bytes'] / 1e6:,.1f} Mo, x{cache_memory['ratio']})")
+        st.dataframe(trace.to_frame(), hide_index=True, use_container_width=True)
+        if settings.PERF_LOG_FILE:
+            st.caption(f"Historique: {settings.PERF_LOG_FILE}")
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Service de données partagé ERPsim
+
+Un seul processus parle au serveur SAP (OData) et garde les vues en cache ;
+les dashboards et scripts de l'équipe lui demandent les DataFrames prêts à
+l'emploi en HTTP local (Arrow IPC, ou JSON si pyarrow est absent).
+La charge sur SAP reste la même quel que soit le nombre de clients.
+
+Lancement:
+    python data_service.py --port 8765
+
+Puis dans le .env des clients:
+    DATA_SERVICE_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import io
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse, quote
+
+import pandas as pd
+import requests
+
+from config import settings
+from frame_compaction import compact_frame, expand_frame, frame_memory
+import instrumentation
+from odata_client import error_frame, is_upstream_error
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow est optionnel : repli sur JSON
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+JSON_MIME = 'application/json'
+
+
+def frame_to_arrow(df: pd.DataFrame) -> bytes:
+    """Sérialise un DataFrame en flux Arrow IPC"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def arrow_to_frame(payload: bytes) -> pd.DataFrame:
+    """Désérialise un flux Arrow IPC en DataFrame"""
+    return pa.ipc.open_stream(payload).read_pandas()
+
+
+class DataService:
+    """Cache partagé des vues OData, synchronisé avec SAP par un seul client"""
+
+    # Clés gardées tant qu'elles ont été demandées dans ce délai (en TTL)
+    HOT_WINDOW_TTLS = 10
+
+    def __init__(self, ttl: Optional[int] = None, sync_interval: Optional[int] = None,
+                 max_entries: int = 512):
+        """
+        Args:
+            ttl: Durée de validité d'une vue en cache (s, défaut: REFRESH_RATE)
+            sync_interval: Période de la synchronisation (s, défaut: REFRESH_RATE)
+            max_entries: Nombre maximum de clés en cache (les moins récemment
+                         demandées sortent en premier). Les lectures
+                         incrémentales ($skip) créent une clé par step.
+        """
+        from odata_client import ODataClient
+
+        self.client = ODataClient(use_service=False)
+        self.ttl = ttl if ttl is not None else settings.REFRESH_RATE
+        self.sync_interval = sync_interval if sync_interval is not None else settings.REFRESH_RATE
+        self.max_entries = max_entries
+        self._cache: Dict[Tuple, Tuple[float, pd.DataFrame]] = {}
+        self._last_requested: Dict[Tuple, float] = {}
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'cache_hits': 0, 'upstream_fetches': 0, 'evictions': 0}
+        self._stop = threading.Event()
+
+    @staticmethod
+    def make_key(view_name: str, filters: Optional[Dict], top: Optional[int],
+                 skip: Optional[int], select: Optional[List[str]] = None) -> Tuple:
+        return (view_name, json.dumps(filters or {}, sort_keys=True), top, skip,
+                ','.join(sorted(select)) if select else None)
+
+    def _key_lock(self, key: Tuple) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _fetch_upstream(self, key: Tuple) -> pd.DataFrame:
+        view_name, filters, top, skip, select = key
+        df = self.client.fetch_view(view_name, filters=json.loads(filters) or None, top=top, skip=skip,
+                                    select=select.split(',') if select else None)
+        with self._lock:
+            self.stats['upstream_fetches'] += 1
+        # Erreur SAP : rien n'est gardé (ni à la place d'une copie valide déjà
+        # en cache) ; une page vide (lecture $skip épuisée) est gardée comme
+        # les autres pour ne pas interroger SAP à chaque demande
+        if is_upstream_error(df):
+            return df
+
+        # Stockage compact (sans __metadata, dimensions en catégories)
+        compact = compact_frame(df)
+        with self._lock:
+            if key in self._last_requested:
+                self._cache[key] = (time.monotonic(), compact)
+                self._evict_locked(time.monotonic())
+        return compact
+
+    def _evict_locked(self, now: float):
+        """Retire les clés plus demandées depuis la fenêtre chaude, puis les plus anciennes au-delà de max_entries"""
+        horizon = self.HOT_WINDOW_TTLS * self.ttl
+        stale = [k for k, t in self._last_requested.items() if now - t >= horizon]
+        if len(self._last_requested) - len(stale) > self.max_entries:
+            by_age = sorted(self._last_requested.items(), key=lambda item: item[1])
+            stale = [k for k, _ in by_age[:len(by_age) - self.max_entries]]
+
+        for key in stale:
+            self._last_requested.pop(key, None)
+            self._key_locks.pop(key, None)
+            if self._cache.pop(key, None) is not None:
+                self.stats['evictions'] += 1
+
+    def evict(self) -> int:
+        """Applique la politique d'éviction maintenant (retourne le nombre de clés en cache)"""
+        with self._lock:
+            self._evict_locked(time.monotonic())
+            return len(self._cache)
+
+    def get_view(self, view_name: str, filters: Optional[Dict] = None,
+                 top: Optional[int] = None, skip: Optional[int] = None,
+                 select: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Retourne une vue depuis le cache, ou la récupère une seule fois
+        même si plusieurs clients la demandent en même temps
+        (erreur SAP : DataFrame vide marqué, voir is_upstream_error)
+        """
+        compact = self._get_compact(view_name, filters, top, skip, select)
+        return compact if is_upstream_error(compact) else expand_frame(compact)
+
+    def _get_compact(self, view_name: str, filters: Optional[Dict], top: Optional[int],
+                     skip: Optional[int], select: Optional[List[str]]) -> pd.DataFrame:
+        key = self.make_key(view_name, filters, top, skip, select)
+        now = time.monotonic()
+
+        with self._lock:
+            self.stats['requests'] += 1
+            self._last_requested[key] = now
+            cached = self._cache.get(key)
+
+        if cached and now - cached[0] < self.ttl:
+            with self._lock:
+                self.stats['cache_hits'] += 1
+            instrumentation.record_cache('data_service', True)
+            return cached[1]
+
+        # Une seule requête SAP par clé : les autres attendent son résultat
+        with self._key_lock(key):
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached and time.monotonic() - cached[0] < self.ttl:
+                with self._lock:
+                    self.stats['cache_hits'] += 1
+                instrumentation.record_cache('data_service', True)
+                return cached[1]
+            instrumentation.record_cache('data_service', False)
+            return self._fetch_upstream(key)
+
+    def cache_memory(self) -> int:
+        """Mémoire occupée par les vues en cache (octets)"""
+        with self._lock:
+            frames = [df for _, df in self._cache.values()]
+        return sum(frame_memory(df) for df in frames)
+
+    def sync_loop(self):
+        """Rafraîchit en arrière-plan les vues demandées récemment"""
+        while not self._stop.wait(self.sync_interval):
+            now = time.monotonic()
+            with self._lock:
+                self._evict_locked(now)
+                hot_keys = list(self._last_requested)
+            for key in hot_keys:
+                with self._key_lock(key):
+                    try:
+                        self._fetch_upstream(key)
+                    except Exception as e:
+                        logger.error(f"✗ Synchronisation {key[0]} échouée: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+
+def make_handler(service: DataService):
+    """Construit le handler HTTP lié à un DataService"""
+
+    class DataServiceHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _send(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+
+            if parsed.path == '/health':
+                body = json.dumps(dict(service.stats, cache_bytes=service.cache_memory())).encode('utf-8')
+                self._send(200, body, JSON_MIME)
+                return
+
+            if not parsed.path.startswith('/view/'):
+                self._send(404, b'{"error": "not found"}', JSON_MIME)
+                return
+
+            view_name = parsed.path[len('/view/'):]
+            query = parse_qs(parsed.query)
+            filters = json.loads(query['filters'][0]) if 'filters' in query else None
+            top = int(query['top'][0]) if 'top' in query else None
+            skip = int(query['skip'][0]) if 'skip' in query else None
+            select = query['select'][0].split(',') if 'select' in query else None
+
+            try:
+                df = service.get_view(view_name, filters=filters, top=top, skip=skip, select=select)
+            except Exception as e:
+                logger.error(f"✗ Erreur service pour {view_name}: {e}")
+                self._send(502, json.dumps({'error': str(e)}).encode('utf-8'), JSON_MIME)
+                return
+
+            if is_upstream_error(df):
+                self._send(502, json.dumps({'error': df.attrs['upstream_error']}).encode('utf-8'), JSON_MIME)
+                return
+
+            if pa is not None and ARROW_MIME in self.headers.get('Accept', ''):
+                try:
+                    self._send(200, frame_to_arrow(df), ARROW_MIME)
+                    return
+                except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                    logger.warning(f"⚠ Arrow impossible pour {view_name} ({e}), repli JSON")
+
+            self._send(200, df.to_json(orient='split', index=False).encode('utf-8'), JSON_MIME)
+
+    return DataServiceHandler
+
+
+class DataServiceClient:
+    """Client du service de données, même interface que ODataClient.fetch_view"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.session.headers['Accept'] = f"{ARROW_MIME}, {JSON_MIME}" if pa is not None else JSON_MIME
+        # Taille de la dernière réponse (instrumentation)
+        self.last_bytes = 0
+
+    def fetch_view(self, view_name: str, filters: Optional[Dict] = None,
+                   top: Optional[int] = None, skip: Optional[int] = None,
+                   select: Optional[List[str]] = None) -> pd.DataFrame:
+        params = {}
+        if filters:
+            params['filters'] = json.dumps(filters, sort_keys=True)
+        if top:
+            params['top'] = top
+        if skip:
+            params['skip'] = skip
+        if select:
+            params['select'] = ','.join(select)
+
+        self.last_bytes = 0
+        try:
+            response = self.session.get(f"{self.base_url}/view/{quote(view_name)}", params=params, timeout=60)
+            response.raise_for_status()
+            self.last_bytes = len(response.content)
+
+            if response.headers.get('Content-Type', '').startswith(ARROW_MIME):
+                return arrow_to_frame(response.content)
+            return pd.read_json(io.StringIO(response.text), orient='split', dtype=False)
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"✗ Service de données indisponible pour {view_name}: {e}")
+            return error_frame(str(e))
+
+
+def serve(port: int, host: str = '127.0.0.1') -> Tuple[ThreadingHTTPServer, DataService]:
+    """Démarre le service (serveur HTTP + synchro) dans des threads"""
+    service = DataService()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    threading.Thread(target=service.sync_loop, daemon=True).start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service de données ERPsim partagé")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=settings.DATA_SERVICE_PORT)
+    args = parser.parse_args()
+
+    server, service = serve(args.port, args.host)
+    logger.info(f"✓ Service de données sur http://{args.host}:{args.port} (SAP: {settings.ODATA_BASE_URL})")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        service.stop()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
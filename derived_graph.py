@@ -0,0 +1,257 @@
+"""
+Graphe de dépendances des résultats dérivés (recalcul minimal par step)
+
+Chaque résultat dérivé (résumé des ventes, analyse de marché, prix
+recommandés, réapprovisionnement, impact valorisation...) est un nœud qui
+déclare ses dépendances : des vues sources OData ou d'autres nœuds.
+
+À chaque nouveau step, seules les vues sources nécessaires sont relues et
+leur empreinte (hash du contenu) comparée à la précédente. Un nœud n'est
+recalculé que si l'empreinte d'une de ses dépendances (directes ou
+transitives) a changé ; sinon il est servi depuis la mémoire. Si Sales et
+Current_Inventory bougent mais pas Current_Pricing_Conditions, un nœud qui
+ne dépend que des prix n'est pas recalculé.
+
+Les nœuds appellent les méthodes existantes de l'analyseur et des moteurs,
+branchés sur un GameSnapshot qui leur sert les vues sources déjà lues. Les
+vues périmées sont relues ensemble par un QueryPlanner : une requête par
+vue, limitée à l'union des colonnes déclarées par les nœuds qui la lisent.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from query_planner import Needs, QueryPlanner
+from snapshot import GameSnapshot
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+def frame_fingerprint(df: pd.DataFrame) -> int:
+    """Empreinte du contenu d'une vue (colonnes techniques __* ignorées)"""
+    df = df[[c for c in df.columns if not str(c).startswith('__')]]
+    try:
+        values = int(pd.util.hash_pandas_object(df, index=False).sum())
+    except TypeError:
+        # Cellules non hashables (listes, dicts) : on passe par le texte
+        values = int(pd.util.hash_pandas_object(df.astype(str), index=False).sum())
+    return hash((len(df), tuple(df.columns), values))
+
+
+class DerivedNode:
+    """Résultat dérivé : fonction des valeurs de ses dépendances"""
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: List[str],
+                 needs: Optional[Needs] = None):
+        self.name = name
+        self.func = func
+        self.deps = deps
+        self.needs = needs or {}
+        self.value: Any = None
+        self.signature: Optional[Tuple] = None
+        self.computations = 0
+
+
+class DerivedGraph:
+    """
+    DAG des résultats dérivés au-dessus des vues sources
+
+    Usage:
+        graph = build_default_graph(analyzer)
+        graph.get('sales_summary', step=analyzer.get_step_key())
+    """
+
+    def __init__(self, client, top: int = 10000):
+        """
+        Args:
+            client: Client OData (ou service de données) pour les vues sources
+            top: Nombre de lignes lues par vue source
+        """
+        self.snapshot = GameSnapshot(client, top=top)
+        self.nodes: Dict[str, DerivedNode] = {}
+        self._fingerprints: Dict[str, int] = {}
+        self._source_step: Dict[str, Any] = {}
+        self._on_change: List[Callable[[List[str]], None]] = []
+        self._lock = threading.RLock()
+        self.stats = {'hits': 0, 'recomputed': 0, 'source_reads': 0}
+
+    # --- Construction ---
+
+    def add_node(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: List[str],
+                 needs: Optional[Needs] = None) -> 'DerivedGraph':
+        """
+        Ajoute un nœud
+
+        Args:
+            name: Nom du résultat
+            func: Fonction(dict des valeurs des dépendances) -> résultat
+            deps: Vues sources ou nœuds déjà déclarés
+            needs: Colonnes lues par vue source (cf. DATA_NEEDS) ; une vue
+                   source absente est lue en entier
+        """
+        self.nodes[name] = DerivedNode(name, func, deps, needs)
+        return self
+
+    def on_source_change(self, callback: Callable[[List[str]], None]):
+        """Appelé avec la liste des vues modifiées (ex: vider un cache interne)"""
+        self._on_change.append(callback)
+
+    def sources_of(self, name: str) -> List[str]:
+        """Vues sources dont dépend un nœud (transitivement)"""
+        if name not in self.nodes:
+            return [name]
+        sources = []
+        for dep in self.nodes[name].deps:
+            for source in self.sources_of(dep):
+                if source not in sources:
+                    sources.append(source)
+        return sources
+
+    # --- Sources ---
+
+    def _refresh_sources(self, views: List[str], step) -> List[str]:
+        """Relit les vues pas encore lues pour ce step ; retourne celles qui ont changé"""
+        stale = [v for v in views if v not in self._source_step or self._source_step[v] != step]
+        if not stale:
+            return []
+
+        # Chaque vue doit couvrir tous les nœuds qui la lisent, pas seulement ceux demandés
+        planner = QueryPlanner(self.snapshot.client)
+        for view in stale:
+            readers = [node for node in self.nodes.values() if view in node.deps]
+            if not readers:
+                planner.declare(view, view, top=self.snapshot.top)
+            for node in readers:
+                planner.declare(node.name, view, columns=node.needs.get(view), top=self.snapshot.top)
+        selects = {request.view: request.select for request in planner.plan()}
+        frames = planner.fetch()
+        self.stats['source_reads'] += len(stale)
+
+        changed = []
+        for view, df in frames.items():
+            fingerprint = frame_fingerprint(df)
+            if self._fingerprints.get(view) != fingerprint:
+                changed.append(view)
+                self._fingerprints[view] = fingerprint
+            self._source_step[view] = step
+
+        self.snapshot.update(frames, selects)
+        if changed:
+            logger.info(f"Vues modifiées: {', '.join(changed)}")
+            for callback in self._on_change:
+                callback(changed)
+        return changed
+
+    # --- Évaluation ---
+
+    def _signature(self, name: str) -> Any:
+        if name in self.nodes:
+            return self.nodes[name].signature
+        return self._fingerprints.get(name)
+
+    def _evaluate(self, name: str) -> Any:
+        if name not in self.nodes:
+            return self.snapshot.get_view(name)
+
+        node = self.nodes[name]
+        inputs = {dep: self._evaluate(dep) for dep in node.deps}
+        signature = tuple(self._signature(dep) for dep in node.deps)
+
+        if node.signature is not None and node.signature == signature:
+            self.stats['hits'] += 1
+            instrumentation.record_cache('derived', True)
+            return node.value
+
+        node.value = node.func(inputs)
+        node.signature = signature
+        node.computations += 1
+        self.stats['recomputed'] += 1
+        instrumentation.record_cache('derived', False)
+        return node.value
+
+    def get(self, name: str, step=None) -> Any:
+        """
+        Valeur d'un nœud pour le step donné (recalculée seulement si nécessaire)
+
+        Args:
+            name: Nom du nœud
+            step: Step de jeu courant ; les vues sources sont relues au
+                  changement de step (None : lues une seule fois)
+        """
+        if name not in self.nodes:
+            raise KeyError(f"Nœud inconnu: {name}")
+
+        with self._lock:
+            self._refresh_sources(self.sources_of(name), step)
+            return self._evaluate(name)
+
+    def status(self) -> pd.DataFrame:
+        """État des nœuds (dépendances sources, nombre de calculs)"""
+        return pd.DataFrame([{
+            'NODE': node.name,
+            'SOURCES': ', '.join(self.sources_of(node.name)),
+            'COMPUTATIONS': node.computations
+        } for node in self.nodes.values()])
+
+
+def build_default_graph(analyzer, client=None) -> DerivedGraph:
+    """
+    Graphe des résultats utilisés par le dashboard et la CLI
+
+    Les nœuds réutilisent l'analyseur et les moteurs existants, branchés
+    sur les vues sources du graphe.
+    """
+    from analyzer import ERPSimAnalyzer
+    from sales_engine import SalesEngine
+    from procurement_engine import ProcurementEngine
+    from finance_engine import FinanceEngine
+    from product_index import DATA_NEEDS as INDEX_NEEDS
+    from query_planner import merge_needs
+
+    graph = DerivedGraph(client or analyzer.client)
+    source = graph.snapshot
+
+    bound = ERPSimAnalyzer(client=source, valuation_tracker=analyzer.valuation_tracker,
+                           market_intelligence=analyzer.market_intelligence,
+                           product_index=analyzer.product_index,
+                           anomaly_detector=analyzer.anomaly_detector,
+                           ledger=analyzer.ledger)
+    sales = SalesEngine(bound, client=source)
+    procurement = ProcurementEngine(bound, client=source)
+    finance = FinanceEngine(bound, client=source)
+
+    # Le cache interne de l'analyseur lié ne doit pas survivre à un changement de données
+    graph.on_source_change(lambda changed: bound.cache.clear())
+
+    def needs(owner, *methods) -> Needs:
+        return merge_needs(*(owner.DATA_NEEDS[m] for m in methods))
+
+    market_needs = merge_needs(needs(ERPSimAnalyzer, 'get_market_share_cube'), INDEX_NEEDS)
+
+    graph.add_node('sales_summary', lambda i: bound.get_sales_summary(), ['Sales'],
+                   needs(ERPSimAnalyzer, 'get_sales_summary'))
+    graph.add_node('sales_by_area', lambda i: bound.get_sales_by_area(), ['Sales'],
+                   needs(ERPSimAnalyzer, 'get_sales_by_area'))
+    graph.add_node('sales_by_dc', lambda i: bound.get_sales_by_dc(), ['Sales'],
+                   needs(ERPSimAnalyzer, 'get_sales_by_dc'))
+    graph.add_node('market_analysis', lambda i: bound.get_market_analysis(), ['Market', 'Sales'], market_needs)
+    graph.add_node('market_share_matrix', lambda i: bound.get_market_share_matrix(), ['Market', 'Sales'],
+                   market_needs)
+    graph.add_node('price_recommendations', lambda i: sales.recommend_price_adjustments(),
+                   ['Market', 'Current_Pricing_Conditions', 'Sales', 'Current_Inventory'],
+                   merge_needs(needs(SalesEngine, 'recommend_price_adjustments'), INDEX_NEEDS))
+    graph.add_node('reorder', lambda i: procurement.check_reorder_needed(), ['Current_Inventory', 'Sales'],
+                   needs(ProcurementEngine, 'check_reorder_needed'))
+    graph.add_node('mrp', lambda i: procurement.calculate_mrp_needs(), ['Independent_Requirements', 'Current_Inventory'],
+                   needs(ProcurementEngine, 'calculate_mrp_needs'))
+    graph.add_node('cash_position', lambda i: finance.analyze_cash_position(), ['Company_Valuation'])
+    graph.add_node('valuation_impact',
+                   lambda i: finance.calculate_valuation_impact(i['cash_position'].get('profit', 0),
+                                                                i['cash_position'].get('loan', 0)),
+                   ['cash_position'])
+
+    return graph
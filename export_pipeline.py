@@ -0,0 +1,274 @@
+"""
+Pipeline d'export du rapport de performance (Excel / Parquet / CSV)
+
+Les vues sont récupérées en parallèle (au plus max_workers à la fois), puis
+écrites une par une au fil de l'eau : chaque DataFrame est libéré dès qu'il
+est écrit (hors feuilles gardées pour le RESUME). En Excel, le
+classeur est écrit en mode constant_memory (ligne par ligne), donc la
+mémoire ne dépend pas de la taille du rapport.
+"""
+
+import os
+import threading
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Feuilles du rapport -> méthode de l'analyseur (cf. generate_performance_report)
+REPORT_SECTIONS = {
+    'valuation': 'get_company_valuation',
+    'sales_summary': 'get_sales_summary',
+    'sales_by_area': 'get_sales_by_area',
+    'sales_by_dc': 'get_sales_by_dc',
+    'inventory': 'get_current_inventory',
+    'production': 'get_production_orders',
+    'purchases': 'get_purchase_orders'
+}
+
+EXCEL_MAX_ROWS = 1_048_576
+CHUNK_ROWS = 10_000
+
+
+def build_summary(valuation_df: Optional[pd.DataFrame], sales_df: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Page de garde (RESUME) : valorisation finale et ventes"""
+    summary_data = []
+
+    # KPI: Valuation
+    if valuation_df is not None and not valuation_df.empty:
+        last_val = valuation_df.iloc[-1]
+        summary_data.append({"Métrique": "Valorisation Finale", "Valeur": last_val.get('COMPANY_VALUATION', 0)})
+        summary_data.append({"Métrique": "Credit Rating", "Valeur": last_val.get('CREDIT_RATING', 'N/A')})
+        summary_data.append({"Métrique": "Profit Total", "Valeur": last_val.get('PROFIT', 0)})
+
+    # KPI: Sales
+    if sales_df is not None and not sales_df.empty:
+        total_rev = sales_df['NET_VALUE'].sum()
+        summary_data.append({"Métrique": "Chiffre d'Affaires Total", "Valeur": total_rev})
+        top_prod = sales_df.iloc[0]
+        summary_data.append({"Métrique": "Meilleur Produit", "Valeur": f"{top_prod['MATERIAL_DESCRIPTION']} (€{top_prod['NET_VALUE']:,.0f})"})
+
+    return pd.DataFrame(summary_data, columns=["Métrique", "Valeur"])
+
+
+def _clean(df: pd.DataFrame) -> pd.DataFrame:
+    """Retire les colonnes techniques OData (__metadata, ...)"""
+    return df[[c for c in df.columns if not str(c).startswith('__')]]
+
+
+class ExportJob:
+    """
+    Export du rapport en tâche de fond, avec suivi de progression
+
+    Usage:
+        job = ExportJob(analyzer, "rapport.xlsx").start()
+        ...
+        job.progress, job.message, job.status  # 'pending', 'running', 'done', 'error'
+    """
+
+    FORMATS = ('xlsx', 'parquet', 'csv')
+
+    @classmethod
+    def infer_format(cls, path: str) -> str:
+        """Format déduit de l'extension (.xlsx, .parquet, .csv ; dossier sans extension -> csv)"""
+        ext = os.path.splitext(path.rstrip('/\\'))[1].lower().lstrip('.')
+        if not ext:
+            return 'csv'
+        if ext not in cls.FORMATS:
+            raise ValueError(f"Extension non reconnue: {path} (formats: {', '.join(cls.FORMATS)})")
+        return ext
+
+    def __init__(self, analyzer, path: str, fmt: Optional[str] = None,
+                 sections: Optional[Dict[str, str]] = None, summary: bool = False,
+                 max_workers: int = 4,
+                 on_progress: Optional[Callable[[float, str], None]] = None):
+        """
+        Args:
+            analyzer: ERPSimAnalyzer
+            path: Fichier .xlsx, ou dossier pour parquet/csv (un fichier par feuille)
+            fmt: 'xlsx', 'parquet' ou 'csv' (défaut: déduit de l'extension, cf. infer_format)
+            sections: Dict[feuille] -> méthode de l'analyseur (défaut: REPORT_SECTIONS)
+            summary: Ajouter une feuille RESUME en tête
+            max_workers: Nombre de vues récupérées en parallèle
+            on_progress: Callback(progression 0-1, message)
+        """
+        self.analyzer = analyzer
+        self.path = path
+        self.fmt = fmt or self.infer_format(path)
+        if self.fmt not in self.FORMATS:
+            raise ValueError(f"Format inconnu: {self.fmt}")
+        self.sections = sections or REPORT_SECTIONS
+        self.summary = summary
+        self.max_workers = max_workers
+        self.on_progress = on_progress
+
+        self.status = 'pending'
+        self.progress = 0.0
+        self.message = ''
+        self.error: Optional[str] = None
+        self.rows_written: Dict[str, int] = {}
+        self._steps_done = 0
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Suivi ---
+
+    def _advance(self, message: str):
+        # 2 étapes par feuille : récupération + écriture
+        self._steps_done += 1
+        self.progress = min(1.0, self._steps_done / (2 * len(self.sections)))
+        self.message = message
+        if self.on_progress:
+            self.on_progress(self.progress, message)
+
+    # --- Exécution ---
+
+    def start(self) -> 'ExportJob':
+        """Lance l'export dans un thread de fond"""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attend la fin de l'export ; True si terminé"""
+        if self._thread:
+            self._thread.join(timeout)
+        return self.status in ('done', 'error')
+
+    def run(self) -> 'ExportJob':
+        """Exécute l'export (bloquant)"""
+        self.status = 'running'
+        try:
+            writer = self._open_writer()
+            kept = {}
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                # Fenêtre bornée : au plus max_workers vues en attente d'écriture
+                pending = iter(self.sections.items())
+                futures = {}
+
+                def submit_next():
+                    for name, method in pending:
+                        futures[pool.submit(getattr(self.analyzer, method))] = name
+                        return
+
+                for _ in range(self.max_workers):
+                    submit_next()
+
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        # Retirer la tâche libère son résultat une fois écrit
+                        name = futures.pop(future)
+                        df = future.result()
+                        del future
+                        submit_next()
+                        self._advance(f"{name} récupéré ({len(df)} lignes)")
+
+                        if self.summary and name in ('valuation', 'sales_summary'):
+                            kept[name] = df
+
+                        if not df.empty:
+                            writer(name, _clean(df))
+                        self.rows_written[name] = len(df)
+                        self._advance(f"{name} écrit")
+                        del df
+                    del done
+
+            if self.summary:
+                writer('RESUME', build_summary(kept.get('valuation'), kept.get('sales_summary')))
+
+            self._close_writer()
+            self.status = 'done'
+            self.progress = 1.0
+            self.message = f"Rapport exporté: {self.path}"
+            logger.info(f"✓ {self.message}")
+
+        except Exception as e:
+            self.status = 'error'
+            self.error = str(e)
+            self.message = f"Erreur lors de l'export: {e}"
+            logger.error(f"✗ {self.message}")
+            self._close_writer()
+
+        return self
+
+    # --- Écriture ---
+
+    def _open_writer(self) -> Callable[[str, pd.DataFrame], None]:
+        if self.fmt == 'xlsx':
+            import xlsxwriter
+
+            self._workbook = xlsxwriter.Workbook(self.path, {'constant_memory': True})
+            # RESUME en premier onglet, rempli à la fin
+            self._summary_sheet = self._workbook.add_worksheet('RESUME') if self.summary else None
+            return self._write_excel_sheet
+
+        os.makedirs(self.path, exist_ok=True)
+        return self._write_parquet if self.fmt == 'parquet' else self._write_csv
+
+    def _close_writer(self):
+        workbook = getattr(self, '_workbook', None)
+        if workbook is not None:
+            self._workbook = None
+            workbook.close()
+
+    @staticmethod
+    def _iter_chunks(df: pd.DataFrame):
+        for start in range(0, len(df), CHUNK_ROWS):
+            chunk = df.iloc[start:start + CHUNK_ROWS]
+            # NaN -> cellule vide
+            yield chunk.astype(object).where(chunk.notna(), None)
+
+    def _write_excel_sheet(self, name: str, df: pd.DataFrame):
+        if name == 'RESUME' and self._summary_sheet is not None:
+            sheets = [self._summary_sheet]
+        else:
+            sheets = [self._workbook.add_worksheet(name[:31])]
+
+        columns = [str(c) for c in df.columns]
+        worksheet = sheets[0]
+        worksheet.write_row(0, 0, columns)
+        row = 1
+
+        for chunk in self._iter_chunks(df):
+            for values in chunk.itertuples(index=False, name=None):
+                if row >= EXCEL_MAX_ROWS:
+                    # Feuille pleine : on continue sur une nouvelle feuille
+                    worksheet = self._workbook.add_worksheet(f"{name[:27]}_{len(sheets) + 1}")
+                    sheets.append(worksheet)
+                    worksheet.write_row(0, 0, columns)
+                    row = 1
+                worksheet.write_row(row, 0, values)
+                row += 1
+
+    def _write_csv(self, name: str, df: pd.DataFrame):
+        df.to_csv(os.path.join(self.path, f"{name}.csv"), index=False, chunksize=CHUNK_ROWS)
+
+    def _write_parquet(self, name: str, df: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        target = os.path.join(self.path, f"{name}.parquet")
+        if df.empty:
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), target)
+            return
+
+        writer = None
+        try:
+            for start in range(0, len(df), CHUNK_ROWS):
+                table = pa.Table.from_pandas(df.iloc[start:start + CHUNK_ROWS], preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(target, table.schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+def export_report(analyzer, path: str, fmt: Optional[str] = None, summary: bool = False,
+                  on_progress: Optional[Callable[[float, str], None]] = None) -> ExportJob:
+    """Exporte le rapport de façon bloquante (scripts / CLI)"""
+    return ExportJob(analyzer, path, fmt=fmt, summary=summary, on_progress=on_progress).run()
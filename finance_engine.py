@@ -3,19 +3,50 @@ Moteur de décision financier
 """
 
 import pandas as pd
-from typing import Dict, Tuple
+import numpy as np
+from typing import Dict, Tuple, Optional
 from odata_client import ODataClient
+from inventory_valuation import InventoryValuationEngine
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Plancher de liquidité (cash minimum à conserver)
+LIQUIDITY_FLOOR = 500_000
+
+# Paliers de rating (emprunt max inclus -> rating, taux d'actualisation)
+RATING_DEBT_BOUNDS = np.array([1_000_000, 2_000_000, 5_000_000, 8_000_000])
+RATING_LABELS = np.array(['AAA+', 'AA+', 'A', 'BBB', 'B'])
+RATING_DISCOUNT_RATES = np.array([0.10, 0.105, 0.12, 0.15, 0.20])
+
+
+def rating_index(debt) -> np.ndarray:
+    """Index du palier de rating pour un emprunt (scalaire ou tableau)"""
+    return np.searchsorted(RATING_DEBT_BOUNDS, np.asarray(debt, dtype=float), side='left')
+
 
 class FinanceEngine:
     """Moteur de décision financier"""
 
-    def __init__(self, analyzer):
+    # Colonnes lues par méthode (cf. QueryPlanner.declare_needs). La position
+    # de trésorerie passe par le suivi incrémental de valorisation ; les
+    # colonnes de prix de Purchase_Orders varient, la vue est lue en entier.
+    DATA_NEEDS = {
+        'analyze_cash_position': {},
+        'get_debt_payoff_recommendation': {},
+        'get_daily_sales_baseline': {'Sales': ['SIM_ROUND', 'SIM_STEP', 'NET_VALUE', 'COST']},
+        'get_open_purchase_commitments': {'Purchase_Orders': None},
+        'calculate_stock_costs': {
+            'Current_Inventory': ['MATERIAL_NUMBER', 'STORAGE_LOCATION', 'STOCK'],
+            'Sales': ['MATERIAL_NUMBER', 'COST', 'QUANTITY'],
+            'Purchase_Orders': None,
+        },
+    }
+
+    def __init__(self, analyzer, client=None):
         self.analyzer = analyzer
-        self.client = ODataClient()
+        self.client = client or ODataClient()
+        self.inventory_valuation = InventoryValuationEngine(analyzer, client)
 
     def analyze_cash_position(self) -> Dict:
         """
@@ -24,13 +55,13 @@ class FinanceEngine:
         Returns:
             Dict avec metriques financieres
         """
-        valuation_df = self.client.fetch_view("Company_Valuation", top=10000)
+        tracker = self.analyzer.valuation_tracker
+        tracker.refresh()
+        latest = tracker.latest()
 
-        if valuation_df.empty:
+        if not latest:
             return {}
 
-        latest = valuation_df.iloc[-1]
-
         cash = float(latest.get('BANK_CASH_ACCOUNT', 0))
         loan = float(latest.get('BANK_LOAN', 0))
         receivables = float(latest.get('ACCOUNTS_RECEIVABLE', 0))
@@ -57,6 +88,10 @@ class FinanceEngine:
         """
         Recommande si et comment payer la dette
 
+        Les paliers de rating portent sur l'emprunt (dette brute) : un
+        remboursement pris sur le cash le réduit, alors qu'il laisse la dette
+        nette inchangée.
+
         Returns:
             Dict avec recommendations
         """
@@ -67,37 +102,29 @@ class FinanceEngine:
 
         cash = analysis['cash']
         loan = analysis['loan']
-        net_debt = analysis['net_debt']
         credit_rating = analysis['credit_rating']
 
-        # Seuils par rating
-        rating_thresholds = {
-            'AAA+': 1_000_000,
-            'AA+': 2_000_000,
-            'A': 5_000_000,
-            'BBB': 8_000_000,
-            'B': 14_000_000
-        }
-
-        target_debt = rating_thresholds.get(credit_rating, 5_000_000)
+        # Palier visé : celui juste au-dessus du palier actuel de l'emprunt
+        tier = int(rating_index(loan))
+        target_debt = float(RATING_DEBT_BOUNDS[max(tier - 1, 0)])
 
         recommendation = {
-            'current_net_debt': net_debt,
-            'target_net_debt': target_debt,
+            'current_loan': loan,
+            'target_loan': target_debt,
             'available_cash': cash,
             'current_rating': credit_rating,
-            'can_improve_rating': net_debt > target_debt
+            'can_improve_rating': loan > target_debt
         }
 
-        if net_debt > target_debt and cash > 1_000_000:
-            # Recommander le paiement
-            amount_to_pay = min(net_debt - target_debt, cash - 500_000)
+        if loan > target_debt and cash > LIQUIDITY_FLOOR:
+            # Recommander le paiement, sans descendre sous le plancher de liquidité
+            amount_to_pay = min(loan - target_debt, cash - LIQUIDITY_FLOOR)
 
             recommendation['action'] = 'PAYER DETTE'
             recommendation['amount_to_pay'] = amount_to_pay
-            recommendation['reason'] = f"Reduire le net debt de €{net_debt:,.0f} a €{target_debt:,.0f}"
+            recommendation['reason'] = f"Reduire l'emprunt de €{loan:,.0f} a €{loan - amount_to_pay:,.0f}"
 
-        elif cash < 500_000:
+        elif cash < LIQUIDITY_FLOOR:
             recommendation['action'] = 'CONSERVER CASH'
             recommendation['reason'] = 'Liquidite insuffisante'
 
@@ -107,6 +134,261 @@ class FinanceEngine:
 
         return recommendation
 
+    def get_daily_sales_baseline(self) -> Dict[str, float]:
+        """
+        Estime le chiffre d'affaires et le coût des ventes moyens par jour
+        (un jour = un SIM_STEP) à partir de l'historique Sales
+
+        Returns:
+            Dict avec 'revenue' et 'cost' quotidiens
+        """
+        sales_df = self.client.fetch_view("Sales", top=10000)
+
+        if sales_df.empty:
+            return {'revenue': 0.0, 'cost': 0.0}
+
+        for col in ['NET_VALUE', 'COST']:
+            if col in sales_df.columns:
+                sales_df[col] = pd.to_numeric(sales_df[col], errors='coerce').fillna(0)
+            else:
+                sales_df[col] = 0.0
+
+        # Nombre de jours observés (round x step)
+        step_cols = [c for c in ['SIM_ROUND', 'SIM_STEP'] if c in sales_df.columns]
+        num_days = len(sales_df[step_cols].drop_duplicates()) if step_cols else 1
+        num_days = max(num_days, 1)
+
+        return {
+            'revenue': float(sales_df['NET_VALUE'].sum()) / num_days,
+            'cost': float(sales_df['COST'].sum()) / num_days
+        }
+
+    def get_open_purchase_commitments(self, horizon: int, lead_days: int = 1) -> np.ndarray:
+        """
+        Montant des commandes d'achat ouvertes, par jour de livraison projeté
+
+        Une commande non livrée est facturée à sa livraison, `lead_days` jours
+        après le jour de commande (au plus tôt le premier jour projeté) ; une
+        commande d'un round précédent est due tout de suite.
+
+        Args:
+            horizon: Nombre de jours projetés
+            lead_days: Délai de livraison fournisseur (jours)
+
+        Returns:
+            Tableau (horizon,) des achats engagés par jour
+        """
+        commitments = np.zeros(horizon)
+        po_df = self.client.fetch_view("Purchase_Orders", top=10000)
+
+        if po_df.empty or 'STATUS' not in po_df.columns:
+            return commitments
+
+        open_po = po_df[po_df['STATUS'].astype(str) != 'Delivered']
+        if open_po.empty:
+            return commitments
+
+        if 'NET_VALUE' in open_po.columns:
+            amounts = pd.to_numeric(open_po['NET_VALUE'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        elif {'QUANTITY', 'NET_PRICE'} <= set(open_po.columns):
+            amounts = (pd.to_numeric(open_po['QUANTITY'], errors='coerce').fillna(0)
+                       * pd.to_numeric(open_po['NET_PRICE'], errors='coerce').fillna(0)).to_numpy(dtype=float)
+        else:
+            return commitments
+
+        # Âge de la commande en jours (commandes des rounds précédents : déjà dues)
+        age = np.full(len(open_po), lead_days)
+        step = self.analyzer.valuation_tracker.current_step()
+        if step is not None and {'SIM_ROUND', 'SIM_STEP'} <= set(open_po.columns):
+            po_round = pd.to_numeric(open_po['SIM_ROUND'], errors='coerce').fillna(0).to_numpy()
+            po_step = pd.to_numeric(open_po['SIM_STEP'], errors='coerce').fillna(0).to_numpy()
+            age = np.where(po_round == step[0], step[1] - po_step, lead_days)
+
+        # Jour 0 = premier jour projeté (lendemain du step courant)
+        due = np.maximum(lead_days - age - 1, 0).astype(int)
+        in_horizon = due < horizon
+        commitments += np.bincount(due[in_horizon], weights=amounts[in_horizon], minlength=horizon)[:horizon]
+        return commitments
+
+    @staticmethod
+    def purchase_schedule(commitments: np.ndarray, daily_cost) -> np.ndarray:
+        """
+        Achats facturés par jour : les commandes ouvertes d'abord, puis la
+        moyenne du coût des ventes une fois ces engagements épuisés
+
+        Args:
+            commitments: Achats engagés par jour (get_open_purchase_commitments)
+            daily_cost: Coût des ventes quotidien (scalaire ou un par scénario)
+
+        Returns:
+            Matrice (n_scenarios, horizon)
+        """
+        commitments = np.asarray(commitments, dtype=float)
+        daily_cost = np.atleast_1d(np.asarray(daily_cost, dtype=float))[:, None]
+        committed = np.flatnonzero(commitments)
+        covered = committed[-1] + 1 if len(committed) else 0
+        days = np.arange(len(commitments))
+        return np.where(days < covered, commitments, daily_cost)
+
+    @staticmethod
+    def roll_forward_cash(start: Dict[str, float], sales: np.ndarray,
+                          purchases: np.ndarray, storage_fees: np.ndarray,
+                          debt_payoff: np.ndarray, receivable_days: float = 5,
+                          payable_days: float = 5,
+                          annual_interest_rate: float = 0.08) -> Dict[str, np.ndarray]:
+        """
+        Fait avancer cash, créances, dettes fournisseurs et emprunt jour par jour
+
+        Tous les flux sont des matrices (n_scenarios, horizon) : chaque ligne
+        est un scénario, chaque colonne un jour. Les scénarios sont calculés
+        ensemble, seule la boucle sur l'horizon est séquentielle.
+
+        Un remboursement est plafonné à l'emprunt restant et au cash du jour
+        ('paid_off' donne le montant réellement payé) : il ne rend jamais le
+        cash négatif. Le cash peut en revanche passer sous zéro sur les seuls
+        flux d'exploitation ; le respect du plancher de liquidité est laissé
+        à l'appelant (voir FEASIBLE dans simulate_debt_payoff_grid).
+
+        Args:
+            start: Position initiale (cash, receivables, payables, loan)
+            sales: Ventes facturées par jour
+            purchases: Achats facturés par jour
+            storage_fees: Frais de stockage payés par jour
+            debt_payoff: Remboursement d'emprunt demandé par jour
+            receivable_days: Délai moyen d'encaissement des clients (jours)
+            payable_days: Délai moyen de paiement des fournisseurs (jours)
+            annual_interest_rate: Taux d'intérêt annuel de l'emprunt
+
+        Returns:
+            Dict[metrique] -> matrice (n_scenarios, horizon)
+        """
+        sales, purchases, storage_fees, debt_payoff = np.broadcast_arrays(
+            np.atleast_2d(np.asarray(sales, dtype=float)),
+            np.atleast_2d(np.asarray(purchases, dtype=float)),
+            np.atleast_2d(np.asarray(storage_fees, dtype=float)),
+            np.atleast_2d(np.asarray(debt_payoff, dtype=float))
+        )
+        n_scenarios, horizon = sales.shape
+
+        cash = np.full(n_scenarios, float(start.get('cash', 0)))
+        receivables = np.full(n_scenarios, float(start.get('receivables', 0)))
+        payables = np.full(n_scenarios, float(start.get('payables', 0)))
+        loan = np.full(n_scenarios, float(start.get('loan', 0)))
+
+        daily_rate = annual_interest_rate / 365
+        collect_rate = 1 / max(receivable_days, 1)
+        pay_rate = 1 / max(payable_days, 1)
+
+        out = {name: np.empty((n_scenarios, horizon))
+               for name in ['cash', 'receivables', 'payables', 'loan', 'interest', 'paid_off']}
+
+        for t in range(horizon):
+            collected = receivables * collect_rate
+            paid = payables * pay_rate
+            interest = loan * daily_rate
+            cash = cash + collected - paid - storage_fees[:, t] - interest
+            # On ne rembourse jamais plus que l'emprunt restant ni que le cash disponible
+            paid_off = np.clip(np.minimum(debt_payoff[:, t], loan), 0, np.maximum(cash, 0))
+
+            receivables = receivables + sales[:, t] - collected
+            payables = payables + purchases[:, t] - paid
+            loan = loan - paid_off
+            cash = cash - paid_off
+
+            out['cash'][:, t] = cash
+            out['receivables'][:, t] = receivables
+            out['payables'][:, t] = payables
+            out['loan'][:, t] = loan
+            out['interest'][:, t] = interest
+            out['paid_off'][:, t] = paid_off
+
+        out['net_debt'] = (out['loan'] + out['payables']) - (out['cash'] + out['receivables'])
+
+        return out
+
+    def project_cash_flow(self, horizon: int = 10,
+                          scenarios: Optional[Dict[str, Dict]] = None,
+                          receivable_days: float = 5, payable_days: float = 5,
+                          annual_interest_rate: float = 0.08) -> pd.DataFrame:
+        """
+        Projette la trésorerie jour par jour pour plusieurs scénarios à la fois
+
+        Chaque scénario peut définir :
+        - price_factor: Multiplicateur de prix (1.05 = +5%)
+        - elasticity: Élasticité prix du volume (défaut -2.5)
+        - sales / purchases: Ventes / achats quotidiens (scalaire ou liste par jour ;
+          défaut: commandes d'achat ouvertes à leur livraison, puis coût des ventes moyen)
+        - storage_fees: Frais de stockage quotidiens
+        - debt_payoff: Montant remboursé sur l'emprunt
+        - payoff_step: Jour du remboursement (0 = aujourd'hui)
+
+        Args:
+            horizon: Nombre de jours à projeter
+            scenarios: Dict[nom] -> paramètres (défaut: scénario de base seul)
+
+        Returns:
+            DataFrame (SCENARIO, STEP, CASH, RECEIVABLES, PAYABLES, LOAN,
+            NET_DEBT, INTEREST) avec une ligne par scénario et par jour
+        """
+        start = self.analyze_cash_position()
+
+        if not start:
+            return pd.DataFrame()
+
+        baseline = self.get_daily_sales_baseline()
+        stock_costs = self.calculate_stock_costs()
+        base_storage = stock_costs.get('storage_fees_daily', 0) if stock_costs else 0
+        commitments = self.get_open_purchase_commitments(horizon)
+
+        if not scenarios:
+            scenarios = {'Base': {}}
+
+        names = list(scenarios.keys())
+        n_scenarios = len(names)
+        shape = (n_scenarios, horizon)
+
+        sales = np.empty(shape)
+        purchases = np.empty(shape)
+        storage_fees = np.empty(shape)
+        debt_payoff = np.zeros(shape)
+
+        for i, name in enumerate(names):
+            spec = scenarios[name]
+            price_factor = spec.get('price_factor', 1.0)
+            elasticity = spec.get('elasticity', -2.5)
+            # Même modèle que predict_revenue : %Q = E * %P
+            volume_factor = max(0.0, 1 + elasticity * (price_factor - 1.0))
+
+            sales[i] = spec.get('sales', baseline['revenue'] * price_factor * volume_factor)
+            if 'purchases' in spec:
+                purchases[i] = spec['purchases']
+            else:
+                # Commandes ouvertes (engagées quel que soit le prix), puis coût des ventes
+                purchases[i] = self.purchase_schedule(commitments, baseline['cost'] * volume_factor)[0]
+            storage_fees[i] = spec.get('storage_fees', base_storage)
+
+            payoff_step = int(spec.get('payoff_step', 0))
+            if spec.get('debt_payoff') and 0 <= payoff_step < horizon:
+                debt_payoff[i, payoff_step] = spec['debt_payoff']
+
+        projection = self.roll_forward_cash(
+            start, sales, purchases, storage_fees, debt_payoff,
+            receivable_days=receivable_days,
+            payable_days=payable_days,
+            annual_interest_rate=annual_interest_rate
+        )
+
+        return pd.DataFrame({
+            'SCENARIO': np.repeat(names, horizon),
+            'STEP': np.tile(np.arange(1, horizon + 1), n_scenarios),
+            'CASH': projection['cash'].ravel(),
+            'RECEIVABLES': projection['receivables'].ravel(),
+            'PAYABLES': projection['payables'].ravel(),
+            'LOAN': projection['loan'].ravel(),
+            'NET_DEBT': projection['net_debt'].ravel(),
+            'INTEREST': projection['interest'].ravel()
+        })
+
     def get_profitability_by_product(self) -> pd.DataFrame:
         """
         Analyse la profitabilité par produit
@@ -165,9 +447,9 @@ class FinanceEngine:
             'AMOUNT': 'sum'
         }).reset_index()
 
-    def calculate_valuation_impact(self, current_profit: float, current_net_debt: float) -> Dict:
+    def calculate_valuation_impact(self, current_profit: float, current_loan: float) -> Dict:
         """
-        Calcule l'impact de la dette sur la valorisation
+        Calcule l'impact de la dette (emprunt) sur la valorisation
         Basé sur la formule : Valorisation = Profit / Taux d'actualisation
         Taux : 
         - AAA+ (Dette < 1M) : 10%
@@ -178,16 +460,8 @@ class FinanceEngine:
         """
         # 1. Déterminer le rating actuel (approximatif basé sur la dette)
         # Note: Le rating dépend aussi d'autres facteurs, mais la dette est majeure.
-        
-        def get_discount_rate(debt):
-            if debt <= 1_000_000: return 0.10  # AAA+
-            if debt <= 2_000_000: return 0.105 # AA+
-            if debt <= 5_000_000: return 0.12  # A
-            if debt <= 8_000_000: return 0.15  # BBB
-            return 0.20                        # B
-            
-        current_rate = get_discount_rate(current_net_debt)
-        target_rate = 0.10 # Objectif AAA+
+        current_rate = float(RATING_DISCOUNT_RATES[rating_index(current_loan)])
+        target_rate = float(RATING_DISCOUNT_RATES[0]) # Objectif AAA+
         
         current_valuation = current_profit / current_rate if current_rate > 0 else 0
         potential_valuation = current_profit / target_rate
@@ -203,26 +477,120 @@ class FinanceEngine:
             'is_optimized': current_rate == target_rate
         }
 
+    def simulate_debt_payoff_grid(self, amounts: Optional[np.ndarray] = None,
+                                  steps: Optional[np.ndarray] = None,
+                                  horizon: int = 10,
+                                  liquidity_floor: float = LIQUIDITY_FLOOR,
+                                  annual_interest_rate: float = 0.08) -> Dict:
+        """
+        Évalue une grille de remboursements (montant x jour) en une seule passe
+
+        Chaque point de la grille est projeté avec roll_forward_cash, puis
+        converti en rating, taux d'actualisation et valorisation
+        (Profit / Taux, même règle que calculate_valuation_impact).
+        Le rating vient de l'emprunt projeté en fin d'horizon (la dette
+        nette, elle, ne bouge pas : un remboursement pris sur le cash baisse
+        l'emprunt et le cash du même montant).
+        Un point est faisable si le cash ne passe jamais sous le plancher
+        de liquidité pendant l'horizon.
+
+        Args:
+            amounts: Montants de remboursement à tester (défaut: 0 -> emprunt, 41 points)
+            steps: Jours de remboursement à tester (défaut: 0 -> horizon-1)
+            horizon: Nombre de jours projetés
+            liquidity_floor: Cash minimum à conserver
+
+        Returns:
+            Dict avec 'grid' (DataFrame) et 'optimum' (Dict de la meilleure ligne faisable)
+        """
+        start = self.analyze_cash_position()
+
+        if not start:
+            return {}
+
+        if amounts is None:
+            amounts = np.linspace(0, max(start['loan'], 0), 41)
+        if steps is None:
+            steps = np.arange(horizon)
+
+        amounts = np.asarray(amounts, dtype=float)
+        steps = np.asarray(steps, dtype=int)
+        steps = steps[(steps >= 0) & (steps < horizon)]
+
+        baseline = self.get_daily_sales_baseline()
+        stock_costs = self.calculate_stock_costs()
+        base_storage = stock_costs.get('storage_fees_daily', 0) if stock_costs else 0
+        purchases = self.purchase_schedule(self.get_open_purchase_commitments(horizon), baseline['cost'])
+
+        # Grille aplatie : une ligne de scénario par couple (montant, jour)
+        grid_amounts = np.repeat(amounts, len(steps))
+        grid_steps = np.tile(steps, len(amounts))
+        n_scenarios = len(grid_amounts)
+
+        debt_payoff = np.zeros((n_scenarios, horizon))
+        debt_payoff[np.arange(n_scenarios), grid_steps] = grid_amounts
+
+        projection = self.roll_forward_cash(
+            start,
+            np.full((1, horizon), baseline['revenue']),
+            purchases,
+            np.full((1, horizon), base_storage),
+            debt_payoff,
+            annual_interest_rate=annual_interest_rate
+        )
+
+        paid = projection['paid_off'].sum(axis=1)
+        # Intérêts économisés par rapport à un scénario sans remboursement
+        no_payoff_interest = start['loan'] * annual_interest_rate / 365 * horizon
+        interest_saved = no_payoff_interest - projection['interest'].sum(axis=1)
+
+        loan_after = projection['loan'][:, -1]
+        idx = rating_index(loan_after)
+        rates = RATING_DISCOUNT_RATES[idx]
+        profit_after = start['profit'] + interest_saved
+        valuation = profit_after / rates
+        min_cash = projection['cash'].min(axis=1)
+        feasible = min_cash >= liquidity_floor
+
+        grid = pd.DataFrame({
+            'AMOUNT': grid_amounts,
+            'STEP': grid_steps,
+            'PAID': paid,
+            'LOAN_AFTER': loan_after,
+            'NET_DEBT_AFTER': projection['net_debt'][:, -1],
+            'RATING': RATING_LABELS[idx],
+            'DISCOUNT_RATE': rates,
+            'PROFIT_AFTER': profit_after,
+            'VALUATION': valuation,
+            'MIN_CASH': min_cash,
+            'FEASIBLE': feasible
+        })
+
+        optimum = {}
+        if feasible.any():
+            # Meilleure valorisation, puis le plus petit montant à valorisation égale
+            candidates = grid[feasible].sort_values(['VALUATION', 'AMOUNT'], ascending=[False, True])
+            optimum = candidates.iloc[0].to_dict()
+
+        return {'grid': grid, 'optimum': optimum}
+
     def calculate_stock_costs(self) -> Dict:
         """
         Calcule les coûts de stockage et l'immobilisation financière
         Seuil critique : 250,000 unités
         Coût dépassement : 500€/jour par 50k unités
-        Coût standard moyen : ~1.38€ (pour valoriser le cash trap)
+        Cash trap : stock valorisé au coût unitaire de chaque matériau
+        (voir InventoryValuationEngine, ~1.38€ par défaut)
         """
-        inventory_df = self.client.fetch_view("Current_Inventory", top=10000)
+        valuation = self.inventory_valuation.value_inventory()
         
-        if inventory_df.empty:
+        if not valuation:
              return {}
              
-        if 'STOCK' in inventory_df.columns:
-            inventory_df['STOCK'] = pd.to_numeric(inventory_df['STOCK'], errors='coerce').fillna(0)
-            
-        total_units = inventory_df['STOCK'].sum()
+        total_units = valuation['detail']['STOCK'].sum()
         
         # Coût cash trap (argent qui dort)
-        # Estimation : 1.38€ par unité (Muesli standard)
-        cash_trap = total_units * 1.38
+        cash_trap = valuation['detail']['TIED_UP_CAPITAL'].sum()
         
         # Frais de stockage (Estimes - ERPsim Rules)
         # Gratuit jusqu'a 250k
@@ -235,7 +603,9 @@ class FinanceEngine:
             
         return {
             'total_units': int(total_units),
-            'cash_trap': cash_trap,
+            'cash_trap': float(cash_trap),
+            'by_category': valuation['by_category'],
+            'by_material': valuation['by_material'],
             'storage_fees_daily': storage_fees,
             'is_critical': total_units > 250_000
         }
@@ -0,0 +1,112 @@
+"""
+Client en mémoire (interface ODataClient) pour les tests et le banc de mesure
+
+Sert les vues d'une partie synthétique (voir synthetic_game.py) ou des
+DataFrames construits à la main (`FrameClient.from_frames`), peut noter
+chaque requête et simuler une erreur SAP.
+"""
+
+import types
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from odata_client import error_frame
+
+
+class FrameClient:
+    """
+    Vues servies en mémoire (interface ODataClient)
+
+    Chaque appel reçoit une copie superficielle : les moteurs peuvent
+    remplacer des colonnes sans toucher la vue partagée.
+    """
+
+    def __init__(self, game, honor_top: bool = False, text_decimals: bool = False, record: bool = False):
+        """
+        Args:
+            game: SyntheticGame (ou tout objet avec une méthode view(nom))
+            honor_top: Appliquer le `top` demandé par les moteurs
+            text_decimals: Décimaux en texte, comme une réponse OData brute
+                           (beaucoup plus de mémoire sur les grandes tailles)
+            record: Noter chaque requête (vue, filtres, top, skip, select)
+                    dans `requests`
+        """
+        self.game = game
+        self.honor_top = honor_top
+        self.text_decimals = text_decimals
+        self.requests = [] if record else None
+        # Message d'erreur SAP simulée (None : les requêtes aboutissent)
+        self.error: Optional[str] = None
+        self._views: Dict[str, pd.DataFrame] = {}
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], honor_top: bool = True,
+                    record: bool = False) -> 'FrameClient':
+        """
+        Vues construites à la main (vue absente : DataFrame vide)
+
+        `frames` peut être modifié entre deux appels, suivi de clear().
+        """
+        client = cls(types.SimpleNamespace(view=lambda name: frames[name]), honor_top=honor_top, record=record)
+        client.frames = frames
+        return client
+
+    def clear(self):
+        """Oublie les vues déjà construites (après une modification de la partie)"""
+        self._views.clear()
+
+    def _view(self, view_name: str) -> pd.DataFrame:
+        if view_name not in self._views:
+            try:
+                df = self.game.view(view_name)
+            except KeyError:
+                df = pd.DataFrame()
+            if self.text_decimals:
+                df = df.copy()
+                for col in df.columns[[pd.api.types.is_float_dtype(t) for t in df.dtypes]]:
+                    df[col] = np.char.mod('%.2f', df[col].to_numpy()).astype(object)
+            self._views[view_name] = df
+        return self._views[view_name]
+
+    def preload(self):
+        """Construit toutes les vues à l'avance (hors des mesures)"""
+        from synthetic_game import VIEWS
+        for view_name in VIEWS:
+            self._view(view_name)
+        return self
+
+    def fetch_view(self, view_name: str, filters: Optional[Dict] = None,
+                   top: Optional[int] = None, skip: Optional[int] = None,
+                   select: Optional[List[str]] = None) -> pd.DataFrame:
+        if self.requests is not None:
+            self.requests.append((view_name, filters, top, skip, select))
+        if self.error:
+            return error_frame(self.error)
+
+        df = self._view(view_name)
+        if filters:
+            mask = np.ones(len(df), dtype=bool)
+            for col, value in filters.items():
+                mask &= (df[col].astype(str) == str(value)).to_numpy() if col in df.columns else False
+            df = df[mask]
+        if skip:
+            df = df.iloc[skip:]
+        if top and (self.honor_top or skip):
+            df = df.iloc[:top]
+        if select:
+            df = df[[c for c in select if c in df.columns]]
+        return df.copy(deep=False)
+
+    def iter_pages(self, view_name: str, page_size: int = 5000,
+                   filters: Optional[Dict] = None, start: int = 0) -> Iterator[pd.DataFrame]:
+        skip = start
+        while True:
+            page = self.fetch_view(view_name, filters=filters, top=page_size, skip=skip)
+            if page.empty:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            skip += len(page)
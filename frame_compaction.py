@@ -0,0 +1,161 @@
+"""
+Représentation compacte des vues gardées en mémoire (Sales, Market, ...)
+
+Les vues OData arrivent en colonnes `object` : chaque ligne répète les mêmes
+chaînes (MATERIAL_DESCRIPTION, AREA, DISTRIBUTION_CHANNEL,
+SALES_ORGANIZATION...) et transporte le dict `__metadata`. Pour les vues
+mises en cache, on stocke une version compacte :
+
+- colonnes techniques `__*` supprimées
+- dimensions (faible cardinalité) en `category` : une seule copie de chaque code
+- mesures en float32 / int32 quand la conversion est sans perte (les
+  décimales d'origine sont retrouvées exactement à la relecture)
+
+`expand_frame` rend un DataFrame aux types pandas habituels (texte d'origine,
+float64, int64 ; les mesures reçues en texte reviennent numériques) : le
+code des moteurs n'a pas à connaître le stockage compact.
+"""
+
+import logging
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Colonnes toujours traitées comme dimensions / mesures quand elles existent
+DIMENSION_COLS = [
+    'MATERIAL_NUMBER', 'MATERIAL_DESCRIPTION', 'AREA', 'DISTRIBUTION_CHANNEL',
+    'SALES_ORGANIZATION', 'STORAGE_LOCATION', 'PLANT', 'COMPANY_CODE',
+    'SIM_ROUND', 'SIM_STEP', 'SIMULATION_PERIOD', 'UNIT', 'CURRENCY'
+]
+MEASURE_COLS = [
+    'QUANTITY', 'NET_VALUE', 'COST', 'PRICE', 'NET_PRICE', 'AVERAGE_PRICE',
+    'UNIT_PRICE', 'STOCK', 'RESTRICTED', 'AMOUNT', 'VALUE'
+]
+
+# Autres colonnes texte converties en catégories sous ce ratio valeurs uniques / lignes
+CATEGORY_MAX_RATIO = 0.5
+# Nombre max de décimales pour une conversion float32 sans perte
+MAX_DECIMALS = 4
+
+INT32_MIN, INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+
+
+def _float_decimals(values: np.ndarray):
+    """Plus petit nombre de décimales représentant exactement les valeurs (None si aucun)"""
+    finite = values[np.isfinite(values)]
+    for decimals in range(MAX_DECIMALS + 1):
+        if np.array_equal(np.round(finite, decimals), finite):
+            return decimals
+    return None
+
+
+def _compact_measure(series: pd.Series):
+    """Retourne (série compacte, métadonnées de relecture) ou (None, None)"""
+    values = pd.to_numeric(series, errors='coerce')
+    if values.isna().sum() > series.isna().sum():
+        return None, None  # Valeurs non numériques : on ne touche pas
+
+    as_float = values.to_numpy(dtype=float)
+    finite = as_float[np.isfinite(as_float)]
+
+    if len(finite) == len(as_float) and np.array_equal(finite, np.round(finite)) \
+            and (len(finite) == 0 or (finite.min() >= INT32_MIN and finite.max() <= INT32_MAX)):
+        return values.astype(np.int32), {'kind': 'int'}
+
+    decimals = _float_decimals(as_float)
+    if decimals is not None:
+        as_f32 = as_float.astype(np.float32)
+        restored = np.round(as_f32.astype(float), decimals)
+        if np.array_equal(restored[np.isfinite(as_float)], finite):
+            return pd.Series(as_f32, index=series.index), {'kind': 'float', 'decimals': decimals}
+
+    return pd.Series(as_float, index=series.index), {'kind': 'float', 'decimals': None}
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Version compacte d'une vue (voir en-tête du module)
+
+    Les informations de relecture sont gardées dans `df.attrs['compaction']`.
+    """
+    if df.empty:
+        return df.drop(columns=[c for c in df.columns if str(c).startswith('__')])
+
+    compact = {}
+    meta: Dict[str, Dict] = {}
+
+    for col in df.columns:
+        if str(col).startswith('__'):
+            continue
+        series = df[col]
+
+        if col in MEASURE_COLS or pd.api.types.is_numeric_dtype(series):
+            values, info = _compact_measure(series)
+            if values is not None:
+                compact[col] = values
+                meta[col] = info
+                continue
+
+        if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            try:
+                ratio = series.nunique(dropna=True) / len(series)
+            except TypeError:
+                compact[col] = series  # Cellules non hashables (listes, dicts)
+                continue
+            if col in DIMENSION_COLS or ratio <= CATEGORY_MAX_RATIO:
+                compact[col] = series.astype('category')
+                meta[col] = {'kind': 'category', 'dtype': series.dtype}
+                continue
+
+        compact[col] = series
+
+    result = pd.DataFrame(compact, index=df.index)
+    result.attrs['compaction'] = meta
+    return result
+
+
+def expand_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame aux types habituels (texte, float64, int64) à partir d'une vue compacte"""
+    meta = df.attrs.get('compaction')
+    if not meta:
+        return df.copy()
+
+    expanded = {}
+    for col in df.columns:
+        info = meta.get(col)
+        series = df[col]
+        if info is None:
+            expanded[col] = series.copy()
+        elif info['kind'] == 'category':
+            expanded[col] = series.astype(info['dtype'])
+        elif info['kind'] == 'int':
+            expanded[col] = series.astype(np.int64)
+        elif info['decimals'] is not None:
+            expanded[col] = series.astype(float).round(info['decimals'])
+        else:
+            expanded[col] = series.astype(float)
+
+    return pd.DataFrame(expanded, index=df.index)
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """Empreinte mémoire réelle (chaînes comprises), en octets"""
+    try:
+        return int(df.memory_usage(deep=True, index=True).sum())
+    except TypeError:
+        return int(df.memory_usage(index=True).sum())
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> Dict[str, float]:
+    """Mémoire avant / après compaction"""
+    before_bytes = frame_memory(before)
+    after_bytes = frame_memory(after)
+    return {
+        'before_bytes': before_bytes,
+        'after_bytes': after_bytes,
+        'saved_bytes': before_bytes - after_bytes,
+        'ratio': round(before_bytes / after_bytes, 2) if after_bytes else 0.0
+    }
@@ -0,0 +1,249 @@
+"""
+Instrumentation des temps de rendu (dashboard, moteurs)
+
+Chaque rerun du dashboard ouvre une trace ; chaque section et chaque appel
+moteur y ajoute une ligne avec son temps mural et les appels OData faits
+pendant son exécution (nombre, octets, lignes, temps SAP). La différence
+entre le temps total d'une ligne et le temps de ses enfants / de SAP donne
+le travail local (pandas, Plotly).
+
+Les traces terminées sont écrites en JSON (une ligne par rerun) dans un
+journal tournant (settings.PERF_LOG_FILE).
+
+Les appels OData et les accès aux caches sont aussi transmis aux
+observateurs enregistrés (ex: métriques Prometheus, voir metrics.py).
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Journal des traces (JSON lines, rotation par taille)
+perf_logger = logging.getLogger('erpsim.perf')
+perf_logger.propagate = False
+
+
+def _ensure_log_handler():
+    if perf_logger.handlers or not settings.PERF_LOG_FILE:
+        return
+    try:
+        handler = RotatingFileHandler(settings.PERF_LOG_FILE, maxBytes=settings.PERF_LOG_MAX_BYTES,
+                                      backupCount=settings.PERF_LOG_BACKUPS, encoding='utf-8')
+    except OSError as e:
+        logger.warning(f"⚠ Journal de performance indisponible ({e})")
+        perf_logger.addHandler(logging.NullHandler())
+        return
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    perf_logger.addHandler(handler)
+    perf_logger.setLevel(logging.INFO)
+
+
+class SectionRecord:
+    """Mesures d'une section (ou d'un appel moteur) pendant une trace"""
+
+    def __init__(self, name: str, kind: str, depth: int):
+        self.name = name
+        self.kind = kind
+        self.depth = depth
+        self.wall_ms = 0.0
+        self.child_ms = 0.0
+        self.odata_calls = 0
+        self.odata_bytes = 0
+        self.odata_rows = 0
+        self.odata_ms = 0.0
+        # None: inconnu, False: servi par le cache, True: recalculé
+        self.computed: Optional[bool] = None
+
+    @property
+    def local_ms(self) -> float:
+        """Temps propre hors sous-sections et hors SAP (pandas, Plotly)"""
+        return max(0.0, self.wall_ms - self.child_ms - self.odata_ms)
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'depth': self.depth,
+            'wall_ms': round(self.wall_ms, 1),
+            'local_ms': round(self.local_ms, 1),
+            'odata_calls': self.odata_calls,
+            'odata_bytes': self.odata_bytes,
+            'odata_rows': self.odata_rows,
+            'odata_ms': round(self.odata_ms, 1),
+            'computed': self.computed
+        }
+
+
+class PerfTrace:
+    """Trace d'un rerun : liste ordonnée des sections mesurées"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started_at = datetime.now()
+        self.records: List[SectionRecord] = []
+        self._stack: List[SectionRecord] = []
+        self._t0 = time.perf_counter()
+        self.total_ms = 0.0
+        self.odata_calls = 0
+        self.odata_bytes = 0
+        self.odata_rows = 0
+        self.odata_ms = 0.0
+
+    def to_frame(self) -> pd.DataFrame:
+        """Une ligne par section, nom indenté selon la profondeur"""
+        rows = [r.to_dict() for r in self.records]
+        if not rows:
+            return pd.DataFrame(columns=['name', 'kind', 'wall_ms', 'local_ms', 'odata_calls',
+                                         'odata_bytes', 'odata_rows', 'odata_ms', 'computed'])
+        df = pd.DataFrame(rows)
+        df['name'] = ['  ' * d + n for d, n in zip(df['depth'], df['name'])]
+        return df.drop(columns=['depth'])
+
+    def to_dict(self) -> Dict:
+        return {
+            'label': self.label,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'total_ms': round(self.total_ms, 1),
+            'odata_calls': self.odata_calls,
+            'odata_bytes': self.odata_bytes,
+            'odata_rows': self.odata_rows,
+            'odata_ms': round(self.odata_ms, 1),
+            'sections': [r.to_dict() for r in self.records]
+        }
+
+
+# Observateurs : on_fetch(view, rows, bytes, elapsed_s), on_cache(cache, hit)
+_fetch_listeners: List[Callable[[str, int, int, float], None]] = []
+_cache_listeners: List[Callable[[str, bool], None]] = []
+
+
+def add_listener(on_fetch: Optional[Callable] = None, on_cache: Optional[Callable] = None):
+    """Enregistre des observateurs des appels OData et des accès cache"""
+    if on_fetch is not None and on_fetch not in _fetch_listeners:
+        _fetch_listeners.append(on_fetch)
+    if on_cache is not None and on_cache not in _cache_listeners:
+        _cache_listeners.append(on_cache)
+
+
+def remove_listener(on_fetch: Optional[Callable] = None, on_cache: Optional[Callable] = None):
+    if on_fetch in _fetch_listeners:
+        _fetch_listeners.remove(on_fetch)
+    if on_cache in _cache_listeners:
+        _cache_listeners.remove(on_cache)
+
+
+_current: contextvars.ContextVar[Optional[PerfTrace]] = contextvars.ContextVar('erpsim_perf_trace', default=None)
+
+
+def begin_trace(label: str) -> PerfTrace:
+    """Ouvre une trace pour le contexte courant (un rerun)"""
+    trace = PerfTrace(label)
+    _current.set(trace)
+    return trace
+
+
+def end_trace(trace: PerfTrace) -> PerfTrace:
+    """Ferme la trace et l'écrit dans le journal tournant"""
+    trace.total_ms = (time.perf_counter() - trace._t0) * 1000
+    if _current.get() is trace:
+        _current.set(None)
+
+    _ensure_log_handler()
+    perf_logger.info(json.dumps(trace.to_dict(), ensure_ascii=False))
+    return trace
+
+
+def current_trace() -> Optional[PerfTrace]:
+    return _current.get()
+
+
+@contextmanager
+def section(name: str, kind: str = 'section'):
+    """
+    Mesure un bloc de code dans la trace courante
+
+    Sans trace ouverte (ex: rerun d'un seul fragment Streamlit), le bloc
+    ouvre sa propre trace et l'écrit dans le journal à la sortie.
+    """
+    trace = _current.get()
+    owns_trace = trace is None
+    if owns_trace:
+        trace = begin_trace(name)
+
+    record = SectionRecord(name, kind, depth=len(trace._stack))
+    trace.records.append(record)
+    trace._stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.wall_ms = (time.perf_counter() - start) * 1000
+        trace._stack.pop()
+        if trace._stack:
+            trace._stack[-1].child_ms += record.wall_ms
+        if owns_trace:
+            end_trace(trace)
+
+
+def mark_computed():
+    """Signale que la section courante a réellement calculé (cache manqué)"""
+    trace = _current.get()
+    if trace is not None and trace._stack:
+        trace._stack[-1].computed = True
+
+
+def record_fetch(view_name: str, rows: int, nbytes: int, elapsed: float):
+    """
+    Enregistre un appel OData dans la trace courante (appelé par ODataClient)
+
+    L'appel est compté dans toutes les sections ouvertes ; le temps SAP est
+    retiré du temps propre de la section la plus interne uniquement.
+    """
+    for listener in _fetch_listeners:
+        listener(view_name, rows, nbytes, elapsed)
+
+    trace = _current.get()
+    if trace is None:
+        return
+
+    elapsed_ms = elapsed * 1000
+    trace.odata_calls += 1
+    trace.odata_bytes += nbytes
+    trace.odata_rows += rows
+    trace.odata_ms += elapsed_ms
+
+    for i, record in enumerate(trace._stack):
+        record.odata_calls += 1
+        record.odata_bytes += nbytes
+        record.odata_rows += rows
+        if i == len(trace._stack) - 1:
+            record.odata_ms += elapsed_ms
+
+
+def record_cache(cache: str, hit: bool):
+    """Signale un accès à un cache (servi depuis la mémoire ou recalculé)"""
+    for listener in _cache_listeners:
+        listener(cache, hit)
+
+
+def timed(name: str, kind: str = 'section'):
+    """Décorateur : mesure chaque appel de la fonction comme une section"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with section(name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
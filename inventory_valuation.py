@@ -0,0 +1,130 @@
+"""
+Valorisation du stock par matériau (capital immobilisé)
+"""
+
+import pandas as pd
+from typing import Dict, Optional, Tuple
+from odata_client import ODataClient
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Coût standard moyen utilisé quand aucun coût n'est connu (Muesli standard)
+DEFAULT_UNIT_COST = 1.38
+
+# Emplacements de stockage ERPsim
+STORAGE_CATEGORIES = {
+    '01': 'Matières premières',
+    '02': 'Produits finis'
+}
+
+
+class InventoryValuationEngine:
+    """Valorise Current_Inventory avec un coût unitaire par matériau"""
+
+    PO_PRICE_COLS = ['NET_PRICE', 'PRICE', 'UNIT_PRICE']
+    PO_VALUE_COLS = ['NET_VALUE', 'VALUE', 'AMOUNT']
+
+    def __init__(self, analyzer, client=None):
+        self.analyzer = analyzer
+        self.client = client or ODataClient()
+        self._cache: Dict[Optional[Tuple[int, int]], Dict[str, pd.DataFrame]] = {}
+
+    def get_unit_costs(self) -> pd.DataFrame:
+        """
+        Coût unitaire par matériau
+
+        - Produits vendus : COST / QUANTITY de la vue Sales
+        - Matières achetées : prix des commandes d'achat (Purchase_Orders)
+
+        Returns:
+            DataFrame (MATERIAL_NUMBER, UNIT_COST, COST_SOURCE)
+        """
+        costs = []
+
+        sales_df = self.client.fetch_view("Sales", top=10000)
+        if not sales_df.empty and {'MATERIAL_NUMBER', 'COST', 'QUANTITY'} <= set(sales_df.columns):
+            for col in ['COST', 'QUANTITY']:
+                sales_df[col] = pd.to_numeric(sales_df[col], errors='coerce').fillna(0)
+            sold = sales_df.groupby('MATERIAL_NUMBER')[['COST', 'QUANTITY']].sum()
+            sold = sold[sold['QUANTITY'] > 0]
+            costs.append(pd.DataFrame({
+                'MATERIAL_NUMBER': sold.index,
+                'UNIT_COST': (sold['COST'] / sold['QUANTITY']).values,
+                'COST_SOURCE': 'Sales'
+            }))
+
+        po_df = self.client.fetch_view("Purchase_Orders", top=10000)
+        if not po_df.empty and 'MATERIAL_NUMBER' in po_df.columns:
+            price_col = next((c for c in self.PO_PRICE_COLS if c in po_df.columns), None)
+            value_col = next((c for c in self.PO_VALUE_COLS if c in po_df.columns), None)
+            if price_col:
+                po_df['UNIT_COST'] = pd.to_numeric(po_df[price_col], errors='coerce')
+            elif value_col and 'QUANTITY' in po_df.columns:
+                qty = pd.to_numeric(po_df['QUANTITY'], errors='coerce')
+                po_df['UNIT_COST'] = pd.to_numeric(po_df[value_col], errors='coerce') / qty.where(qty > 0)
+            if 'UNIT_COST' in po_df.columns:
+                bought = po_df.dropna(subset=['UNIT_COST']).groupby('MATERIAL_NUMBER')['UNIT_COST'].mean()
+                costs.append(pd.DataFrame({
+                    'MATERIAL_NUMBER': bought.index,
+                    'UNIT_COST': bought.values,
+                    'COST_SOURCE': 'Purchase_Orders'
+                }))
+
+        if not costs:
+            return pd.DataFrame(columns=['MATERIAL_NUMBER', 'UNIT_COST', 'COST_SOURCE'])
+
+        # Le coût de revient des ventes l'emporte sur le prix d'achat
+        unit_costs = pd.concat(costs, ignore_index=True)
+        return unit_costs.drop_duplicates(subset='MATERIAL_NUMBER', keep='first').reset_index(drop=True)
+
+    def value_inventory(self) -> Dict[str, pd.DataFrame]:
+        """
+        Valorise le stock actuel (mis en cache pour le step courant)
+
+        Returns:
+            Dict avec 'detail' (matériau x emplacement) et les agrégats
+            'by_material', 'by_location', 'by_category'
+        """
+        tracker = self.analyzer.valuation_tracker
+        tracker.refresh()
+        step = tracker.current_step()
+
+        if step is not None and step in self._cache:
+            return self._cache[step]
+
+        result = self._compute_valuation()
+        if step is not None:
+            self._cache = {step: result}
+
+        return result
+
+    def _compute_valuation(self) -> Dict[str, pd.DataFrame]:
+        inventory_df = self.client.fetch_view("Current_Inventory", top=10000)
+
+        if inventory_df.empty or 'STOCK' not in inventory_df.columns:
+            return {}
+
+        inventory = pd.DataFrame({
+            'MATERIAL_NUMBER': inventory_df['MATERIAL_NUMBER'] if 'MATERIAL_NUMBER' in inventory_df.columns else '',
+            'STORAGE_LOCATION': inventory_df['STORAGE_LOCATION'].astype(str) if 'STORAGE_LOCATION' in inventory_df.columns else '',
+            'STOCK': pd.to_numeric(inventory_df['STOCK'], errors='coerce').fillna(0)
+        })
+
+        detail = inventory.merge(self.get_unit_costs(), on='MATERIAL_NUMBER', how='left')
+        detail['COST_SOURCE'] = detail['COST_SOURCE'].fillna('Défaut')
+        detail['UNIT_COST'] = detail['UNIT_COST'].fillna(DEFAULT_UNIT_COST)
+        detail['CATEGORY'] = detail['STORAGE_LOCATION'].map(STORAGE_CATEGORIES).fillna('Autre')
+        detail['TIED_UP_CAPITAL'] = detail['STOCK'] * detail['UNIT_COST']
+
+        def summarize(by: str) -> pd.DataFrame:
+            return (detail.groupby(by)[['STOCK', 'TIED_UP_CAPITAL']].sum()
+                    .reset_index()
+                    .sort_values('TIED_UP_CAPITAL', ascending=False))
+
+        return {
+            'detail': detail,
+            'by_material': summarize('MATERIAL_NUMBER'),
+            'by_location': summarize('STORAGE_LOCATION'),
+            'by_category': summarize('CATEGORY')
+        }
@@ -0,0 +1,273 @@
+"""
+Moteur de grand livre (Financial_Postings)
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from odata_client import ODataClient
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class GeneralLedgerEngine:
+    """
+    Soldes courants par compte GL x round x step, alimentés page par page.
+
+    Chaque page de Financial_Postings est agrégée puis jetée : seules les
+    variations par (step, compte) sont conservées. Une matrice de soldes
+    cumulés (steps x comptes) permet ensuite de reconstruire un compte de
+    résultat ou un bilan pour n'importe quel step par simple lecture de ligne.
+
+    Convention de signe : débit positif, crédit négatif. Les produits
+    (crédits) sont donc négatifs et le résultat net vaut -somme(P&L).
+    """
+
+    ACCOUNT_COLS = ['GL_ACCOUNT_NUMBER', 'GL_ACCOUNT']
+    NAME_COLS = ['GL_ACCOUNT_NAME', 'GL_ACCOUNT_DESCRIPTION']
+    DEBIT_CREDIT_COLS = ['DEBIT_CREDIT', 'DEBIT_CREDIT_INDICATOR']
+    TYPE_COLS = ['GL_ACCOUNT_TYPE', 'STATEMENT_TYPE']
+    CREDIT_VALUES = {'H', 'C', 'CREDIT', 'CR'}
+
+    def __init__(self, client=None, page_size: int = 5000):
+        """
+        Args:
+            client: Source des vues (défaut: ODataClient)
+            page_size: Taille des pages lues
+        """
+        self.client = client or ODataClient()
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Oublie tous les soldes (nouvelle partie)"""
+        with self._lock:
+            self._rows_seen = 0
+            self._account_names: Dict[str, str] = {}
+            self._balance_sheet_accounts = set()
+            self._steps: List[Tuple[int, int]] = []
+            self._step_pos: Dict[Tuple[int, int], int] = {}
+            self._round_start: Dict[int, int] = {}
+            self._accounts: List[str] = []
+            self._account_pos: Dict[str, int] = {}
+            # Tampons à capacité doublée : les matrices utiles en sont des vues
+            self._movement_buffer = np.zeros((0, 0))
+            self._cumulative_buffer = np.zeros((0, 0))
+
+    @property
+    def _movement_matrix(self) -> np.ndarray:
+        return self._movement_buffer[:len(self._steps), :len(self._accounts)]
+
+    @property
+    def _cumulative(self) -> np.ndarray:
+        return self._cumulative_buffer[:len(self._steps), :len(self._accounts)]
+
+    @staticmethod
+    def _first_col(df: pd.DataFrame, candidates: List[str]) -> Optional[str]:
+        for col in candidates:
+            if col in df.columns:
+                return col
+        return None
+
+    def _is_balance_sheet(self, account: str, account_type: Optional[str]) -> bool:
+        """Compte de bilan ? (type OData si dispo, sinon comptes 1xxxxx-3xxxxx)"""
+        if account_type:
+            label = str(account_type).upper()
+            return 'BALANCE' in label or label in {'BS', 'B'}
+        return str(account).strip()[:1] in {'1', '2', '3'}
+
+    def _ingest_page(self, page: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """Agrège une page de Financial_Postings en variations par (step, compte)"""
+        account_col = self._first_col(page, self.ACCOUNT_COLS)
+        if account_col is None or 'AMOUNT' not in page.columns:
+            logger.warning(f"Financial_Postings: colonnes compte/montant manquantes ({page.columns.tolist()})")
+            return None
+
+        amount = pd.to_numeric(page['AMOUNT'], errors='coerce').fillna(0)
+        dc_col = self._first_col(page, self.DEBIT_CREDIT_COLS)
+        if dc_col:
+            is_credit = page[dc_col].astype(str).str.strip().str.upper().isin(self.CREDIT_VALUES)
+            amount = amount.abs().where(~is_credit, -amount.abs())
+
+        frame = pd.DataFrame({'ACCOUNT': page[account_col].astype(str), 'AMOUNT': amount})
+        for col in ['SIM_ROUND', 'SIM_STEP']:
+            frame[col] = pd.to_numeric(page[col], errors='coerce').fillna(0).astype(int) if col in page.columns else 0
+
+        # Métadonnées de compte (nom, type d'état)
+        name_col = self._first_col(page, self.NAME_COLS)
+        type_col = self._first_col(page, self.TYPE_COLS)
+        meta_cols = [c for c in [account_col, name_col, type_col] if c]
+        for row in page[meta_cols].drop_duplicates(subset=[account_col]).itertuples(index=False):
+            account = str(row[0])
+            if account in self._account_names:
+                continue
+            self._account_names[account] = str(row[meta_cols.index(name_col)]) if name_col else account
+            account_type = row[meta_cols.index(type_col)] if type_col else None
+            if self._is_balance_sheet(account, account_type):
+                self._balance_sheet_accounts.add(account)
+
+        return frame.groupby(['SIM_ROUND', 'SIM_STEP', 'ACCOUNT'], as_index=False)['AMOUNT'].sum()
+
+    def _reserve(self, n_steps: int, n_accounts: int):
+        """Agrandit les tampons (capacité doublée) si nécessaire"""
+        rows, cols = self._movement_buffer.shape
+        if n_steps <= rows and n_accounts <= cols:
+            return
+        shape = (max(n_steps, 2 * rows), max(n_accounts, 2 * cols))
+        for name in ['_movement_buffer', '_cumulative_buffer']:
+            buffer = np.zeros(shape)
+            old = getattr(self, name)
+            buffer[:rows, :cols] = old
+            setattr(self, name, buffer)
+
+    def _apply(self, movements: pd.DataFrame):
+        """
+        Intègre des variations (SIM_ROUND, SIM_STEP, ACCOUNT, AMOUNT)
+
+        Les soldes cumulés ne sont recalculés qu'à partir du premier step
+        touché : en flux normal (step courant ou steps nouveaux), le coût ne
+        dépend pas de la longueur de la partie.
+        """
+        movements = movements.groupby(['SIM_ROUND', 'SIM_STEP', 'ACCOUNT'], as_index=False)['AMOUNT'].sum()
+        steps = list(zip(movements['SIM_ROUND'].tolist(), movements['SIM_STEP'].tolist()))
+        new_steps = sorted(set(steps) - self._step_pos.keys())
+        n_old = len(self._steps)
+
+        for account in movements['ACCOUNT'].unique():
+            if account not in self._account_pos:
+                self._account_pos[account] = len(self._accounts)
+                self._accounts.append(account)
+        self._reserve(n_old + len(new_steps), len(self._accounts))
+
+        first_changed = n_old
+        if new_steps and self._steps and new_steps[0] < self._steps[-1]:
+            # Step antérieur arrivé en retard : on réordonne tout (cas rare)
+            self._steps = sorted(self._steps + new_steps)
+            first_changed = 0
+            order = [self._step_pos.get(step, -1) for step in self._steps]
+            previous = self._movement_buffer[:n_old].copy()
+            self._movement_buffer[:len(self._steps)] = 0.0
+            for i, j in enumerate(order):
+                if j >= 0:
+                    self._movement_buffer[i] = previous[j]
+            self._step_pos = {step: i for i, step in enumerate(self._steps)}
+            self._round_start = {}
+            for i, (sim_round, _) in enumerate(self._steps):
+                self._round_start.setdefault(sim_round, i)
+        else:
+            for step in new_steps:
+                self._step_pos[step] = len(self._steps)
+                self._round_start.setdefault(step[0], len(self._steps))
+                self._steps.append(step)
+
+        rows = np.array([self._step_pos[step] for step in steps], dtype=np.int64)
+        cols = np.array([self._account_pos[a] for a in movements['ACCOUNT']], dtype=np.int64)
+        np.add.at(self._movement_buffer, (rows, cols), movements['AMOUNT'].to_numpy(dtype=float))
+        if len(rows):
+            first_changed = min(first_changed, int(rows.min()))
+
+        n_steps, n_accounts = len(self._steps), len(self._accounts)
+        base = self._cumulative_buffer[first_changed - 1, :n_accounts] if first_changed > 0 else 0.0
+        self._cumulative_buffer[first_changed:n_steps, :n_accounts] = \
+            base + self._movement_buffer[first_changed:n_steps, :n_accounts].cumsum(axis=0)
+
+    def refresh(self) -> int:
+        """
+        Lit les nouvelles écritures page par page et met à jour les soldes
+
+        Returns:
+            Nombre d'écritures lues
+        """
+        with self._lock:
+            read = 0
+            movements = []
+            for page in self.client.iter_pages("Financial_Postings", page_size=self.page_size,
+                                               start=self._rows_seen):
+                grouped = self._ingest_page(page)
+                if grouped is not None:
+                    movements.append(grouped)
+                read += len(page)
+                self._rows_seen += len(page)
+
+            if movements:
+                self._apply(pd.concat(movements, ignore_index=True))
+            if read:
+                logger.info(f"✓ Grand livre: {read} écritures ajoutées ({len(self._steps)} steps)")
+
+            return read
+
+    def latest_step(self) -> Optional[Tuple[int, int]]:
+        """Dernier (SIM_ROUND, SIM_STEP) comptabilisé, None si aucun"""
+        return self._steps[-1] if self._steps else None
+
+    def get_steps(self) -> List[Tuple[int, int]]:
+        """Liste ordonnée des (SIM_ROUND, SIM_STEP) connus"""
+        return list(self._steps)
+
+    def _row(self, matrix: np.ndarray, sim_round: int, sim_step: int) -> Optional[np.ndarray]:
+        pos = self._step_pos.get((sim_round, sim_step))
+        return None if pos is None else matrix[pos]
+
+    def _round_start_cumulative(self, sim_round: int) -> np.ndarray:
+        """Soldes cumulés à la fin du round précédent"""
+        first = self._round_start.get(sim_round, 0)
+        if first == 0:
+            return np.zeros(len(self._accounts))
+        return self._cumulative[first - 1]
+
+    def _statement(self, values: np.ndarray, balance_sheet: bool) -> pd.DataFrame:
+        mask = np.array([(a in self._balance_sheet_accounts) == balance_sheet for a in self._accounts], dtype=bool)
+        accounts = np.array(self._accounts)[mask] if len(self._accounts) else np.array([])
+        statement = pd.DataFrame({
+            'GL_ACCOUNT': accounts,
+            'GL_ACCOUNT_NAME': [self._account_names.get(a, a) for a in accounts],
+            'AMOUNT': values[mask] if len(self._accounts) else np.array([])
+        })
+        statement = statement[statement['AMOUNT'].round(2) != 0]
+        return statement.sort_values('GL_ACCOUNT').reset_index(drop=True)
+
+    def income_statement(self, sim_round: int, sim_step: int, period: str = 'step') -> pd.DataFrame:
+        """
+        Compte de résultat d'un step
+
+        Args:
+            sim_round, sim_step: Step demandé
+            period: 'step' (mouvements du step), 'round' (cumul depuis le début
+                    du round) ou 'game' (cumul depuis le début de la partie)
+
+        Returns:
+            DataFrame (GL_ACCOUNT, GL_ACCOUNT_NAME, AMOUNT)
+        """
+        if period == 'step':
+            values = self._row(self._movement_matrix, sim_round, sim_step)
+        else:
+            values = self._row(self._cumulative, sim_round, sim_step)
+            if values is not None and period == 'round':
+                values = values - self._round_start_cumulative(sim_round)
+
+        if values is None:
+            return pd.DataFrame(columns=['GL_ACCOUNT', 'GL_ACCOUNT_NAME', 'AMOUNT'])
+
+        return self._statement(values, balance_sheet=False)
+
+    def net_income(self, sim_round: int, sim_step: int, period: str = 'step') -> float:
+        """Résultat net (produits - charges) sur la période demandée"""
+        statement = self.income_statement(sim_round, sim_step, period)
+        return float(-statement['AMOUNT'].sum()) if not statement.empty else 0.0
+
+    def balance_sheet(self, sim_round: int, sim_step: int) -> pd.DataFrame:
+        """
+        Bilan (soldes cumulés des comptes de bilan) à la fin d'un step
+
+        Returns:
+            DataFrame (GL_ACCOUNT, GL_ACCOUNT_NAME, AMOUNT), débit positif
+        """
+        values = self._row(self._cumulative, sim_round, sim_step)
+
+        if values is None:
+            return pd.DataFrame(columns=['GL_ACCOUNT', 'GL_ACCOUNT_NAME', 'AMOUNT'])
+
+        return self._statement(values, balance_sheet=True)
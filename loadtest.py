@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Test de charge du dashboard : N sessions simultanées sur un même hôte
+
+Chaque session simulée exécute le vrai dashboard.py (streamlit AppTest, les
+caches Streamlit sont donc partagés entre sessions comme sur un serveur)
+et enchaîne le parcours d'un équipier : ouverture (en-tête KPI + onglet
+Ventes), chaque onglet, bascule des filtres produits, vue détaillée, bascule
+« tous les produits du marché » et export Excel.
+
+Les données viennent du serveur OData simulé (odata_standin.py), démarré
+dans le processus ou déjà lancé (`--url`). Le rapport donne :
+
+- le débit (actions par seconde) et la latence par action (p50/p95/p99/max)
+- les erreurs (exceptions du script Streamlit)
+- l'amplification : requêtes OData reçues par le serveur par action et par
+  session, lignes et octets servis
+
+    python loadtest.py --sessions 8 --iterations 3 --rows 50000
+    python loadtest.py --sessions 20 --url http://127.0.0.1:8001/odata/300 --json charge.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import requests
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard.py')
+
+# Clés des widgets du dashboard utilisés par le parcours
+PAGE_KEY = 'page'
+DETAIL_VIEW_KEY = 'sales_detail_view'
+FILTER_PREFIX = 'filter_'
+EXPORT_LABEL = "📥 Télécharger Rapport Excel Global"
+MARKET_TOGGLE_LABEL = "Voir tous les produits du marché"
+
+EXPORT_TIMEOUT = 120
+
+
+class SessionResult:
+    """Mesures d'une session simulée"""
+
+    def __init__(self, session_id: int):
+        self.session_id = session_id
+        self.actions: List[Dict] = []
+
+    def record(self, action: str, seconds: float, error: Optional[str] = None):
+        self.actions.append({'session': self.session_id, 'action': action,
+                             'seconds': seconds, 'error': error})
+
+
+class DashboardSession:
+    """Un équipier qui parcourt le dashboard"""
+
+    def __init__(self, session_id: int, think: float = 0.0, seed: int = 0, timeout: float = 120):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(DASHBOARD, default_timeout=timeout)
+        self.result = SessionResult(session_id)
+        self.think = think
+        self.rng = random.Random(seed * 1000 + session_id)
+
+    def _step(self, action: str, interact):
+        start = time.perf_counter()
+        error = None
+        try:
+            interact()
+            if self.app.exception:
+                error = self.app.exception[0].value.splitlines()[0][:200]
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:200]
+        self.result.record(action, time.perf_counter() - start, error)
+        if self.think:
+            time.sleep(self.rng.uniform(0.5, 1.5) * self.think)
+
+    def _widget(self, collection, key=None, label=None):
+        for widget in collection:
+            if (key is not None and widget.key == key) or (label is not None and label in str(widget.label)):
+                return widget
+        return None
+
+    def open(self):
+        self._step('open', self.app.run)
+
+    def visit_pages(self):
+        pages = self._widget(self.app.radio, key=PAGE_KEY)
+        if pages is None:
+            return
+        for label in pages.options:
+            self._step(f"page:{label}", lambda label=label: self._widget(self.app.radio, key=PAGE_KEY)
+                       .set_value(label).run())
+            if label.startswith('📈'):
+                self._sales_interactions(label)
+            elif label.startswith('🏆'):
+                self._market_interactions()
+            elif label.startswith('⚡'):
+                self._export()
+
+    def _sales_interactions(self, page_label: str):
+        detail = self._widget(self.app.radio, key=DETAIL_VIEW_KEY)
+        if detail is not None:
+            for option in detail.options[::-1]:
+                self._step('sales_detail_view', lambda option=option: self._widget(
+                    self.app.radio, key=DETAIL_VIEW_KEY).set_value(option).run())
+
+        filters = [c.key for c in self.app.checkbox if c.key and c.key.startswith(FILTER_PREFIX)]
+        if filters:
+            key = self.rng.choice(filters)
+            self._step('filter_off', lambda: self._widget(self.app.checkbox, key=key).uncheck().run())
+            self._step('filter_on', lambda: self._widget(self.app.checkbox, key=key).check().run())
+
+    def _market_interactions(self):
+        toggle = self._widget(self.app.toggle, label=MARKET_TOGGLE_LABEL)
+        if toggle is None:
+            return
+        self._step('market_all_on', lambda: self._widget(self.app.toggle, label=MARKET_TOGGLE_LABEL).set_value(True).run())
+        self._step('market_all_off', lambda: self._widget(self.app.toggle, label=MARKET_TOGGLE_LABEL).set_value(False).run())
+
+    def _export(self):
+        button = self._widget(self.app.button, label=EXPORT_LABEL)
+        if button is None:
+            return
+
+        def export():
+            self._widget(self.app.button, label=EXPORT_LABEL).click().run()
+            job = self.app.session_state['export_job'] if 'export_job' in self.app.session_state else None
+            deadline = time.monotonic() + EXPORT_TIMEOUT
+            while job is not None and job.status in ('pending', 'running'):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"export non terminé après {EXPORT_TIMEOUT}s")
+                time.sleep(0.1)
+            self.app.run()
+            if job is not None and job.status != 'done':
+                raise RuntimeError(job.message or job.status)
+            if job is not None and job.path and os.path.exists(job.path):
+                os.remove(job.path)
+
+        self._step('export', export)
+
+    def run(self, iterations: int) -> SessionResult:
+        self.open()
+        for _ in range(iterations):
+            self.visit_pages()
+        return self.result
+
+
+def _upstream_stats(url: str) -> Dict:
+    """Compteurs du serveur OData simulé (GET /_state)"""
+    root = url.split('/odata')[0]
+    try:
+        return requests.get(f"{root}/_state", timeout=10).json()
+    except (requests.exceptions.RequestException, ValueError):
+        return {}
+
+
+def run_load_test(sessions: int, iterations: int = 1, think: float = 0.0, ramp: float = 0.0,
+                  url: Optional[str] = None, rows: int = 10_000, steps: int = 20, seed: int = 42,
+                  step_seconds: Optional[float] = None) -> Dict:
+    """
+    Lance les sessions et agrège les mesures
+
+    Args:
+        sessions: Nombre de sessions simultanées
+        iterations: Parcours complets par session (après l'ouverture)
+        think: Temps de réflexion moyen entre deux actions (s)
+        ramp: Durée sur laquelle les sessions démarrent (s)
+        url: ODATA_BASE_URL d'un serveur simulé déjà lancé (sinon démarré ici)
+        rows, steps, seed: Partie générée quand le serveur est démarré ici
+        step_seconds: Avance automatique de la partie (invalide les caches)
+    """
+    from config import settings
+
+    server = None
+    if url is None:
+        import odata_standin
+        from synthetic_game import SyntheticGame
+
+        server, _ = odata_standin.serve(0, game=SyntheticGame.for_rows(rows, seed=seed, steps=steps),
+                                        step_seconds=step_seconds)
+        url = odata_standin.base_url(server)
+
+    # Le dashboard lit l'URL au démarrage de chaque session
+    settings.ODATA_BASE_URL = url
+    if settings.DATA_SERVICE_URL:
+        logger.warning(f"⚠ Sessions servies via {settings.DATA_SERVICE_URL} (amplification mesurée côté OData)")
+
+    before = _upstream_stats(url)
+    results: List[SessionResult] = []
+    lock = threading.Lock()
+
+    def worker(session_id: int):
+        session = DashboardSession(session_id, think=think, seed=seed)
+        result = session.run(iterations)
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(sessions)]
+    start = time.perf_counter()
+    for i, thread in enumerate(threads):
+        thread.start()
+        if ramp and sessions > 1:
+            time.sleep(ramp / (sessions - 1) if i < sessions - 1 else 0)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    after = _upstream_stats(url)
+    if server is not None:
+        server.shutdown()
+
+    actions = pd.DataFrame([a for r in results for a in r.actions])
+    return summarize(actions, elapsed, sessions, before, after)
+
+
+def summarize(actions: pd.DataFrame, elapsed: float, sessions: int, before: Dict, after: Dict) -> Dict:
+    """Débit, latences par action, erreurs et amplification"""
+    if actions.empty:
+        return {'sessions': sessions, 'elapsed_s': round(elapsed, 2), 'actions': 0}
+
+    def percentiles(seconds: pd.Series) -> Dict:
+        values = seconds.to_numpy() * 1000
+        return {
+            'count': int(len(values)),
+            'p50_ms': round(float(np.percentile(values, 50)), 1),
+            'p95_ms': round(float(np.percentile(values, 95)), 1),
+            'p99_ms': round(float(np.percentile(values, 99)), 1),
+            'max_ms': round(float(values.max()), 1),
+        }
+
+    errors = actions[actions['error'].notna()]
+    upstream = {k: after.get(k, 0) - before.get(k, 0) for k in ('requests', 'rows_served', 'bytes_served')}
+    n_actions = len(actions)
+
+    return {
+        'sessions': sessions,
+        'elapsed_s': round(elapsed, 2),
+        'actions': n_actions,
+        'throughput_per_s': round(n_actions / elapsed, 2) if elapsed else 0.0,
+        'latency': percentiles(actions['seconds']),
+        'by_action': {action: percentiles(group['seconds'])
+                      for action, group in actions.groupby('action', sort=False)},
+        'errors': int(len(errors)),
+        'error_samples': errors.drop_duplicates('error')[['action', 'error']].head(5).to_dict('records'),
+        'upstream': dict(upstream,
+                         requests_per_action=round(upstream['requests'] / n_actions, 2),
+                         requests_per_session=round(upstream['requests'] / sessions, 1)),
+    }
+
+
+def print_report(report: Dict):
+    print(f"\nSessions: {report['sessions']}  Durée: {report['elapsed_s']}s  "
+          f"Actions: {report['actions']}  Débit: {report.get('throughput_per_s', 0)} actions/s")
+    if not report.get('actions'):
+        return
+
+    latency = report['latency']
+    print(f"Latence: p50 {latency['p50_ms']} ms  p95 {latency['p95_ms']} ms  "
+          f"p99 {latency['p99_ms']} ms  max {latency['max_ms']} ms")
+
+    table = pd.DataFrame.from_dict(report['by_action'], orient='index').rename_axis('action').reset_index()
+    print("\n" + table.to_string(index=False))
+
+    upstream = report['upstream']
+    print(f"\nOData: {upstream['requests']} requêtes ({upstream['requests_per_action']} par action, "
+          f"{upstream['requests_per_session']} par session), {upstream['rows_served']:,} lignes, "
+          f"{upstream['bytes_served'] / 1e6:,.1f} Mo")
+
+    if report['errors']:
+        print(f"\n✗ {report['errors']} action(s) en erreur:")
+        for sample in report['error_samples']:
+            print(f"   {sample['action']}: {sample['error']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Test de charge du dashboard ERPsim")
+    parser.add_argument('--sessions', type=int, default=5, help="Sessions simultanées")
+    parser.add_argument('--iterations', type=int, default=1, help="Parcours complets par session")
+    parser.add_argument('--think', type=float, default=0.0, help="Temps de réflexion moyen entre actions (s)")
+    parser.add_argument('--ramp', type=float, default=0.0, help="Durée de démarrage des sessions (s)")
+    parser.add_argument('--url', help="ODATA_BASE_URL d'un odata_standin déjà lancé")
+    parser.add_argument('--rows', type=int, default=10_000, help="Lignes de ventes de la partie générée")
+    parser.add_argument('--steps', type=int, default=20, help="Steps joués avant le test")
+    parser.add_argument('--step-seconds', type=float, help="Avance automatique de la partie pendant le test")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', metavar='FICHIER', help="Écrire le rapport en JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s', stream=sys.stderr)
+    # Le dashboard journalise chaque lecture OData et chaque avertissement Streamlit
+    logging.getLogger('odata_client').setLevel(logging.ERROR)
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    report = run_load_test(args.sessions, args.iterations, args.think, args.ramp, args.url,
+                           args.rows, args.steps, args.seed, args.step_seconds)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report.get('errors') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,24 @@
 #!/usr/bin/env python3
 """
 Point d'entrée principal pour analyser votre simulation ERPsim
+
+Sans argument : menu interactif.
+Avec arguments : commandes non interactives (voir cli.py), ex:
+    python main.py sales --by area --format json
 """
 
-from odata_client import ODataClient
-from analyzer import ERPSimAnalyzer
-from config import settings
-import pandas as pd
 import logging
+import sys
 
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
 def main():
     """Fonction principale"""
+    from odata_client import ODataClient
+    from analyzer import ERPSimAnalyzer
+    from export_pipeline import export_report
+    from config import settings
 
     print("\n" + "="*70)
     print("🚀 SYSTEME DE GESTION ERPSIM MANUFACTURING")
@@ -126,20 +126,16 @@ def main():
                 print("\n⚠ Aucune donnee disponible")
 
         elif choice == '8':
-            try:
-                report = analyzer.generate_performance_report()
-                filename = f"erpsim_report_{settings.COMPANY_CODE}.xlsx"
-
-                with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                    for sheet_name, df in report.items():
-                        if not df.empty:
-                            # Limiter les colonnes pour Excel
-                            cols_to_write = [c for c in df.columns if c != '__metadata']
-                            df[cols_to_write].to_excel(writer, sheet_name=sheet_name[:31], index=False)
+            filename = f"erpsim_report_{settings.COMPANY_CODE}.xlsx"
+            job = export_report(
+                analyzer, filename,
+                on_progress=lambda progress, message: print(f"   [{progress:>4.0%}] {message}")
+            )
 
+            if job.status == 'done':
                 print(f"\n✓ Rapport exporte: {filename}")
-            except Exception as e:
-                print(f"\n✗ Erreur lors de l'export: {e}")
+            else:
+                print(f"\n✗ Erreur lors de l'export: {job.error}")
 
         elif choice == '9':
             analyzer.cache = {}
@@ -150,4 +146,13 @@ def main():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main())
+
+    # Configuration du logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     main()
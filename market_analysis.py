@@ -0,0 +1,155 @@
+"""
+Parts de marché et quadrants (Star / Opportunité / Niche / Faible)
+
+Les lignes brutes de Market et de Sales sont agrégées une seule fois au
+grain le plus fin (produit x canal x zone x période) ; toute autre
+granularité se déduit de ce cube, qui ne compte que quelques milliers de
+lignes. La classification se fait par masques vectorisés (np.select).
+"""
+
+import itertools
+import logging
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from market_intelligence import MARKET_ORG
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ['MATERIAL_NUMBER', 'DISTRIBUTION_CHANNEL', 'AREA', 'PERIOD']
+VALUES = ['MARKET_VALUE', 'MARKET_QUANTITY', 'MY_VALUE', 'MY_QUANTITY']
+
+STAR, OPPORTUNITY, NICHE, WEAK = "⭐ Star", "🎯 Opportunité", "🛡️ Niche", "💤 Faible"
+
+
+def _numeric(df: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+
+def _dimensions(df: pd.DataFrame, period_col: str) -> Dict[str, np.ndarray]:
+    dims = {}
+    for dim in DIMENSIONS[:-1]:
+        dims[dim] = df[dim].astype(object).to_numpy() if dim in df.columns else np.full(len(df), '', dtype=object)
+    dims['PERIOD'] = (pd.to_numeric(df[period_col], errors='coerce').fillna(0).astype(np.int64).to_numpy()
+                      if period_col in df.columns else np.zeros(len(df), dtype=np.int64))
+    return dims
+
+
+def build_share_cube(market_df: pd.DataFrame, sales_df: pd.DataFrame, product_index=None) -> pd.DataFrame:
+    """
+    Cube (produit, canal, zone, période) des valeurs et quantités marché / nous
+
+    Args:
+        market_df: Vue Market brute
+        sales_df: Vue Sales brute (nos ventes)
+        product_index: ProductIndex pour retrouver MATERIAL_NUMBER sur Market
+
+    Returns:
+        DataFrame DIMENSIONS + VALUES
+    """
+    parts = []
+
+    if not market_df.empty:
+        if product_index is not None:
+            market_df = product_index.attach(market_df)
+        # Agrégat « Market » s'il existe, sinon somme des organisations
+        if 'SALES_ORGANIZATION' in market_df.columns:
+            is_total = (market_df['SALES_ORGANIZATION'] == MARKET_ORG).to_numpy()
+            if is_total.any():
+                market_df = market_df[is_total]
+
+        quantity = _numeric(market_df, 'QUANTITY')
+        if 'NET_VALUE' in market_df.columns:
+            value = _numeric(market_df, 'NET_VALUE')
+        elif 'AVERAGE_PRICE' in market_df.columns:
+            value = _numeric(market_df, 'AVERAGE_PRICE') * quantity
+        else:
+            value = _numeric(market_df, 'PRICE') * quantity
+        parts.append(pd.DataFrame({**_dimensions(market_df, 'SIMULATION_PERIOD'),
+                                   'MARKET_VALUE': value, 'MARKET_QUANTITY': quantity,
+                                   'MY_VALUE': 0.0, 'MY_QUANTITY': 0.0}))
+
+    if not sales_df.empty:
+        parts.append(pd.DataFrame({**_dimensions(sales_df, 'SIM_ROUND'),
+                                   'MARKET_VALUE': 0.0, 'MARKET_QUANTITY': 0.0,
+                                   'MY_VALUE': _numeric(sales_df, 'NET_VALUE'),
+                                   'MY_QUANTITY': _numeric(sales_df, 'QUANTITY')}))
+
+    if not parts:
+        return pd.DataFrame(columns=DIMENSIONS + VALUES)
+
+    rows = pd.concat(parts, ignore_index=True)
+    unmapped = pd.isna(rows['MATERIAL_NUMBER'])
+    if unmapped.any():
+        logger.debug(f"{int(unmapped.sum())} lignes Market sans produit connu ignorées")
+        rows = rows[~unmapped]
+    return rows.groupby(DIMENSIONS, as_index=False, sort=False)[VALUES].sum()
+
+
+def classify_quadrants(market_value: np.ndarray, share: np.ndarray,
+                       median_value: np.ndarray, median_share: np.ndarray) -> np.ndarray:
+    """
+    Star: gros marché + grosse part ; Opportunité: gros marché + petite part ;
+    Niche: petit marché + grosse part ; Faible: petit marché + petite part
+    """
+    big = market_value >= median_value
+    strong = share >= median_share
+    return np.select([big & strong, big & ~strong, ~big & strong], [STAR, OPPORTUNITY, NICHE], default=WEAK)
+
+
+def share_analysis(cube: pd.DataFrame, by: Sequence[str] = ('MATERIAL_NUMBER',)) -> pd.DataFrame:
+    """
+    Parts de marché et quadrants à une granularité donnée
+
+    Les segments absents du marché (valeur marché nulle) sont ignorés. Les
+    médianes des quadrants sont prises sur l'ensemble des segments, ou par
+    période si PERIOD fait partie de `by`.
+
+    Args:
+        cube: Résultat de build_share_cube
+        by: Sous-ensemble de DIMENSIONS
+
+    Returns:
+        DataFrame `by` + VALUES, MARKET_SHARE (% de la valeur), STATUS
+    """
+    by = list(by)
+    columns = by + VALUES + ['MARKET_SHARE', 'STATUS']
+    if cube.empty:
+        return pd.DataFrame(columns=columns)
+
+    grouped = cube.groupby(by, as_index=False, sort=False)[VALUES].sum()
+    grouped = grouped[grouped['MARKET_VALUE'].to_numpy() > 0].reset_index(drop=True)
+    if grouped.empty:
+        return pd.DataFrame(columns=columns)
+
+    grouped['MARKET_SHARE'] = np.round(grouped['MY_VALUE'].to_numpy() / grouped['MARKET_VALUE'].to_numpy() * 100, 1)
+
+    if 'PERIOD' in by and len(by) > 1:
+        periods = grouped.groupby('PERIOD')
+        median_value = periods['MARKET_VALUE'].transform('median').to_numpy()
+        median_share = periods['MARKET_SHARE'].transform('median').to_numpy()
+    else:
+        median_value = grouped['MARKET_VALUE'].median()
+        median_share = grouped['MARKET_SHARE'].median()
+
+    grouped['STATUS'] = classify_quadrants(grouped['MARKET_VALUE'].to_numpy(), grouped['MARKET_SHARE'].to_numpy(),
+                                           median_value, median_share)
+    return grouped[columns]
+
+
+def share_matrix(cube: pd.DataFrame, dimensions: Sequence[str] = DIMENSIONS) -> Dict[Tuple[str, ...], pd.DataFrame]:
+    """Toutes les granularités (sous-ensembles non vides de `dimensions`) à partir du même cube"""
+    return {combo: share_analysis(cube, combo)
+            for size in range(1, len(dimensions) + 1)
+            for combo in itertools.combinations(dimensions, size)}
+
+
+def describe_products(analysis: pd.DataFrame, product_index=None) -> pd.DataFrame:
+    """Ajoute MATERIAL_DESCRIPTION (index produit) aux analyses par produit"""
+    if product_index is None or 'MATERIAL_NUMBER' not in analysis.columns:
+        return analysis
+    return product_index.attach(analysis, column='MATERIAL_NUMBER', fields=('MATERIAL_DESCRIPTION',))
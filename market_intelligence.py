@@ -0,0 +1,302 @@
+"""
+Séries concurrentielles incrémentales (vue Market)
+
+Prix, quantités et parts de marché par organisation commerciale, produit,
+canal, zone et période, sur toute la partie.
+"""
+
+import pandas as pd
+import numpy as np
+from typing import List, Optional
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Organisation agrégée « tout le marché » de la vue Market
+MARKET_ORG = 'Market'
+
+
+class MarketIntelligence:
+    """
+    Série agrégée (une ligne par organisation/produit/canal/zone/période)
+    des ventes du marché.
+
+    Comme ValuationTracker, seules les nouvelles lignes de Market (et de
+    Sales, pour notre propre part quand Market ne détaille pas notre
+    organisation) sont téléchargées ; elles sont agrégées aussitôt, la
+    mémoire ne dépend donc pas du nombre de lignes brutes.
+    """
+
+    SEGMENT = ['MATERIAL_DESCRIPTION', 'DISTRIBUTION_CHANNEL', 'AREA']
+    KEYS = ['SALES_ORGANIZATION'] + SEGMENT + ['PERIOD']
+
+    def __init__(self, client, own_org: Optional[str] = None, include_sales: bool = True,
+                 page_size: int = 5000):
+        """
+        Args:
+            client: Source des vues
+            own_org: Notre organisation commerciale (défaut: celle des lignes Sales)
+            include_sales: Compléter avec nos ventes si Market ne les détaille pas
+            page_size: Taille des pages lues
+        """
+        self.client = client
+        self.own_org = own_org
+        self.include_sales = include_sales
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Oublie la série (nouvelle partie)"""
+        with self._lock:
+            self.series = pd.DataFrame(columns=self.KEYS + ['SOURCE', 'QUANTITY', 'NET_VALUE'])
+            self._rows_seen = {'Market': 0, 'Sales': 0}
+            self._frame = None
+
+    def refresh(self) -> int:
+        """
+        Télécharge les lignes ajoutées depuis le dernier appel
+
+        Returns:
+            Nombre de nouvelles lignes lues
+        """
+        with self._lock:
+            views = ['Market', 'Sales'] if self.include_sales else ['Market']
+            return sum(self._refresh_view(view_name) for view_name in views)
+
+    def _refresh_view(self, view_name: str) -> int:
+        pages = []
+
+        for page in self.client.iter_pages(view_name, page_size=self.page_size,
+                                           start=self._rows_seen[view_name]):
+            self._rows_seen[view_name] += len(page)
+            pages.append(page)
+
+        if not pages:
+            return 0
+
+        self._append(self._compact(pd.concat(pages, ignore_index=True), view_name))
+        return sum(len(p) for p in pages)
+
+    def _compact(self, df: pd.DataFrame, view_name: str) -> pd.DataFrame:
+        """Agrège les lignes brutes par clé (quantité et valeur)"""
+        compact = pd.DataFrame(index=df.index)
+        for col in ['SALES_ORGANIZATION'] + self.SEGMENT:
+            compact[col] = df[col].astype(str) if col in df.columns else ''
+
+        period_col = 'SIMULATION_PERIOD' if view_name == 'Market' else 'SIM_ROUND'
+        compact['PERIOD'] = pd.to_numeric(df[period_col], errors='coerce').fillna(0).astype(int) \
+            if period_col in df.columns else 0
+        compact['QUANTITY'] = pd.to_numeric(df['QUANTITY'], errors='coerce').fillna(0) \
+            if 'QUANTITY' in df.columns else 0.0
+
+        if 'NET_VALUE' in df.columns:
+            compact['NET_VALUE'] = pd.to_numeric(df['NET_VALUE'], errors='coerce').fillna(0)
+        elif 'AVERAGE_PRICE' in df.columns:
+            compact['NET_VALUE'] = pd.to_numeric(df['AVERAGE_PRICE'], errors='coerce').fillna(0) * compact['QUANTITY']
+        else:
+            compact['NET_VALUE'] = 0.0
+
+        if view_name == 'Sales' and self.own_org is None and not compact.empty:
+            self.own_org = compact['SALES_ORGANIZATION'].iloc[0]
+
+        compact['SOURCE'] = view_name
+        return compact.groupby(self.KEYS + ['SOURCE'], as_index=False)[['QUANTITY', 'NET_VALUE']].sum()
+
+    def _append(self, new_rows: pd.DataFrame):
+        """Ajoute les agrégats (une période peut arriver en plusieurs fois)"""
+        if self.series.empty:
+            series = new_rows
+        else:
+            series = pd.concat([self.series, new_rows], ignore_index=True)
+            series = series.groupby(self.KEYS + ['SOURCE'], as_index=False)[['QUANTITY', 'NET_VALUE']].sum()
+
+        self.series = series
+        self._frame = None
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Série complète avec prix moyen, total du segment et part de marché
+
+        Returns:
+            DataFrame KEYS + QUANTITY, NET_VALUE, PRICE, MARKET_QUANTITY,
+            MARKET_PRICE, SHARE (%), PRICE_GAP_PCT (écart au prix du marché)
+        """
+        if self._frame is not None:
+            return self._frame
+        if self.series.empty:
+            return pd.DataFrame(columns=self.KEYS + ['QUANTITY', 'NET_VALUE', 'PRICE', 'MARKET_QUANTITY',
+                                                     'MARKET_PRICE', 'SHARE', 'PRICE_GAP_PCT'])
+
+        series = self.series
+        # Nos ventes ne servent que si Market ne détaille pas notre organisation
+        market_orgs = series.loc[series['SOURCE'] == 'Market', 'SALES_ORGANIZATION'].unique()
+        series = series[(series['SOURCE'] == 'Market') | ~series['SALES_ORGANIZATION'].isin(market_orgs)]
+        series = series.drop(columns='SOURCE').reset_index(drop=True)
+
+        # Total du segment : ligne « Market » si présente, sinon somme des organisations
+        segment_period = self.SEGMENT + ['PERIOD']
+        is_market = (series['SALES_ORGANIZATION'] == MARKET_ORG).to_numpy()
+        totals = series[is_market].groupby(segment_period)[['QUANTITY', 'NET_VALUE']].sum()
+        org_totals = series[~is_market].groupby(segment_period)[['QUANTITY', 'NET_VALUE']].sum()
+        totals = totals.combine_first(org_totals).rename(columns={'QUANTITY': 'MARKET_QUANTITY',
+                                                                  'NET_VALUE': 'MARKET_VALUE'})
+
+        frame = series.join(totals, on=segment_period)
+        quantity = frame['QUANTITY'].to_numpy(dtype=float)
+        market_quantity = frame['MARKET_QUANTITY'].to_numpy(dtype=float)
+        frame['PRICE'] = np.round(np.divide(frame['NET_VALUE'].to_numpy(dtype=float), quantity,
+                                            out=np.zeros(len(frame)), where=quantity > 0), 2)
+        frame['MARKET_PRICE'] = np.round(np.divide(frame['MARKET_VALUE'].to_numpy(dtype=float), market_quantity,
+                                                   out=np.zeros(len(frame)), where=market_quantity > 0), 2)
+        frame['SHARE'] = np.round(np.divide(quantity, market_quantity, out=np.zeros(len(frame)),
+                                            where=market_quantity > 0) * 100, 2)
+        market_price = frame['MARKET_PRICE'].to_numpy()
+        frame['PRICE_GAP_PCT'] = np.round(np.divide(frame['PRICE'].to_numpy() - market_price, market_price,
+                                                    out=np.zeros(len(frame)), where=market_price > 0) * 100, 2)
+
+        self._frame = (frame.drop(columns='MARKET_VALUE')
+                       .sort_values(self.KEYS, kind='stable')
+                       .reset_index(drop=True))
+        return self._frame
+
+    def periods(self) -> List[int]:
+        """Périodes connues, dans l'ordre"""
+        return sorted(self.series['PERIOD'].unique().tolist()) if not self.series.empty else []
+
+    def organizations(self) -> List[str]:
+        """Organisations présentes (hors agrégat « Market »)"""
+        orgs = self.frame()['SALES_ORGANIZATION'].unique().tolist()
+        return sorted(o for o in orgs if o != MARKET_ORG)
+
+    def query(self, product: Optional[str] = None, channel: Optional[str] = None,
+              area: Optional[str] = None, org: Optional[str] = None) -> pd.DataFrame:
+        """Série filtrée (produit = MATERIAL_DESCRIPTION)"""
+        frame = self.frame()
+        mask = np.ones(len(frame), dtype=bool)
+        for column, value in (('MATERIAL_DESCRIPTION', product), ('DISTRIBUTION_CHANNEL', channel),
+                              ('AREA', area), ('SALES_ORGANIZATION', org)):
+            if value is not None:
+                mask &= frame[column].to_numpy() == value
+        return frame[mask]
+
+    def _changes(self) -> pd.DataFrame:
+        """Variation de prix, quantité et part entre les deux dernières périodes de chaque série"""
+        frame = self.frame()
+        periods = self.periods()
+        if len(periods) < 2:
+            return pd.DataFrame()
+
+        last, previous = periods[-1], periods[-2]
+        series_keys = ['SALES_ORGANIZATION'] + self.SEGMENT
+        current = frame[frame['PERIOD'] == last].set_index(series_keys)
+        before = frame[frame['PERIOD'] == previous].set_index(series_keys)
+        changes = current[['PRICE', 'QUANTITY', 'SHARE']].join(
+            before[['PRICE', 'QUANTITY', 'SHARE']], rsuffix='_PREV', how='inner')
+
+        prev_price = changes['PRICE_PREV'].to_numpy()
+        changes['PRICE_CHANGE_PCT'] = np.round(np.divide(changes['PRICE'].to_numpy() - prev_price, prev_price,
+                                                         out=np.zeros(len(changes)), where=prev_price > 0) * 100, 2)
+        changes['SHARE_CHANGE'] = (changes['SHARE'] - changes['SHARE_PREV']).round(2)
+        changes['PERIOD'] = last
+        return changes.reset_index()
+
+    def competitor_moves(self, threshold_pct: float = 5.0) -> pd.DataFrame:
+        """
+        Changements de prix des concurrents à la dernière période
+
+        Args:
+            threshold_pct: Variation minimale (en valeur absolue, %)
+
+        Returns:
+            DataFrame trié par ampleur du mouvement
+        """
+        changes = self._changes()
+        if changes.empty:
+            return changes
+
+        competitors = ~changes['SALES_ORGANIZATION'].isin([MARKET_ORG, self.own_org])
+        moves = changes[competitors & (changes['PRICE_CHANGE_PCT'].abs() >= threshold_pct)]
+        moves = moves.assign(MOVE=np.where(moves['PRICE_CHANGE_PCT'] < 0, 'CUT', 'RAISE'))
+        return moves.reindex(moves['PRICE_CHANGE_PCT'].abs().sort_values(ascending=False).index)
+
+    def price_wars(self, threshold_pct: float = 3.0, min_orgs: int = 2, periods: int = 2) -> pd.DataFrame:
+        """
+        Segments en guerre des prix
+
+        Un segment (produit, canal, zone) est signalé si au moins `min_orgs`
+        concurrents ont baissé leur prix de `threshold_pct` % à la dernière
+        période, ou si le prix moyen du marché a baissé de `threshold_pct` %
+        à chacune des `periods` dernières périodes.
+
+        Returns:
+            DataFrame par segment: CUTTERS, AVG_CUT_PCT, MARKET_CHANGE_PCT,
+            CONSECUTIVE_DROPS
+        """
+        frame = self.frame()
+        known = self.periods()
+        if len(known) < 2:
+            return pd.DataFrame()
+
+        # Prix du marché par segment et période -> baisses consécutives
+        market = (frame.drop_duplicates(self.SEGMENT + ['PERIOD'])
+                  .pivot(index=self.SEGMENT, columns='PERIOD', values='MARKET_PRICE')
+                  .reindex(columns=known))
+        change = market.pct_change(axis=1, fill_method=None) * 100
+        recent = change.iloc[:, -periods:].to_numpy()
+        drops = np.nan_to_num(recent, nan=0.0) <= -threshold_pct
+        # Nombre de baisses consécutives en fin de série
+        consecutive = np.cumprod(drops[:, ::-1], axis=1).sum(axis=1)
+        wars = pd.DataFrame({'MARKET_CHANGE_PCT': change.iloc[:, -1].round(2).to_numpy(),
+                             'CONSECUTIVE_DROPS': consecutive}, index=market.index)
+
+        changes = self._changes()
+        cuts = changes[~changes['SALES_ORGANIZATION'].isin([MARKET_ORG, self.own_org])
+                       & (changes['PRICE_CHANGE_PCT'] <= -threshold_pct)]
+        cutters = cuts.groupby(self.SEGMENT)['PRICE_CHANGE_PCT'].agg(CUTTERS='size', AVG_CUT_PCT='mean')
+        wars = wars.join(cutters)
+        wars['CUTTERS'] = wars['CUTTERS'].fillna(0).astype(int)
+        wars['AVG_CUT_PCT'] = wars['AVG_CUT_PCT'].round(2)
+
+        flagged = (wars['CUTTERS'] >= min_orgs) | (wars['CONSECUTIVE_DROPS'] >= periods)
+        return (wars[flagged].reset_index()
+                .sort_values(['CUTTERS', 'MARKET_CHANGE_PCT'], ascending=[False, True], kind='stable')
+                [self.SEGMENT + ['CUTTERS', 'AVG_CUT_PCT', 'MARKET_CHANGE_PCT', 'CONSECUTIVE_DROPS']])
+
+    def share_trends(self, org: Optional[str] = None, by: Optional[List[str]] = None,
+                     window: int = 3) -> pd.DataFrame:
+        """
+        Évolution des parts de marché
+
+        Args:
+            org: Organisation (défaut: la nôtre ; None si inconnue = toutes)
+            by: Niveau d'agrégation parmi SEGMENT (défaut: produit x canal x zone)
+            window: Nombre de périodes pour la tendance
+
+        Returns:
+            DataFrame par organisation et segment: SHARE (dernière période),
+            SHARE_START (début de fenêtre), TREND (points de part par période)
+        """
+        frame = self.frame()
+        org = org or self.own_org
+        by = by or self.SEGMENT
+        known = self.periods()[-window:]
+        if frame.empty or not known:
+            return pd.DataFrame()
+
+        frame = frame[frame['PERIOD'].isin(known) & (frame['SALES_ORGANIZATION'] != MARKET_ORG)]
+        if org is not None:
+            frame = frame[frame['SALES_ORGANIZATION'] == org]
+
+        # Les parts se recalculent à partir des quantités au niveau demandé
+        grouped = frame.groupby(['SALES_ORGANIZATION'] + by + ['PERIOD'])[['QUANTITY', 'MARKET_QUANTITY']].sum()
+        share = (grouped['QUANTITY'] / grouped['MARKET_QUANTITY'].where(grouped['MARKET_QUANTITY'] > 0) * 100)
+        pivot = share.unstack('PERIOD').reindex(columns=known)
+
+        first = pivot.bfill(axis=1).iloc[:, 0]
+        last = pivot.ffill(axis=1).iloc[:, -1]
+        span = max(len(known) - 1, 1)
+        trends = pd.DataFrame({'SHARE': last.round(2), 'SHARE_START': first.round(2),
+                               'TREND': ((last - first) / span).round(2)})
+        return trends.reset_index().sort_values('TREND', kind='stable')
@@ -0,0 +1,356 @@
+"""
+Métriques de production au format texte Prometheus (optionnel)
+
+Désactivé par défaut. Une fois activé (`enable()`, ou METRICS_ENABLED=True
+pour le dashboard), chaque méthode publique de l'analyseur et des moteurs
+est enveloppée, et les appels OData / accès cache signalés par
+instrumentation.py sont comptés :
+
+- erpsim_method_calls_total, erpsim_method_errors_total,
+  erpsim_method_duration_seconds (histogramme), erpsim_method_result_rows_total
+- erpsim_odata_requests_total, erpsim_odata_duration_seconds (histogramme),
+  erpsim_odata_rows_total, erpsim_odata_bytes_total (par vue)
+- erpsim_cache_requests_total, erpsim_cache_hits_total, erpsim_cache_hit_ratio
+  (dashboard, snapshot, derived, data_service)
+
+Exposition : fichier texte (collecteur textfile de node_exporter,
+METRICS_FILE) ou endpoint local `/metrics` (METRICS_PORT).
+
+`profiling()` capture un profil cProfile (ou pyinstrument s'il est
+installé) d'une exécution ponctuelle, ex: `python cli.py --profile cprofile prices`.
+"""
+
+import cProfile
+import functools
+import importlib
+import inspect
+import io
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import instrumentation
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # pyinstrument est optionnel : repli sur cProfile
+    PyinstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_MIME = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Bornes des histogrammes de latence (secondes)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Classes instrumentées : (module, classe)
+INSTRUMENTED_CLASSES = [
+    ('analyzer', 'ERPSimAnalyzer'),
+    ('sales_engine', 'SalesEngine'),
+    ('procurement_engine', 'ProcurementEngine'),
+    ('finance_engine', 'FinanceEngine'),
+    ('inventory_valuation', 'InventoryValuationEngine'),
+    ('ledger_engine', 'GeneralLedgerEngine'),
+]
+
+METRIC_HELP = {
+    'erpsim_method_calls_total': ('counter', "Appels des méthodes de l'analyseur et des moteurs"),
+    'erpsim_method_errors_total': ('counter', "Appels terminés par une exception"),
+    'erpsim_method_duration_seconds': ('histogram', "Durée des appels de méthodes"),
+    'erpsim_method_result_rows_total': ('counter', "Lignes (ou clés) retournées par les méthodes"),
+    'erpsim_odata_requests_total': ('counter', "Requêtes OData par vue"),
+    'erpsim_odata_duration_seconds': ('histogram', "Durée des requêtes OData"),
+    'erpsim_odata_rows_total': ('counter', "Lignes reçues par vue"),
+    'erpsim_odata_bytes_total': ('counter', "Octets reçus par vue"),
+    'erpsim_cache_requests_total': ('counter', "Accès aux caches"),
+    'erpsim_cache_hits_total': ('counter', "Accès servis depuis le cache"),
+    'erpsim_cache_hit_ratio': ('gauge', "Part des accès servis depuis le cache"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Compteurs et histogrammes étiquetés, rendus au format Prometheus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1.0):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: Dict[str, str], value: float):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def value(self, name: str, **labels) -> float:
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0.0)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def _cache_ratios(self) -> Dict[Labels, float]:
+        ratios = {}
+        for (name, labels), requests in self.counters.items():
+            if name == 'erpsim_cache_requests_total' and requests:
+                hits = self.counters.get(('erpsim_cache_hits_total', labels), 0.0)
+                ratios[labels] = hits / requests
+        return ratios
+
+    def render(self) -> str:
+        """Exposition au format texte Prometheus 0.0.4"""
+        with self._lock:
+            series: Dict[str, List[str]] = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                series.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for labels, ratio in sorted(self._cache_ratios().items()):
+                series.setdefault('erpsim_cache_hit_ratio', []).append(
+                    f"erpsim_cache_hit_ratio{_format_labels(labels)} {_format_value(ratio)}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                lines = series.setdefault(name, [])
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        out = []
+        for name in METRIC_HELP:
+            if name in series:
+                kind, text = METRIC_HELP[name]
+                out.append(f"# HELP {name} {text}")
+                out.append(f"# TYPE {name} {kind}")
+                out.extend(series[name])
+        return '\n'.join(out) + '\n'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# Registre global du processus
+registry = MetricsRegistry()
+
+_originals: List[Tuple[type, str, object]] = []
+_enabled = False
+_enable_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+
+
+# --- Observateurs ---
+
+def _on_fetch(view_name: str, rows: int, nbytes: int, elapsed: float):
+    labels = {'view': view_name}
+    registry.inc('erpsim_odata_requests_total', labels)
+    registry.inc('erpsim_odata_rows_total', labels, rows)
+    registry.inc('erpsim_odata_bytes_total', labels, nbytes)
+    registry.observe('erpsim_odata_duration_seconds', labels, elapsed)
+
+
+def _on_cache(cache: str, hit: bool):
+    registry.inc('erpsim_cache_requests_total', {'cache': cache})
+    if hit:
+        registry.inc('erpsim_cache_hits_total', {'cache': cache})
+
+
+def _result_size(result) -> int:
+    try:
+        return len(result) if hasattr(result, '__len__') and not isinstance(result, str) else 0
+    except TypeError:
+        return 0
+
+
+def _wrap(func, label: str):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        labels = {'method': label}
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            registry.inc('erpsim_method_errors_total', labels)
+            raise
+        finally:
+            registry.inc('erpsim_method_calls_total', labels)
+            registry.observe('erpsim_method_duration_seconds', labels, time.perf_counter() - start)
+        registry.inc('erpsim_method_result_rows_total', labels, _result_size(result))
+        return result
+    return wrapper
+
+
+def _instrument_class(cls: type):
+    for name, member in list(vars(cls).items()):
+        if name.startswith('_') or isinstance(member, (classmethod, property)):
+            continue
+        label = f"{cls.__name__}.{name}"
+        if isinstance(member, staticmethod):
+            wrapped = staticmethod(_wrap(member.__func__, label))
+        elif inspect.isfunction(member):
+            wrapped = _wrap(member, label)
+        else:
+            continue
+        _originals.append((cls, name, member))
+        setattr(cls, name, wrapped)
+
+
+# --- Activation ---
+
+def enable():
+    """Active la collecte (idempotent) : méthodes enveloppées, observateurs branchés"""
+    global _enabled
+    with _enable_lock:
+        if _enabled:
+            return
+        for module_name, class_name in INSTRUMENTED_CLASSES:
+            _instrument_class(getattr(importlib.import_module(module_name), class_name))
+        instrumentation.add_listener(on_fetch=_on_fetch, on_cache=_on_cache)
+        _enabled = True
+    logger.info(f"✓ Métriques activées ({len(_originals)} méthodes instrumentées)")
+
+
+def disable():
+    """Restaure les méthodes d'origine et débranche les observateurs"""
+    global _enabled
+    with _enable_lock:
+        for cls, name, member in reversed(_originals):
+            setattr(cls, name, member)
+        _originals.clear()
+        instrumentation.remove_listener(on_fetch=_on_fetch, on_cache=_on_cache)
+        _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+# --- Exposition ---
+
+def write_file(path: str):
+    """Écrit les métriques (remplacement atomique, pour le collecteur textfile)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.metrics_', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(registry.render())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error(f"✗ Écriture des métriques impossible ({path}): {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', PROMETHEUS_MIME)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Sert /metrics dans un thread (un seul serveur par processus)"""
+    global _server
+    with _enable_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+            logger.info(f"✓ Métriques sur http://{host}:{_server.server_address[1]}/metrics")
+    return _server
+
+
+# --- Profilage ponctuel ---
+
+@contextmanager
+def profiling(mode: str = 'cprofile', output: Optional[str] = None, top: int = 25):
+    """
+    Profile le bloc de code
+
+    Args:
+        mode: 'cprofile' ou 'pyinstrument' (repli sur cProfile s'il est absent)
+        output: Fichier de sortie (.prof pour cProfile, .html pour pyinstrument) ;
+                sans fichier, le résumé est écrit sur stderr
+        top: Nombre de fonctions du résumé cProfile
+    """
+    if mode == 'pyinstrument' and PyinstrumentProfiler is None:
+        logger.warning("⚠ pyinstrument non installé, profilage avec cProfile")
+        mode = 'cprofile'
+
+    if mode == 'pyinstrument':
+        profiler = PyinstrumentProfiler()
+        profiler.start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            if output:
+                with open(output, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+            else:
+                print(profiler.output_text(unicode=True), file=sys.stderr)
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if output:
+            profiler.dump_stats(output)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(top)
+        print(summary.getvalue(), file=sys.stderr)
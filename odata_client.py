@@ -4,10 +4,12 @@ Client OData pour connexion à ERPsim
 
 import requests
 from requests.auth import HTTPBasicAuth
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 import pandas as pd
 from config import settings
+import instrumentation
 import logging
+import time
 import urllib3
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -16,10 +18,36 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def error_frame(message: str) -> pd.DataFrame:
+    """DataFrame vide marqué comme erreur amont (à distinguer d'une vue vide)"""
+    df = pd.DataFrame()
+    df.attrs['upstream_error'] = message
+    return df
+
+
+def is_upstream_error(df: pd.DataFrame) -> bool:
+    """True si le DataFrame vient d'une requête en échec (voir error_frame)"""
+    return bool(df.attrs.get('upstream_error'))
+
+
 class ODataClient:
     """Client pour se connecter à l'API OData ERPsim"""
 
-    def __init__(self):
+    def __init__(self, use_service: bool = True):
+        """
+        Args:
+            use_service: Passer par le rejeu (REPLAY_DIR) ou le service de
+                         données partagé (DATA_SERVICE_URL) s'ils sont
+                         configurés (False pour parler directement à SAP)
+        """
+        self.service = None
+        if use_service and settings.REPLAY_DIR:
+            from replay import get_replay_client
+            self.service = get_replay_client(settings.REPLAY_DIR, settings.REPLAY_SPEED)
+        elif use_service and settings.DATA_SERVICE_URL:
+            from data_service import DataServiceClient
+            self.service = DataServiceClient(settings.DATA_SERVICE_URL)
+
         self.base_url = settings.ODATA_BASE_URL.rstrip('/')
         self.auth = HTTPBasicAuth(settings.ODATA_USERNAME, settings.ODATA_PASSWORD)
         self.session = requests.Session()
@@ -31,7 +59,8 @@ class ODataClient:
         })
 
     def fetch_view(self, view_name: str, filters: Optional[Dict] = None,
-                   top: Optional[int] = None) -> pd.DataFrame:
+                   top: Optional[int] = None, skip: Optional[int] = None,
+                   select: Optional[List[str]] = None) -> pd.DataFrame:
         """
         Récupère les données d'une vue OData
 
@@ -39,10 +68,19 @@ class ODataClient:
             view_name: Nom de la vue (ex: "Sales", "Current_Inventory")
             filters: Filtres OData (ex: {"COMPANY_CODE": "ZZ01"})
             top: Nombre max de résultats
+            skip: Nombre de lignes à sauter (lecture incrémentale / pagination)
+            select: Colonnes à récupérer ($select), toutes par défaut
 
         Returns:
-            DataFrame avec les données
+            DataFrame avec les données (vide et marqué par error_frame si
+            la requête échoue)
         """
+        if self.service is not None:
+            start = time.perf_counter()
+            df = self.service.fetch_view(view_name, filters=filters, top=top, skip=skip, select=select)
+            instrumentation.record_fetch(view_name, len(df), self.service.last_bytes, time.perf_counter() - start)
+            return df
+
         url = f"{self.base_url}/{view_name}"
 
         params = {}
@@ -62,6 +100,13 @@ class ODataClient:
         if top:
             params['$top'] = top
 
+        if skip:
+            params['$skip'] = skip
+
+        if select:
+            params['$select'] = ','.join(select)
+
+        start = time.perf_counter()
         try:
             logger.info(f"Fetching {view_name}...")
             response = self.session.get(url, params=params, timeout=30)
@@ -81,12 +126,39 @@ class ODataClient:
 
             df = pd.DataFrame(results)
             logger.info(f"✓ Récupéré {len(df)} lignes depuis {view_name}")
+            instrumentation.record_fetch(view_name, len(df), len(response.content), time.perf_counter() - start)
 
             return df
 
         except requests.exceptions.RequestException as e:
             logger.error(f"✗ Erreur lors de la récupération de {view_name}: {e}")
-            return pd.DataFrame()
+            instrumentation.record_fetch(view_name, 0, 0, time.perf_counter() - start)
+            return error_frame(str(e))
+
+    def iter_pages(self, view_name: str, page_size: int = 5000,
+                   filters: Optional[Dict] = None, start: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        Parcourt une vue page par page ($top/$skip) sans tout charger en mémoire
+
+        Args:
+            view_name: Nom de la vue
+            page_size: Nombre de lignes par page
+            filters: Filtres OData
+            start: Nombre de lignes déjà lues à sauter
+
+        Yields:
+            Un DataFrame par page (la dernière page peut être incomplète)
+        """
+        skip = start
+
+        while True:
+            page = self.fetch_view(view_name, filters=filters, top=page_size, skip=skip)
+            if page.empty:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            skip += len(page)
 
     def test_connection(self) -> bool:
         """Teste la connexion à l'API"""
@@ -96,6 +168,8 @@ class ODataClient:
             # Essayer de récupérer les règles du jeu (petite requête)
             df = self.fetch_view("Current_Game_Rules", top=5)
 
+            if is_upstream_error(df):
+                return False
             if not df.empty:
                 logger.info("✓ Connexion OData réussie!")
                 return True
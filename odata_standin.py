@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Serveur OData v2 local simulant ERPsim (sans accès à SAP)
+
+Sert les vues d'une partie synthétique (voir synthetic_game.py) au format
+des services SAP : `{"d": {"results": [...]}}`, un `__metadata` par ligne,
+décimaux en texte. Les options $top, $skip, $select, $orderby,
+$inlinecount et $filter (égalités reliées par `and`, ce qu'envoie
+ODataClient) sont prises en charge ; seule la tranche demandée est
+sérialisée, même sur une vue de plusieurs millions de lignes.
+
+Lancement:
+    python odata_standin.py --port 8001 --rows 100000 --step-seconds 60
+
+Puis dans le .env:
+    ODATA_BASE_URL=http://127.0.0.1:8001/odata/300
+
+La partie avance d'un step toutes les `--step-seconds` secondes, ou à la
+demande : POST /_advance?steps=N (état courant : GET /_state).
+"""
+
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse, unquote
+
+import numpy as np
+import pandas as pd
+
+from synthetic_game import SyntheticGame, VIEWS
+
+logger = logging.getLogger(__name__)
+
+SERVICE_PATH = '/odata/300'
+NAMESPACE = 'ERPSIM'
+
+_FILTER_TERM = re.compile(r"^\s*(\w+)\s+eq\s+(?:'((?:[^']|'')*)'|([\w.+-]+))\s*$")
+
+
+class ODataError(Exception):
+    """Requête OData non prise en charge (réponse 400)"""
+
+
+def parse_filter(expression: str) -> Dict[str, str]:
+    """`A eq 'x' and B eq 5` -> {'A': 'x', 'B': '5'}"""
+    filters = {}
+    for term in re.split(r'\s+and\s+', expression.strip()):
+        match = _FILTER_TERM.match(term)
+        if not match:
+            raise ODataError(f"$filter non pris en charge: {term}")
+        column, text, literal = match.groups()
+        filters[column] = text.replace("''", "'") if text is not None else literal
+    return filters
+
+
+def apply_query(df: pd.DataFrame, query: Dict[str, str]) -> Tuple[pd.DataFrame, int]:
+    """
+    Applique les options OData à une vue
+
+    Returns:
+        (tranche demandée, nombre de lignes après filtre)
+    """
+    if '$filter' in query and not df.empty:
+        mask = np.ones(len(df), dtype=bool)
+        for column, value in parse_filter(query['$filter']).items():
+            if column not in df.columns:
+                raise ODataError(f"Propriété inconnue: {column}")
+            series = df[column]
+            if pd.api.types.is_numeric_dtype(series):
+                mask &= series.to_numpy() == float(value)
+            else:
+                mask &= series.to_numpy() == value
+        df = df[mask]
+
+    if '$orderby' in query:
+        columns, ascending = [], []
+        for part in query['$orderby'].split(','):
+            name, _, direction = part.strip().partition(' ')
+            if name not in df.columns:
+                raise ODataError(f"Propriété inconnue: {name}")
+            columns.append(name)
+            ascending.append(direction.strip().lower() != 'desc')
+        df = df.sort_values(columns, ascending=ascending, kind='stable')
+
+    total = len(df)
+    skip = int(query.get('$skip', 0) or 0)
+    top = query.get('$top')
+    df = df.iloc[skip:skip + int(top)] if top else df.iloc[skip:]
+
+    if '$select' in query:
+        columns = [c.strip() for c in query['$select'].split(',') if c.strip()]
+        unknown = [c for c in columns if c not in df.columns]
+        if unknown:
+            raise ODataError(f"Propriétés inconnues: {', '.join(unknown)}")
+        df = df[columns]
+
+    return df, total
+
+
+def _edm_type(series: pd.Series) -> str:
+    if pd.api.types.is_integer_dtype(series):
+        return 'Edm.Int32'
+    if pd.api.types.is_float_dtype(series):
+        return 'Edm.Decimal'
+    return 'Edm.String'
+
+
+def to_odata_results(df: pd.DataFrame, view_name: str, base_url: str) -> List[Dict]:
+    """
+    Lignes au format OData v2 JSON : décimaux en texte, `__metadata` par ligne
+    """
+    if df.empty:
+        return []
+
+    columns = {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if pd.api.types.is_float_dtype(df[col]):
+            columns[col] = np.char.mod('%.2f', values).tolist()
+        elif pd.api.types.is_integer_dtype(df[col]):
+            columns[col] = values.tolist()
+        else:
+            columns[col] = [None if v is None else str(v) for v in values]
+
+    entity_type = f"{NAMESPACE}.{view_name}Type"
+    records = []
+    for position, row in zip(df.index, zip(*columns.values())):
+        record = {'__metadata': {'id': f"{base_url}/{view_name}({position + 1})",
+                                 'uri': f"{base_url}/{view_name}({position + 1})",
+                                 'type': entity_type}}
+        record.update(zip(columns.keys(), row))
+        records.append(record)
+    return records
+
+
+def metadata_document(game: SyntheticGame) -> str:
+    """Document $metadata (EDMX) minimal décrivant les vues servies"""
+    types, sets = [], []
+    for view_name in VIEWS:
+        df = game.view(view_name)
+        properties = ''.join(f'<Property Name="{c}" Type="{_edm_type(df[c])}"/>' for c in df.columns)
+        key = df.columns[0] if len(df.columns) else 'ID'
+        types.append(f'<EntityType Name="{view_name}Type"><Key><PropertyRef Name="{key}"/></Key>'
+                     f'{properties}</EntityType>')
+        sets.append(f'<EntitySet Name="{view_name}" EntityType="{NAMESPACE}.{view_name}Type"/>')
+    return ('<?xml version="1.0" encoding="utf-8"?>'
+            '<edmx:Edmx Version="1.0" xmlns:edmx="http://schemas.microsoft.com/ado/2007/06/edmx">'
+            '<edmx:DataServices m:DataServiceVersion="2.0" '
+            'xmlns:m="http://schemas.microsoft.com/ado/2007/08/dataservices/metadata">'
+            f'<Schema Namespace="{NAMESPACE}" xmlns="http://schemas.microsoft.com/ado/2008/09/edm">'
+            f'{"".join(types)}<EntityContainer Name="{NAMESPACE}_Entities" m:IsDefaultEntityContainer="true">'
+            f'{"".join(sets)}</EntityContainer></Schema></edmx:DataServices></edmx:Edmx>')
+
+
+class StandInState:
+    """Partie partagée entre les requêtes, avancée sous verrou"""
+
+    def __init__(self, game: SyntheticGame):
+        self.game = game
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.stats = {'requests': 0, 'rows_served': 0, 'bytes_served': 0}
+
+    def record(self, rows: int, size: int):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['rows_served'] += rows
+            self.stats['bytes_served'] += size
+
+    def view(self, view_name: str) -> pd.DataFrame:
+        with self._lock:
+            return self.game.view(view_name)
+
+    def metadata(self) -> str:
+        with self._lock:
+            return metadata_document(self.game)
+
+    def advance(self, steps: int = 1) -> Dict:
+        with self._lock:
+            self.game.advance(steps)
+            return self.game.state()
+
+    def state(self) -> Dict:
+        with self._lock:
+            return dict(self.game.state(), **self.stats)
+
+    def auto_advance(self, step_seconds: float):
+        """Avance d'un step toutes les `step_seconds` secondes (partie « en direct »)"""
+        while not self._stop.wait(step_seconds):
+            state = self.advance(1)
+            logger.info(f"Step {state['sim_round']}-{state['sim_step']}")
+
+    def stop(self):
+        self._stop.set()
+
+
+def make_handler(state: StandInState, service_path: str = SERVICE_PATH):
+    """Construit le handler HTTP lié à une partie"""
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _send(self, status: int, body: bytes, content_type: str = 'application/json'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('DataServiceVersion', '2.0')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status: int, payload: Dict):
+            self._send(status, json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+
+        def _send_error(self, status: int, code: str, message: str):
+            self._send_json(status, {'error': {'code': code, 'message': {'lang': 'fr', 'value': message}}})
+
+        def do_POST(self):
+            parsed = urlparse(self.path)
+            if parsed.path != '/_advance':
+                self._send_error(404, 'NOT_FOUND', f"Ressource inconnue: {parsed.path}")
+                return
+            steps = int(parse_qs(parsed.query).get('steps', ['1'])[0])
+            self._send_json(200, state.advance(steps))
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            path = unquote(parsed.path).rstrip('/')
+
+            if path == '/_state':
+                self._send_json(200, state.state())
+                return
+
+            if not path.startswith(service_path):
+                self._send_error(404, 'NOT_FOUND', f"Service inconnu: {path}")
+                return
+
+            resource = path[len(service_path):].strip('/')
+            base_url = f"http://{self.headers.get('Host', 'localhost')}{service_path}"
+
+            if resource == '':
+                self._send_json(200, {'d': {'EntitySets': VIEWS}})
+                return
+            if resource == '$metadata':
+                body = state.metadata()
+                self._send(200, body.encode('utf-8'), 'application/xml')
+                return
+
+            view_name = resource.split('(')[0]
+            if view_name not in VIEWS:
+                self._send_error(404, 'RESOURCE_NOT_FOUND', f"Resource not found for segment '{view_name}'")
+                return
+
+            query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            try:
+                df, total = apply_query(state.view(view_name), query)
+            except (ODataError, ValueError) as e:
+                self._send_error(400, 'BAD_REQUEST', str(e))
+                return
+
+            payload = {'results': to_odata_results(df, view_name, base_url)}
+            if query.get('$inlinecount') == 'allpages':
+                payload['__count'] = str(total)
+            body = json.dumps({'d': payload}, separators=(',', ':')).encode('utf-8')
+            state.record(len(df), len(body))
+            self._send(200, body)
+
+    return StandInHandler
+
+
+def serve(port: int = 0, host: str = '127.0.0.1', game: Optional[SyntheticGame] = None,
+          step_seconds: Optional[float] = None) -> Tuple[ThreadingHTTPServer, StandInState]:
+    """
+    Démarre le serveur dans un thread
+
+    Args:
+        port: Port d'écoute (0 : port libre, voir server.server_address)
+        host: Interface d'écoute
+        game: Partie servie (défaut: une partie d'un round, graine 42)
+        step_seconds: Avance automatique d'un step toutes les N secondes
+    """
+    if game is None:
+        game = SyntheticGame(seed=42).advance(20)
+    state = StandInState(game)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    if step_seconds:
+        threading.Thread(target=state.auto_advance, args=(step_seconds,), daemon=True).start()
+    return server, state
+
+
+def base_url(server: ThreadingHTTPServer) -> str:
+    """URL à mettre dans ODATA_BASE_URL pour un serveur démarré par serve()"""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}{SERVICE_PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur OData ERPsim simulé (partie synthétique)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--seed', type=int, default=42, help="Graine de la partie")
+    parser.add_argument('--rows', type=int, default=1000, help="Lignes de ventes après les steps initiaux")
+    parser.add_argument('--steps', type=int, default=20, help="Steps joués avant le démarrage")
+    parser.add_argument('--step-seconds', type=float, default=0,
+                        help="Avance automatique d'un step toutes les N secondes (0: manuel)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    game = SyntheticGame.for_rows(args.rows, seed=args.seed, steps=args.steps)
+    server, state = serve(args.port, args.host, game, args.step_seconds or None)
+    logger.info(f"✓ Partie générée en {time.perf_counter() - start:.1f}s: {game.state()['rows']}")
+    logger.info(f"✓ OData simulé sur {base_url(server)}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        state.stop()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -13,9 +13,21 @@ logger = logging.getLogger(__name__)
 class ProcurementEngine:
     """Moteur de décision pour l'approvisionnement"""
 
-    def __init__(self, analyzer):
+    # Colonnes lues par méthode (cf. QueryPlanner.declare_needs)
+    DATA_NEEDS = {
+        'check_reorder_needed': {
+            'Current_Inventory': ['MATERIAL_NUMBER', 'STOCK', 'RESTRICTED'],
+            'Sales': ['MATERIAL_NUMBER', 'QUANTITY', 'SIM_STEP'],
+        },
+        'calculate_mrp_needs': {
+            'Independent_Requirements': ['MATERIAL_NUMBER', 'QUANTITY'],
+            'Current_Inventory': ['MATERIAL_NUMBER', 'STOCK'],
+        },
+    }
+
+    def __init__(self, analyzer, client=None):
         self.analyzer = analyzer
-        self.client = ODataClient()
+        self.client = client or ODataClient()
 
     def check_reorder_needed(self) -> Dict[str, Dict]:
         """
@@ -0,0 +1,160 @@
+"""
+Dimension produit : numéro de matériau <-> description, taille, saveur
+
+La vue Market n'a pas de MATERIAL_NUMBER : les jointures passent par la
+description. L'index est construit à partir des vues qui portent les deux
+colonnes, puis complété à chaque step (seuls les produits inconnus sont
+ajoutés) ; il repart de zéro à chaque nouvelle partie (`reset`).
+Les recherches se font par catégories : seules les valeurs distinctes sont
+normalisées, puis le résultat est redistribué par code.
+"""
+
+import logging
+import re
+import threading
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Vues portant MATERIAL_NUMBER et MATERIAL_DESCRIPTION (mêmes requêtes que les moteurs)
+SOURCE_VIEWS = {'Current_Pricing_Conditions': 1000, 'Sales': 10000, 'Current_Inventory': 1000}
+
+# Colonnes lues pour construire l'index (cf. QueryPlanner.declare_needs)
+DATA_NEEDS = {view: ['MATERIAL_NUMBER', 'MATERIAL_DESCRIPTION'] for view in SOURCE_VIEWS}
+
+_SIZE = re.compile(r'^\s*(\d+(?:[.,]\d+)?)\s*(kg|g)\b\s*(.*)$', re.IGNORECASE)
+_SUFFIX = re.compile(r'\s*\bmuesli\b\s*$', re.IGNORECASE)
+
+
+def normalize_descriptions(values: Iterable) -> np.ndarray:
+    """« 1KG  Raisin muesli » -> « 1kg raisin muesli » (casse et espaces)"""
+    return (pd.Index(values, dtype=object).astype(str)
+            .str.strip().str.lower().str.replace(r'\s+', ' ', regex=True).to_numpy())
+
+
+def normalize_numbers(values: Iterable) -> np.ndarray:
+    """« hh-f04 » -> « HH-F04 »"""
+    return pd.Index(values, dtype=object).astype(str).str.strip().str.upper().to_numpy()
+
+
+def parse_description(description: str):
+    """« 500g Raisin Muesli » -> ('500g', 'Raisin')"""
+    match = _SIZE.match(description or '')
+    if not match:
+        return None, _SUFFIX.sub('', description or '').strip() or None
+    amount, unit, rest = match.groups()
+    return f"{amount.replace(',', '.')}{unit.lower()}", _SUFFIX.sub('', rest).strip() or None
+
+
+class ProductIndex:
+    """
+    Table MATERIAL_NUMBER, MATERIAL_DESCRIPTION, CODE (F04...), SIZE, FLAVOR
+    indexée par description et par numéro normalisés
+    """
+
+    FIELDS = ['MATERIAL_NUMBER', 'MATERIAL_DESCRIPTION', 'CODE', 'SIZE', 'FLAVOR']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Oublie tous les produits (nouvelle partie)"""
+        with self._lock:
+            self.table = pd.DataFrame(columns=self.FIELDS)
+            self._by_description = pd.Index([], dtype=object)
+            self._description_rows = np.array([], dtype=np.int64)
+            self._by_number = pd.Index([], dtype=object)
+            self.built = False
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def build(self, client) -> 'ProductIndex':
+        """Construit ou complète l'index à partir des vues produit (appelable à chaque step)"""
+        added = 0
+        for view_name, top in SOURCE_VIEWS.items():
+            try:
+                added += self.extend(client.fetch_view(view_name, top=top, select=DATA_NEEDS[view_name]))
+            except Exception as e:
+                logger.warning(f"⚠ Index produit: {view_name} illisible ({e})")
+        self.built = True
+        if added:
+            logger.info(f"✓ Index produit: {added} produits ajoutés ({len(self)} au total)")
+        return self
+
+    def extend(self, df: pd.DataFrame) -> int:
+        """
+        Ajoute les couples (numéro, description) inconnus d'un DataFrame
+
+        Returns:
+            Nombre de produits ajoutés
+        """
+        if df is None or df.empty or not {'MATERIAL_NUMBER', 'MATERIAL_DESCRIPTION'} <= set(df.columns):
+            return 0
+
+        pairs = df[['MATERIAL_NUMBER', 'MATERIAL_DESCRIPTION']].dropna().drop_duplicates()
+        with self._lock:
+            numbers = normalize_numbers(pairs['MATERIAL_NUMBER'])
+            pairs = pairs[~pd.Index(numbers).isin(self._by_number)]
+            pairs = pairs.drop_duplicates('MATERIAL_NUMBER')
+            if pairs.empty:
+                return 0
+
+            parsed = [parse_description(str(d)) for d in pairs['MATERIAL_DESCRIPTION']]
+            new = pd.DataFrame({
+                'MATERIAL_NUMBER': pairs['MATERIAL_NUMBER'].astype(str).to_numpy(),
+                'MATERIAL_DESCRIPTION': pairs['MATERIAL_DESCRIPTION'].astype(str).to_numpy(),
+                'CODE': [str(n).rsplit('-', 1)[-1].strip().upper() for n in pairs['MATERIAL_NUMBER']],
+                'SIZE': [size for size, _ in parsed],
+                'FLAVOR': [flavor for _, flavor in parsed],
+            })
+            self.table = new if self.table.empty else pd.concat([self.table, new], ignore_index=True)
+            self._by_number = pd.Index(normalize_numbers(self.table['MATERIAL_NUMBER']))
+            # Une description partagée par deux numéros garde le premier
+            descriptions = pd.Index(normalize_descriptions(self.table['MATERIAL_DESCRIPTION']))
+            self._by_description = descriptions[~descriptions.duplicated()]
+            self._description_rows = np.flatnonzero(~descriptions.duplicated())
+            return len(new)
+
+    def lookup(self, values: Sequence, by: str = 'description', field: str = 'MATERIAL_NUMBER') -> np.ndarray:
+        """
+        Traduit une colonne (description ou numéro) vers un champ de l'index
+
+        Args:
+            values: Descriptions ou numéros (Series, liste...)
+            by: 'description' ou 'number'
+            field: Champ retourné (voir FIELDS)
+
+        Returns:
+            Tableau aligné sur `values`, None pour les valeurs inconnues
+        """
+        categorical = pd.Categorical(values)
+        categories = categorical.categories
+        if by == 'description':
+            positions = self._by_description.get_indexer(normalize_descriptions(categories))
+            rows = np.where(positions >= 0, self._description_rows[np.maximum(positions, 0)]
+                            if len(self._description_rows) else -1, -1)
+        else:
+            rows = self._by_number.get_indexer(normalize_numbers(categories))
+
+        # Une valeur par catégorie, puis redistribution par code (-1 = manquant -> None)
+        per_category = np.full(len(categories) + 1, None, dtype=object)
+        known = rows >= 0
+        per_category[:-1][known] = self.table[field].to_numpy(dtype=object)[rows[known]]
+        return per_category[categorical.codes]
+
+    def attach(self, df: pd.DataFrame, column: str = 'MATERIAL_DESCRIPTION',
+               fields: Sequence[str] = ('MATERIAL_NUMBER',), by: Optional[str] = None) -> pd.DataFrame:
+        """Copie de `df` complétée par les champs de l'index absents (jointure par `column`)"""
+        by = by or ('number' if column == 'MATERIAL_NUMBER' else 'description')
+        missing = [f for f in fields if f not in df.columns]
+        if df.empty or column not in df.columns or not missing:
+            return df
+        df = df.copy()
+        for field in missing:
+            df[field] = self.lookup(df[column], by=by, field=field)
+        return df
@@ -0,0 +1,233 @@
+"""
+Planificateur de requêtes OData déclaratif
+
+Les consommateurs (sections du dashboard, commandes CLI, moteurs) déclarent
+les vues, colonnes et filtres dont ils ont besoin. Le planificateur fusionne
+ces besoins en un minimum de requêtes — une par vue, avec l'union des
+colonnes ($select) et les filtres communs à tous ($filter) — les exécute en
+parallèle, puis rend à chaque consommateur sa tranche : filtres propres
+appliqués localement, colonnes projetées, `top` respecté.
+
+Les moteurs publient leurs besoins par méthode (`DATA_NEEDS` : vue ->
+colonnes, None = toutes), déclarés d'un coup avec `declare_needs`.
+
+Usage:
+    planner = QueryPlanner(client)
+    planner.declare('ventes', 'Sales', columns=['MATERIAL_NUMBER', 'NET_VALUE'])
+    planner.declare('zones', 'Sales', columns=['AREA', 'NET_VALUE'])
+    planner.declare('stocks', 'Current_Inventory', filters={'STORAGE_LOCATION': '02'})
+    planner.declare_needs('prix', SalesEngine.DATA_NEEDS['recommend_price_adjustments'])
+    results = planner.execute()
+    results['ventes']['Sales']  # DataFrame (MATERIAL_NUMBER, NET_VALUE)
+"""
+
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Besoins d'un consommateur : vue -> colonnes lues (None = toutes)
+Needs = Dict[str, Optional[List[str]]]
+
+
+def merge_needs(*needs: Needs) -> Needs:
+    """Union de plusieurs déclarations (None l'emporte : toutes les colonnes)"""
+    merged: Dict[str, Optional[List[str]]] = {}
+    for declaration in needs:
+        for view, columns in declaration.items():
+            if view in merged and (merged[view] is None or columns is None):
+                merged[view] = None
+            elif view in merged:
+                merged[view] = merged[view] + [c for c in columns if c not in merged[view]]
+            else:
+                merged[view] = None if columns is None else list(columns)
+    return merged
+
+
+def _as_number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+
+def same_value(a, b) -> bool:
+    """Égalité typée d'une valeur de filtre : 1 == '01', 2.0 == '2', 'Market' == ' Market'"""
+    number_a, number_b = _as_number(a), _as_number(b)
+    if number_a is not None and number_b is not None:
+        return number_a == number_b
+    return str(a).strip() == str(b).strip()
+
+
+def matches(values: pd.Series, value) -> pd.Series:
+    """Masque `values == value` avec la même égalité typée que same_value"""
+    number = _as_number(value)
+    text = values.astype(str).str.strip() == str(value).strip()
+    if number is None:
+        return text
+    numeric = pd.to_numeric(values, errors='coerce')
+    return (numeric == number) | (numeric.isna() & text)
+
+
+class DataNeed:
+    """Besoin de données d'un consommateur sur une vue"""
+
+    def __init__(self, consumer: str, view: str, columns: Optional[List[str]] = None,
+                 filters: Optional[Dict] = None, top: Optional[int] = None):
+        self.consumer = consumer
+        self.view = view
+        self.columns = list(columns) if columns else None
+        self.filters = dict(filters or {})
+        self.top = top
+
+    def __repr__(self):
+        return f"DataNeed({self.consumer!r}, {self.view!r}, columns={self.columns}, filters={self.filters}, top={self.top})"
+
+
+class PlannedRequest:
+    """Requête OData fusionnée pour une vue, et les besoins qu'elle sert"""
+
+    def __init__(self, view: str, needs: List[DataNeed]):
+        self.view = view
+        self.needs = needs
+
+        # Filtres communs à tous les besoins : envoyés au serveur
+        common = dict(needs[0].filters)
+        for need in needs[1:]:
+            common = {k: v for k, v in common.items() if k in need.filters and same_value(need.filters[k], v)}
+        self.filters = common
+        self.residual = {id(n): {k: v for k, v in n.filters.items() if k not in common} for n in needs}
+
+        # Union des colonnes (+ colonnes des filtres appliqués localement)
+        if any(n.columns is None for n in needs):
+            self.select = None
+        else:
+            select = []
+            for need in needs:
+                for col in need.columns + list(self.residual[id(need)]):
+                    if col not in select:
+                        select.append(col)
+            self.select = select
+
+        # Un `top` serveur n'est sûr que si aucun filtre n'est appliqué localement
+        has_residual = any(self.residual.values())
+        if has_residual or any(n.top is None for n in needs):
+            self.top = None
+        else:
+            self.top = max(n.top for n in needs)
+
+    def __repr__(self):
+        return f"PlannedRequest({self.view!r}, select={self.select}, filters={self.filters}, top={self.top}, needs={len(self.needs)})"
+
+    def slice_for(self, need: DataNeed, df: pd.DataFrame) -> pd.DataFrame:
+        """Tranche du résultat propre à un besoin"""
+        if df.empty:
+            return df.copy()
+
+        mask = pd.Series(True, index=df.index)
+        for col, value in self.residual[id(need)].items():
+            if col not in df.columns:
+                return df.iloc[0:0].copy()
+            mask &= matches(df[col], value)
+
+        sliced = df[mask]
+        if need.columns is not None:
+            sliced = sliced[[c for c in need.columns if c in sliced.columns]]
+        if need.top is not None:
+            sliced = sliced.head(need.top)
+        return sliced.copy()
+
+
+class QueryPlanner:
+    """Collecte les besoins déclarés puis les sert avec un minimum de requêtes"""
+
+    def __init__(self, client=None, max_workers: int = 4):
+        """
+        Args:
+            client: Source des vues (défaut: ODataClient)
+            max_workers: Nombre de requêtes exécutées en parallèle
+        """
+        if client is None:
+            from odata_client import ODataClient
+            client = ODataClient()
+        self.client = client
+        self.max_workers = max_workers
+        self.needs: List[DataNeed] = []
+
+    def declare(self, consumer: str, view: str, columns: Optional[List[str]] = None,
+                filters: Optional[Dict] = None, top: Optional[int] = None) -> 'QueryPlanner':
+        """
+        Déclare un besoin de données (un seul par consommateur et par vue)
+
+        Args:
+            consumer: Nom du consommateur (section, commande...)
+            view: Vue OData
+            columns: Colonnes utilisées (toutes par défaut)
+            filters: Filtres d'égalité (ex: {"STORAGE_LOCATION": "02"})
+            top: Nombre max de lignes
+        """
+        self.needs.append(DataNeed(consumer, view, columns, filters, top))
+        return self
+
+    def declare_needs(self, consumer: str, needs: Needs, top: Optional[int] = None) -> 'QueryPlanner':
+        """Déclare les besoins publiés par un moteur (vue -> colonnes, cf. DATA_NEEDS)"""
+        for view, columns in needs.items():
+            self.declare(consumer, view, columns=columns, top=top)
+        return self
+
+    def plan(self) -> List[PlannedRequest]:
+        """Une requête fusionnée par vue, dans l'ordre de première déclaration"""
+        by_view: Dict[str, List[DataNeed]] = {}
+        for need in self.needs:
+            by_view.setdefault(need.view, []).append(need)
+        return [PlannedRequest(view, needs) for view, needs in by_view.items()]
+
+    def _run(self, plan: List[PlannedRequest]) -> List[pd.DataFrame]:
+        def run(request: PlannedRequest) -> pd.DataFrame:
+            return self.client.fetch_view(request.view, filters=request.filters or None,
+                                          top=request.top, select=request.select)
+
+        if not plan:
+            return []
+
+        # Chaque requête garde le contexte de l'appelant (trace d'instrumentation)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(plan)))) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, run, request) for request in plan]
+            frames = [f.result() for f in futures]
+
+        logger.info(f"✓ Plan exécuté: {len(self.needs)} besoins servis par {len(plan)} requêtes")
+        return frames
+
+    def fetch(self) -> Dict[str, pd.DataFrame]:
+        """
+        Exécute le plan en parallèle, sans découpage par consommateur
+
+        Returns:
+            Dict[vue] -> résultat de la requête fusionnée (cf. PlannedRequest.select)
+        """
+        plan = self.plan()
+        return {request.view: df for request, df in zip(plan, self._run(plan))}
+
+    def execute(self) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """
+        Exécute le plan en parallèle
+
+        Returns:
+            Dict[consommateur][vue] -> DataFrame projeté
+        """
+        plan = self.plan()
+        frames = self._run(plan)
+
+        results: Dict[str, Dict[str, pd.DataFrame]] = {}
+        for request, df in zip(plan, frames):
+            for need in request.needs:
+                results.setdefault(need.consumer, {})[need.view] = request.slice_for(need, df)
+        return results
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Enregistrement et rejeu d'une partie ERPsim step par step
+
+Pendant la partie, `record` interroge SAP à intervalle régulier et, à chaque
+nouveau step (Company_Valuation), enregistre les réponses OData des vues
+suivies : lignes nouvelles pour les vues qui ne font que grossir (Sales,
+Market...), vue complète pour les autres. Les réponses sont gardées telles
+que reçues (texte des décimaux compris), colonnes `__*` exceptées.
+
+Après la partie, l'enregistrement se rejoue hors ligne :
+
+- REPLAY_DIR dans le .env : tous les ODataClient (dashboard, CLI, moteurs)
+  lisent l'enregistrement au lieu de SAP, à la vitesse REPLAY_SPEED
+  (1 = temps réel, 10 = dix fois plus vite, 0 = step par step à la demande)
+- `python replay.py serve DIR --speed 10` : rejeu derrière le serveur OData
+  simulé (odata_standin), pour passer par le vrai client HTTP
+- `python replay.py run DIR` : tous les steps le plus vite possible, avec
+  les recommandations recalculées à chaque step (profilage déterministe)
+
+    python replay.py record parties/h2_finale --interval 10
+    python replay.py run parties/h2_finale --profile cprofile
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+
+# Vues enregistrées ; celles qui ne font que grossir sont stockées par différence
+RECORDED_VIEWS = [
+    'Sales', 'Market', 'Company_Valuation', 'Financial_Postings', 'Current_Inventory',
+    'Current_Pricing_Conditions', 'Current_Game_Rules', 'Purchase_Orders',
+    'Production_Orders', 'Independent_Requirements'
+]
+APPEND_ONLY_VIEWS = {'Sales', 'Market', 'Company_Valuation', 'Financial_Postings'}
+
+
+def _step_dir(index: int) -> str:
+    return f"{index:05d}"
+
+
+def _write_frame(path: str, df: pd.DataFrame):
+    df = df[[c for c in df.columns if not str(c).startswith('__')]]
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump({'columns': list(df.columns), 'data': df.to_numpy().tolist()}, f,
+                  ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def _read_frame(path: str) -> pd.DataFrame:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        payload = json.load(f)
+    return pd.DataFrame(payload['data'], columns=payload['columns'])
+
+
+class ReplayRecorder:
+    """Enregistre les vues OData à chaque nouveau step d'une partie en cours"""
+
+    def __init__(self, directory: str, client=None, views: Optional[List[str]] = None, page_size: int = 5000):
+        """
+        Args:
+            directory: Dossier de l'enregistrement (créé ou complété)
+            client: Client OData (défaut: ODataClient direct, sans service partagé)
+            views: Vues enregistrées (défaut: RECORDED_VIEWS)
+            page_size: Taille des pages lues
+        """
+        if client is None:
+            from odata_client import ODataClient
+            client = ODataClient(use_service=False)
+        self.client = client
+        self.directory = directory
+        self.views = views or RECORDED_VIEWS
+        self.page_size = page_size
+        os.makedirs(directory, exist_ok=True)
+
+        manifest_path = os.path.join(directory, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'created_at': datetime.now().isoformat(timespec='seconds'),
+                             'views': self.views, 'append_only': sorted(APPEND_ONLY_VIEWS), 'steps': []}
+        self._rows_seen: Dict[str, int] = dict(self.manifest.get('rows_seen', {}))
+        self._t0 = time.monotonic() - (self.manifest['steps'][-1]['offset_s'] if self.manifest['steps'] else 0)
+
+    def _read(self, view_name: str, start: int = 0) -> pd.DataFrame:
+        pages = list(self.client.iter_pages(view_name, page_size=self.page_size, start=start))
+        return pd.concat(pages, ignore_index=True) if pages else pd.DataFrame()
+
+    def current_step(self) -> Optional[Tuple[int, int]]:
+        """Dernier (SIM_ROUND, SIM_STEP) publié par SAP"""
+        df = self.client.fetch_view('Company_Valuation', skip=max(0, self._rows_seen.get('Company_Valuation', 0) - 1))
+        if df.empty or 'SIM_ROUND' not in df.columns:
+            return None
+        steps = df[['SIM_ROUND', 'SIM_STEP']].apply(pd.to_numeric, errors='coerce').dropna().astype(int)
+        if steps.empty:
+            return None
+        last = max(map(tuple, steps.to_numpy().tolist()))
+        return int(last[0]), int(last[1])
+
+    def capture(self, step: Tuple[int, int]) -> Dict[str, int]:
+        """Enregistre toutes les vues pour le step donné ; retourne les lignes écrites par vue"""
+        index = len(self.manifest['steps'])
+        step_path = os.path.join(self.directory, _step_dir(index))
+        os.makedirs(step_path, exist_ok=True)
+
+        written = {}
+        for view_name in self.views:
+            if view_name in APPEND_ONLY_VIEWS:
+                df = self._read(view_name, start=self._rows_seen.get(view_name, 0))
+                self._rows_seen[view_name] = self._rows_seen.get(view_name, 0) + len(df)
+            else:
+                df = self._read(view_name)
+            _write_frame(os.path.join(step_path, f"{view_name}.json.gz"), df)
+            written[view_name] = len(df)
+
+        self.manifest['steps'].append({
+            'sim_round': step[0], 'sim_step': step[1],
+            'offset_s': round(time.monotonic() - self._t0, 2),
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'rows': written
+        })
+        self.manifest['rows_seen'] = self._rows_seen
+        with open(os.path.join(self.directory, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"✓ Step {step[0]}-{step[1]} enregistré ({sum(written.values())} lignes)")
+        return written
+
+    def poll(self) -> Optional[Tuple[int, int]]:
+        """Enregistre le step courant s'il est nouveau ; retourne ce step ou None"""
+        step = self.current_step()
+        steps = self.manifest['steps']
+        if step is None or (steps and (steps[-1]['sim_round'], steps[-1]['sim_step']) == step):
+            return None
+        self.capture(step)
+        return step
+
+    def run(self, interval: float = 10.0, max_steps: Optional[int] = None):
+        """Boucle d'enregistrement (Ctrl+C pour arrêter)"""
+        recorded = 0
+        while max_steps is None or recorded < max_steps:
+            try:
+                if self.poll() is not None:
+                    recorded += 1
+            except Exception as e:
+                logger.error(f"✗ Enregistrement échoué: {e}")
+            time.sleep(interval)
+
+
+class Recording:
+    """Enregistrement relu : vue telle qu'elle était à chaque step"""
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.directory = directory
+        self.steps: List[Dict] = self.manifest['steps']
+        self.views: List[str] = self.manifest['views']
+        self.append_only = set(self.manifest.get('append_only', APPEND_ONLY_VIEWS))
+        self._lock = threading.Lock()
+        self._parts: Dict[Tuple[str, int], pd.DataFrame] = {}
+        self._cumulative: Dict[str, Tuple[int, pd.DataFrame]] = {}
+        if not self.steps:
+            raise ValueError(f"Enregistrement vide: {directory}")
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def _part(self, view_name: str, index: int) -> pd.DataFrame:
+        key = (view_name, index)
+        if key not in self._parts:
+            path = os.path.join(self.directory, _step_dir(index), f"{view_name}.json.gz")
+            self._parts[key] = _read_frame(path) if os.path.exists(path) else pd.DataFrame()
+        return self._parts[key]
+
+    def frame(self, view_name: str, index: int) -> pd.DataFrame:
+        """Vue au step `index` (0 = premier step enregistré) ; partagée, ne pas modifier"""
+        if view_name not in self.views:
+            raise KeyError(f"Vue non enregistrée: {view_name}")
+        index = max(0, min(index, len(self.steps) - 1))
+
+        with self._lock:
+            if view_name not in self.append_only:
+                return self._part(view_name, index)
+
+            # Vues cumulatives : on repart du dernier cumul si on avance
+            done, cumulative = self._cumulative.get(view_name, (-1, pd.DataFrame()))
+            if done > index:
+                done, cumulative = -1, pd.DataFrame()
+            parts = [cumulative] + [self._part(view_name, i) for i in range(done + 1, index + 1)]
+            parts = [p for p in parts if not p.empty]
+            cumulative = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+            self._cumulative[view_name] = (index, cumulative)
+            return cumulative
+
+
+class ReplayClient:
+    """
+    Rejeu d'un enregistrement, même interface que ODataClient.fetch_view
+
+    Le step servi suit l'horloge : temps écoulé depuis le premier appel x
+    `speed`, comparé aux instants d'enregistrement. Avec `speed` <= 0, le
+    step n'avance que par `advance()`.
+    """
+
+    def __init__(self, recording: Recording, speed: float = 1.0):
+        self.recording = recording
+        self.speed = speed
+        self.index = 0
+        self._started: Optional[float] = None
+        # Taille de la dernière réponse (instrumentation, cf. DataServiceClient)
+        self.last_bytes = 0
+
+    def current_index(self) -> int:
+        if self.speed <= 0:
+            return self.index
+        if self._started is None:
+            self._started = time.monotonic()
+        elapsed = (time.monotonic() - self._started) * self.speed
+        offsets = [s['offset_s'] - self.recording.steps[0]['offset_s'] for s in self.recording.steps]
+        while self.index + 1 < len(offsets) and offsets[self.index + 1] <= elapsed:
+            self.index += 1
+        return self.index
+
+    def current_step(self) -> Tuple[int, int]:
+        step = self.recording.steps[self.current_index()]
+        return step['sim_round'], step['sim_step']
+
+    def advance(self, steps: int = 1) -> bool:
+        """Passe aux steps suivants ; False si l'enregistrement était déjà fini"""
+        previous = self.index
+        self.index = min(self.index + steps, len(self.recording) - 1)
+        return self.index != previous
+
+    def fetch_view(self, view_name: str, filters: Optional[Dict] = None,
+                   top: Optional[int] = None, skip: Optional[int] = None,
+                   select: Optional[List[str]] = None) -> pd.DataFrame:
+        from odata_standin import ODataError, apply_query
+
+        try:
+            df = self.recording.frame(view_name, self.current_index())
+        except KeyError:
+            logger.error(f"✗ {view_name} absent de l'enregistrement")
+            return pd.DataFrame()
+
+        query = {}
+        if filters:
+            query['$filter'] = ' and '.join(f"{k} eq '{v}'" if isinstance(v, str) else f"{k} eq {v}"
+                                            for k, v in filters.items())
+        if top:
+            query['$top'] = str(top)
+        if skip:
+            query['$skip'] = str(skip)
+        if select:
+            query['$select'] = ','.join(c for c in select if c in df.columns)
+
+        try:
+            df, _ = apply_query(df, query)
+        except (ODataError, ValueError) as e:
+            logger.error(f"✗ Requête rejouée invalide pour {view_name}: {e}")
+            return pd.DataFrame()
+        return df.copy()
+
+    def iter_pages(self, view_name: str, page_size: int = 5000,
+                   filters: Optional[Dict] = None, start: int = 0) -> Iterator[pd.DataFrame]:
+        skip = start
+        while True:
+            page = self.fetch_view(view_name, filters=filters, top=page_size, skip=skip)
+            if page.empty:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            skip += len(page)
+
+
+class ReplayGame:
+    """Enregistrement présenté comme une partie synthétique (pour odata_standin)"""
+
+    def __init__(self, recording: Recording):
+        self.recording = recording
+        self.index = 0
+
+    def view(self, view_name: str) -> pd.DataFrame:
+        if view_name not in self.recording.views:
+            return pd.DataFrame()
+        return self.recording.frame(view_name, self.index)
+
+    def advance(self, steps: int = 1) -> 'ReplayGame':
+        self.index = min(self.index + steps, len(self.recording) - 1)
+        return self
+
+    def state(self) -> Dict:
+        step = self.recording.steps[self.index]
+        return {'sim_round': step['sim_round'], 'sim_step': step['sim_step'],
+                'elapsed_steps': self.index + 1, 'rows': step.get('rows', {})}
+
+
+_shared_clients: Dict[str, ReplayClient] = {}
+_shared_lock = threading.Lock()
+
+
+def get_replay_client(directory: str, speed: float = 1.0) -> ReplayClient:
+    """Client de rejeu partagé par le processus (une seule horloge par enregistrement)"""
+    with _shared_lock:
+        if directory not in _shared_clients:
+            _shared_clients[directory] = ReplayClient(Recording(directory), speed)
+            logger.info(f"✓ Rejeu de {directory} (x{speed})")
+        return _shared_clients[directory]
+
+
+def replay_all(directory: str, on_step=None) -> pd.DataFrame:
+    """
+    Rejoue tous les steps le plus vite possible
+
+    Args:
+        directory: Enregistrement
+        on_step: Fonction(analyzer, client) appelée à chaque step
+                 (défaut: compute_all_recommendations)
+
+    Returns:
+        DataFrame (SIM_ROUND, SIM_STEP, SECONDS) du temps de calcul par step
+    """
+    from analyzer import ERPSimAnalyzer
+    from snapshot import compute_all_recommendations
+
+    client = ReplayClient(Recording(directory), speed=0)
+    analyzer = ERPSimAnalyzer(client=client)
+    on_step = on_step or (lambda a, c: compute_all_recommendations(a))
+
+    timings = []
+    while True:
+        analyzer.get_step_key()
+        start = time.perf_counter()
+        on_step(analyzer, client)
+        sim_round, sim_step = client.current_step()
+        timings.append({'SIM_ROUND': sim_round, 'SIM_STEP': sim_step,
+                        'SECONDS': round(time.perf_counter() - start, 4)})
+        if not client.advance():
+            break
+    return pd.DataFrame(timings)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Enregistrement / rejeu d'une partie ERPsim")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('record', help="Enregistrer la partie en cours (SAP)")
+    p.add_argument('directory')
+    p.add_argument('--interval', type=float, default=10.0, help="Secondes entre deux vérifications de step")
+    p.add_argument('--max-steps', type=int)
+
+    p = sub.add_parser('serve', help="Rejouer derrière un serveur OData local")
+    p.add_argument('directory')
+    p.add_argument('--port', type=int, default=8001)
+    p.add_argument('--speed', type=float, default=1.0, help="Accélération (0: avance via POST /_advance)")
+
+    p = sub.add_parser('run', help="Rejouer tous les steps le plus vite possible")
+    p.add_argument('directory')
+    p.add_argument('--profile', choices=['cprofile', 'pyinstrument'])
+    p.add_argument('--profile-output')
+    p.add_argument('-o', '--output', help="Temps par step (CSV)")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(message)s', stream=sys.stderr)
+
+    if args.command == 'record':
+        ReplayRecorder(args.directory).run(args.interval, args.max_steps)
+        return 0
+
+    if args.command == 'serve':
+        import odata_standin
+
+        recording = Recording(args.directory)
+        intervals = [b['offset_s'] - a['offset_s'] for a, b in zip(recording.steps, recording.steps[1:])]
+        step_seconds = (sum(intervals) / len(intervals) / args.speed) if intervals and args.speed > 0 else None
+        server, state = odata_standin.serve(args.port, game=ReplayGame(recording), step_seconds=step_seconds)
+        logger.info(f"✓ Rejeu de {len(recording)} steps sur {odata_standin.base_url(server)}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            state.stop()
+            server.shutdown()
+        return 0
+
+    logging.getLogger('odata_client').setLevel(logging.WARNING)
+    if args.profile:
+        import metrics
+        with metrics.profiling(args.profile, args.profile_output):
+            timings = replay_all(args.directory)
+    else:
+        timings = replay_all(args.directory)
+
+    print(timings.to_string(index=False))
+    print(f"\n{len(timings)} steps, {timings['SECONDS'].sum():.2f}s de calcul "
+          f"(médiane {timings['SECONDS'].median() * 1000:.0f} ms/step)")
+    if args.output:
+        timings.to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
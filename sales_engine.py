@@ -5,17 +5,95 @@ Moteur de décision pour les ventes
 import pandas as pd
 from typing import Dict, Tuple
 from odata_client import ODataClient
+from product_index import ProductIndex
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Seuils de l'algorithme ZMARKET (voir backtester.py pour les calibrer)
+PRICING_RULES = {
+    'HIGH_VELOCITY': 50,   # Unités vendues (arbitraire, à ajuster)
+    'LOW_VELOCITY': 10,
+    'HIGH_STOCK': 500,
+    'LOW_STOCK': 100,      # Risque de rupture
+    'BAND_PCT': 1.0,       # Écart au marché considéré comme aligné (+/- %)
+    'UNDERCUT': 0.99,      # Prix trop élevé -> légèrement sous le marché
+    'CLEARANCE': 0.95,     # Stock élevé -> liquider
+}
+
+# Élasticité prix de la demande par canal de distribution
+CHANNEL_ELASTICITIES = {'10': -4.0, '12': -2.5, '14': -1.5}
+
+
+def decide_price_action(my_price: float, market_price: float, velocity: float, stock: float,
+                        rules: Dict = PRICING_RULES) -> Tuple[str, str, float]:
+    """
+    Algorithme ZMARKET pour un produit/canal
+
+    Scénarios A (Prix < Marché), B (Prix > Marché), C (Prix = Marché)
+
+    Returns:
+        (action, raison, prix conseillé)
+    """
+    gap_pct = (my_price - market_price) / market_price * 100
+
+    # Scénario A : Prix < Moyenne ZMARKET
+    if gap_pct < -rules['BAND_PCT']:
+        # "Si vos ventes sont très rapides et risque rupture -> Augmenter"
+        if velocity > rules['HIGH_VELOCITY'] or stock < rules['LOW_STOCK']:
+            return "INCREASE", "Prix bas + Fortes ventes -> Augmenter marge", (my_price + market_price) / 2
+        return "MAINTAIN", "Prix bas mais ventes faibles/normales -> Gagner PDM", my_price
+
+    # Scénario B : Prix > Moyenne ZMARKET
+    if gap_pct > rules['BAND_PCT']:
+        # "Si vous vendez bien -> Ne rien changer"
+        if velocity > rules['HIGH_VELOCITY']:
+            return "MAINTAIN", "Prix premium accepté par le marché", my_price
+        # "Si vous vendez peu -> Baisser"
+        if velocity < rules['LOW_VELOCITY']:
+            return "DECREASE", "Prix trop élevé, ventes faibles -> S'aligner", market_price * rules['UNDERCUT']
+        return "MONITOR", "Ventes moyennes à prix élevé", my_price
+
+    # Scénario C : Prix = Moyenne
+    # "Si beaucoup d'inventaire invendu -> Baisser"
+    if stock > rules['HIGH_STOCK'] and velocity < rules['HIGH_VELOCITY']:
+        return "DECREASE", "Stock élevé -> Liquider", market_price * rules['CLEARANCE']
+    return "MAINTAIN", "Aligné et stock correct", my_price
+
 
 class SalesEngine:
     """Moteur de décision pour les ventes"""
 
-    def __init__(self, analyzer):
+    # Colonnes lues par méthode (cf. QueryPlanner.declare_needs). Market est
+    # lue en entier (colonnes variables selon les parties) ; l'index produit
+    # déclare les siennes (product_index.DATA_NEEDS).
+    DATA_NEEDS = {
+        'get_active_products': {'Current_Pricing_Conditions': ['MATERIAL_NUMBER']},
+        'recommend_price_adjustments': {
+            'Market': None,
+            'Current_Pricing_Conditions': ['MATERIAL_NUMBER', 'DISTRIBUTION_CHANNEL', 'PRICE'],
+            'Sales': ['MATERIAL_NUMBER', 'DISTRIBUTION_CHANNEL', 'QUANTITY'],
+            'Current_Inventory': ['MATERIAL_NUMBER', 'STOCK'],
+        },
+        'recommend_marketing_strategy': {
+            'Current_Pricing_Conditions': ['MATERIAL_NUMBER'],
+            'Current_Inventory': ['MATERIAL_NUMBER', 'STOCK'],
+        },
+    }
+
+    def __init__(self, analyzer, client=None):
         self.analyzer = analyzer
-        self.client = ODataClient()
+        self.client = client or ODataClient()
+        self.pricing_rules = dict(PRICING_RULES)
+        self._own_index = ProductIndex()
+
+    def _product_index(self) -> ProductIndex:
+        """Index produit de l'analyseur (partagé entre moteurs), sinon propre au moteur"""
+        if isinstance(getattr(self.analyzer, 'product_index', None), ProductIndex):
+            return self.analyzer.get_product_index()
+        if not self._own_index.built:
+            self._own_index.build(self.client)
+        return self._own_index
 
     def get_active_products(self) -> list[str]:
         """
@@ -46,20 +124,10 @@ class SalesEngine:
         Note: Market view n'a pas MATERIAL_NUMBER, on doit mapper via Description.
         """
         market_df = self.client.fetch_view("Market", top=10000)
-        # On a besoin d'une table de mapping Description -> Material Number
-        # On utilise Current_Pricing_Conditions ou Products pour ça
-        products_df = self.client.fetch_view("Current_Pricing_Conditions", top=1000)
-        
+
         if market_df.empty:
             return {}
-            
-        # Créer le mapping Description -> Material Number
-        desc_map = {}
-        if not products_df.empty and 'MATERIAL_DESCRIPTION' in products_df.columns and 'MATERIAL_NUMBER' in products_df.columns:
-            # On drop les doublons pour avoir des paires uniques
-            unique_products = products_df[['MATERIAL_DESCRIPTION', 'MATERIAL_NUMBER']].drop_duplicates()
-            desc_map = dict(zip(unique_products['MATERIAL_DESCRIPTION'], unique_products['MATERIAL_NUMBER']))
-            
+
         # Nettoyage
         if 'AVERAGE_PRICE' in market_df.columns:
              market_df['AVERAGE_PRICE'] = pd.to_numeric(market_df['AVERAGE_PRICE'], errors='coerce').fillna(0)
@@ -88,19 +156,13 @@ class SalesEngine:
             'AVERAGE_PRICE': 'mean', 
         }).reset_index()
         
-        for _, row in grouped.iterrows():
-            desc = row['MATERIAL_DESCRIPTION']
-            dc = row['DISTRIBUTION_CHANNEL']
-            avg_price = row['AVERAGE_PRICE']
-            
-            # Retrouver le matériel number
-            material = desc_map.get(desc)
-            
-            if material and avg_price > 0:
-                if material not in benchmarks:
-                    benchmarks[material] = {}
-                benchmarks[material][dc] = round(avg_price, 2)
-                
+        # Retrouver le matériel number via l'index produit
+        grouped['MATERIAL_NUMBER'] = self._product_index().lookup(grouped['MATERIAL_DESCRIPTION'])
+        grouped = grouped[grouped['MATERIAL_NUMBER'].notna() & (grouped['AVERAGE_PRICE'] > 0)]
+
+        for material, dc, avg_price in grouped[['MATERIAL_NUMBER', 'DISTRIBUTION_CHANNEL', 'AVERAGE_PRICE']].itertuples(index=False):
+            benchmarks.setdefault(material, {})[dc] = round(avg_price, 2)
+
         return benchmarks
 
     def recommend_price_adjustments(self) -> pd.DataFrame:
@@ -167,60 +229,10 @@ class SalesEngine:
             velocity = sales_velocity.get((material, dc), 0)
             stock = stock_levels.get(material, 0)
             
-            gap = my_price - market_price
-            gap_pct = (gap / market_price) * 100
-            
-            action = "MAINTAIN" 
-            reason = "Aligné marché"
-            new_price = my_price
-            
-            # Seuils
-            HIGH_VELOCITY = 50 # Unités vendues (arbitraire, à ajuster)
-            LOW_VELOCITY = 10
-            HIGH_STOCK = 500
-            
-            # --- ALGORYTHME ZMARKET ---
-            
-            # Scénario A : Prix < Moyenne ZMARKET (ex: gap_pct < -2%)
-            if gap_pct < -1.0: 
-                situation = "Prix inférieur au marché"
-                # "Si vos ventes sont très rapides et risque rupture -> Augmenter"
-                if velocity > HIGH_VELOCITY or stock < 100:
-                    action = "INCREASE"
-                    reason = "Prix bas + Fortes ventes -> Augmenter marge"
-                    new_price = (my_price + market_price) / 2 # On se rapproche de la moyenne
-                else:
-                    action = "MAINTAIN"
-                    reason = "Prix bas mais ventes faibles/normales -> Gagner PDM"
-
-            # Scénario B : Prix > Moyenne ZMARKET (ex: gap_pct > 2%)
-            elif gap_pct > 1.0:
-                situation = "Prix supérieur au marché"
-                # "Si vous vendez bien -> Ne rien changer"
-                if velocity > HIGH_VELOCITY:
-                    action = "MAINTAIN"
-                    reason = "Prix premium accepté par le marché"
-                # "Si vous vendez peu -> Baisser"
-                elif velocity < LOW_VELOCITY:
-                    action = "DECREASE"
-                    reason = "Prix trop élevé, ventes faibles -> S'aligner"
-                    new_price = market_price * 0.99 # Légèrement sous le marché
-                else:
-                    action = "MONITOR"
-                    reason = "Ventes moyennes à prix élevé"
-
-            # Scénario C : Prix = Moyenne (à +/- 1%)
-            else: 
-                situation = "Aligné marché"
-                # "Si beaucoup d'inventaire invendu -> Baisser"
-                if stock > HIGH_STOCK and velocity < HIGH_VELOCITY:
-                    action = "DECREASE"
-                    reason = "Stock élevé -> Liquider"
-                    new_price = market_price * 0.95
-                else:
-                    action = "MAINTAIN"
-                    reason = "Aligné et stock correct"
-            
+            gap_pct = (my_price - market_price) / market_price * 100
+            action, reason, new_price = decide_price_action(my_price, market_price, velocity, stock,
+                                                            self.pricing_rules)
+
             recommendations.append({
                 'Produit': material,
                 'Canal': dc,
@@ -264,6 +276,9 @@ class SalesEngine:
         if sales_df.empty or market_df.empty:
             return {}
 
+        # Market n'a pas MATERIAL_NUMBER : jointure par description
+        market_df = self._product_index().attach(market_df)
+
         # Conversion des types pour éviter les erreurs de calcul
         for col in ['NET_VALUE', 'QUANTITY', 'COST']:
             if col in sales_df.columns:
@@ -297,8 +312,7 @@ class SalesEngine:
                 market_avg_price = market_prices['NET_VALUE'].values[0] / market_prices['QUANTITY'].values[0] if market_prices['QUANTITY'].values[0] > 0 else 0
 
                 # Élasticité par DC
-                elasticities = {'10': -4.0, '12': -2.5, '14': -1.5}
-                elasticity = elasticities.get(dc, -2.5)
+                elasticity = CHANNEL_ELASTICITIES.get(dc, -2.5)
 
                 # Formule simple: ajuster le prix selon la part de marche
                 market_share = dc_sales['QUANTITY'].sum() / market_prices['QUANTITY'].sum()
@@ -330,6 +344,9 @@ class SalesEngine:
         if sales_df.empty or market_df.empty:
             return {}
 
+        # Market n'a pas MATERIAL_NUMBER : jointure par description
+        market_df = self._product_index().attach(market_df)
+
         # Conversion des types
         for col in ['NET_VALUE', 'QUANTITY', 'COST']:
             if col in sales_df.columns:
@@ -507,12 +524,13 @@ class SalesEngine:
             if 'STOCK' in inventory_df.columns: inventory_df['STOCK'] = pd.to_numeric(inventory_df['STOCK'], errors='coerce').fillna(0)
             stock_map = inventory_df.groupby('MATERIAL_NUMBER')['STOCK'].sum().to_dict()
             
-        # 3. Récupérer les descriptions
-        sales_summary = self.analyzer.get_sales_summary()
-        desc_map = {}
-        if not sales_summary.empty:
-            desc_map = dict(zip(sales_summary['MATERIAL_NUMBER'], sales_summary['MATERIAL_DESCRIPTION']))
-            
+        # 3. Récupérer les descriptions et tailles (index produit)
+        index = self._product_index()
+        descriptions = index.lookup(active_products, by='number', field='MATERIAL_DESCRIPTION')
+        sizes = index.lookup(active_products, by='number', field='SIZE')
+        desc_map = {p: d for p, d in zip(active_products, descriptions) if d is not None}
+        size_map = dict(zip(active_products, sizes))
+
         rows = []
         
         north_1kg_candidates = [] # Pour gérer la cannibalisation (F11 vs F12)
@@ -522,8 +540,8 @@ class SalesEngine:
             desc = desc_map.get(product, "")
             
             # --- Logique Taille ---
-            is_500g = "500g" in desc or product in ["F04", "F05"]
-            is_1kg = "1kg" in desc or product in ["F11", "F12", "F13"]
+            is_500g = size_map.get(product) == "500g" or product in ["F04", "F05"]
+            is_1kg = size_map.get(product) == "1kg" or product in ["F11", "F12", "F13"]
             
             # --- Stratégie par Région ---
             strat_north = ""
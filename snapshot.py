@@ -0,0 +1,248 @@
+"""
+Instantané de partie partagé par tous les moteurs (« decision bundle »)
+
+Chaque moteur interroge normalement SAP de son côté : Sales, Current_Inventory,
+Market et Current_Pricing_Conditions sont alors téléchargés plusieurs fois
+pour un même step, et les recommandations peuvent reposer sur des données
+d'instants différents. GameSnapshot charge chaque vue une seule fois et la
+sert à tous les moteurs, qui l'utilisent comme client OData.
+
+Les moteurs déclarent les colonnes qu'ils lisent (DATA_NEEDS) : le
+préchargement ne demande à SAP que leur union ($select, cf. QueryPlanner).
+"""
+
+import threading
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from frame_compaction import compact_frame, expand_frame, frame_memory, memory_report
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# Taille de chargement des vues (le plus grand `top` utilisé par les moteurs)
+SNAPSHOT_TOP = 10000
+
+
+def engine_needs() -> Dict[str, Dict[str, Optional[List[str]]]]:
+    """Besoins (vue -> colonnes) des méthodes appelées par compute_all_recommendations"""
+    import product_index
+    from sales_engine import SalesEngine
+    from procurement_engine import ProcurementEngine
+    from finance_engine import FinanceEngine
+
+    needs = {'product_index': product_index.DATA_NEEDS}
+    for engine, methods in [
+        (SalesEngine, ['recommend_price_adjustments', 'recommend_marketing_strategy']),
+        (ProcurementEngine, ['check_reorder_needed', 'calculate_mrp_needs']),
+        (FinanceEngine, ['analyze_cash_position', 'get_debt_payoff_recommendation', 'calculate_stock_costs'])
+    ]:
+        for method in methods:
+            needs[method] = engine.DATA_NEEDS[method]
+    return needs
+
+
+class GameSnapshot:
+    """
+    Vues OData figées pour un step, même interface que ODataClient.fetch_view
+
+    Les requêtes simples (sans filtre ni $skip) sont servies depuis la copie
+    en mémoire ; `top` est appliqué localement. Une vue préchargée avec les
+    seules colonnes déclarées (prefetch) est servie telle quelle aux appels
+    sans `select` ; un `select` hors de ces colonnes repart vers le client. Les vues sont stockées sous
+    forme compacte (voir frame_compaction) et chaque appel reçoit sa propre
+    copie étendue, les moteurs pouvant modifier les colonnes en place. Les
+    lectures incrémentales ($skip, ex: ValuationTracker) passent au client
+    sous-jacent.
+    """
+
+    def __init__(self, client, step: Optional[Tuple[int, int]] = None, top: int = SNAPSHOT_TOP):
+        """
+        Args:
+            client: ODataClient (ou DataServiceClient) sous-jacent
+            step: Step de jeu (SIM_ROUND, SIM_STEP) de l'instantané
+            top: Nombre de lignes chargées par vue
+        """
+        self.client = client
+        self.step = step
+        self.top = top
+        self._views: Dict[str, pd.DataFrame] = {}
+        # Colonnes chargées par vue (None : toutes)
+        self._columns: Dict[str, Optional[List[str]]] = {}
+        self._raw_bytes: Dict[str, int] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'loads': 0}
+
+    def _view_lock(self, view_name: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(view_name, threading.Lock())
+
+    def _store(self, view_name: str, df: pd.DataFrame, columns: Optional[List[str]] = None):
+        self._columns[view_name] = list(columns) if columns is not None else None
+        compact = compact_frame(df)
+        report = memory_report(df, compact)
+        self._raw_bytes[view_name] = report['before_bytes']
+        self._views[view_name] = compact
+        logger.debug(f"{view_name} compacté: {report['before_bytes'] / 1e6:.1f} Mo -> "
+                     f"{report['after_bytes'] / 1e6:.1f} Mo (x{report['ratio']})")
+
+    def covers(self, view_name: str, columns: Optional[List[str]] = None) -> bool:
+        """La vue est chargée avec au moins ces colonnes (None : toutes)"""
+        if view_name not in self._views:
+            return False
+        loaded = self._columns.get(view_name)
+        return loaded is None or (columns is not None and set(columns) <= set(loaded))
+
+    def get_view(self, view_name: str) -> pd.DataFrame:
+        """Vue complète de l'instantané (chargée au premier appel), compacte et sans copie"""
+        with self._view_lock(view_name):
+            if view_name not in self._views:
+                self._store(view_name, self.client.fetch_view(view_name, top=self.top))
+                self.stats['loads'] += 1
+            return self._views[view_name]
+
+    def update(self, frames: Dict[str, pd.DataFrame], columns: Optional[Dict[str, Optional[List[str]]]] = None):
+        """
+        Remplace des vues de l'instantané (ex: relues au step suivant)
+
+        Args:
+            frames: Dict[vue] -> DataFrame
+            columns: Colonnes demandées par vue, si projetée (défaut: vue complète)
+        """
+        columns = columns or {}
+        with self._lock:
+            for view_name, df in frames.items():
+                self._store(view_name, df, columns.get(view_name))
+
+    def memory_report(self) -> Dict[str, float]:
+        """Mémoire des vues en cache : telle que reçue et une fois compactée"""
+        with self._lock:
+            after = sum(frame_memory(df) for df in self._views.values())
+            before = sum(self._raw_bytes.values())
+        return {
+            'before_bytes': before,
+            'after_bytes': after,
+            'saved_bytes': before - after,
+            'ratio': round(before / after, 2) if after else 0.0
+        }
+
+    def prefetch(self, needs: Union[List[str], Dict[str, Dict[str, Optional[List[str]]]]],
+                 max_workers: int = 4) -> 'GameSnapshot':
+        """
+        Charge en parallèle les vues pas encore présentes (cf. QueryPlanner)
+
+        Args:
+            needs: Vues à charger en entier, ou besoins par consommateur
+                   (Dict[consommateur] -> Dict[vue] -> colonnes, cf. DATA_NEEDS)
+            max_workers: Nombre de requêtes en parallèle
+        """
+        from query_planner import QueryPlanner, merge_needs
+
+        if not isinstance(needs, dict):
+            needs = {'snapshot': {view: None for view in needs}}
+
+        merged = merge_needs(*needs.values())
+        missing = {view for view, columns in merged.items() if not self.covers(view, columns)}
+        if not missing:
+            return self
+
+        planner = QueryPlanner(self.client, max_workers=max_workers)
+        for consumer, declared in needs.items():
+            planner.declare_needs(consumer, {v: c for v, c in declared.items() if v in missing}, top=self.top)
+        selects = {request.view: request.select for request in planner.plan()}
+        loaded = planner.fetch()
+
+        with self._lock:
+            for view, df in loaded.items():
+                if not self.covers(view, selects[view]):
+                    self._store(view, df, selects[view])
+                    self.stats['loads'] += 1
+        return self
+
+    def fetch_view(self, view_name: str, filters: Optional[Dict] = None,
+                   top: Optional[int] = None, skip: Optional[int] = None,
+                   select: Optional[List[str]] = None) -> pd.DataFrame:
+        if (filters or skip or (top is not None and top > self.top)
+                or (select and view_name in self._views and not self.covers(view_name, select))):
+            return self.client.fetch_view(view_name, filters=filters, top=top, skip=skip, select=select)
+
+        self.stats['requests'] += 1
+        instrumentation.record_cache('snapshot', view_name in self._views)
+        df = self.get_view(view_name)
+        if select:
+            df = df[[c for c in select if c in df.columns]]
+        return expand_frame(df.head(top) if top else df)
+
+    def iter_pages(self, view_name: str, page_size: int = 5000,
+                   filters: Optional[Dict] = None, start: int = 0) -> Iterator[pd.DataFrame]:
+        return self.client.iter_pages(view_name, page_size=page_size, filters=filters, start=start)
+
+    @property
+    def views(self) -> list:
+        """Vues chargées dans l'instantané"""
+        return list(self._views.keys())
+
+
+def get_snapshot(analyzer) -> GameSnapshot:
+    """
+    Instantané du step courant, partagé via le cache de l'analyseur
+    (vidé automatiquement au changement de step, cf. get_step_key)
+    """
+    step = analyzer.get_step_key()
+    snapshot = analyzer.cache.get('snapshot')
+    if snapshot is None:
+        snapshot = GameSnapshot(analyzer.client, step=step)
+        analyzer.cache['snapshot'] = snapshot
+    return snapshot
+
+
+def compute_all_recommendations(analyzer, snapshot: Optional[GameSnapshot] = None) -> Dict:
+    """
+    Calcule en une passe toutes les recommandations à partir d'un même instantané
+
+    Args:
+        analyzer: ERPSimAnalyzer
+        snapshot: Instantané à utiliser (défaut: celui du step courant)
+
+    Returns:
+        Dict avec 'step', 'pricing', 'marketing', 'reorder', 'mrp', 'finance'
+        et 'views' (vues chargées depuis SAP pour ce calcul)
+    """
+    from analyzer import ERPSimAnalyzer
+    from sales_engine import SalesEngine
+    from procurement_engine import ProcurementEngine
+    from finance_engine import FinanceEngine
+
+    snapshot = snapshot or get_snapshot(analyzer)
+    snapshot.prefetch(engine_needs())
+
+    # Analyseur et moteurs branchés sur l'instantané (les suivis incrémentaux
+    # de valorisation et du marché restent partagés avec l'analyseur principal)
+    bundle_analyzer = ERPSimAnalyzer(client=snapshot, valuation_tracker=analyzer.valuation_tracker,
+                                     market_intelligence=analyzer.market_intelligence,
+                                     product_index=analyzer.product_index,
+                                     anomaly_detector=analyzer.anomaly_detector,
+                                     ledger=analyzer.ledger)
+    sales = SalesEngine(bundle_analyzer, client=snapshot)
+    procurement = ProcurementEngine(bundle_analyzer, client=snapshot)
+    finance = FinanceEngine(bundle_analyzer, client=snapshot)
+
+    bundle = {
+        'step': snapshot.step,
+        'pricing': sales.recommend_price_adjustments(),
+        'marketing': sales.recommend_marketing_strategy(),
+        'reorder': procurement.check_reorder_needed(),
+        'mrp': procurement.calculate_mrp_needs(),
+        'finance': {
+            'cash_position': finance.analyze_cash_position(),
+            'debt_payoff': finance.get_debt_payoff_recommendation(),
+            'stock_costs': finance.calculate_stock_costs()
+        }
+    }
+    bundle['views'] = snapshot.views
+
+    logger.info(f"✓ Recommandations calculées sur {len(snapshot.views)} vues ({snapshot.stats['requests']} lectures)")
+    return bundle
@@ -0,0 +1,620 @@
+"""
+Générateur de partie ERPsim synthétique (déterministe, graine fixe)
+
+Produit les vues OData d'une partie de muesli qui avance step par step :
+Sales, Market, Current_Inventory, Company_Valuation, Purchase_Orders,
+Production_Orders, Current_Pricing_Conditions, Current_Game_Rules, ainsi que
+Independent_Requirements et Financial_Postings utilisés par les moteurs.
+
+La vue Market détaille, comme Zmarket, chaque organisation commerciale
+(nous et les concurrents, chacun à ses prix) et l'agrégat « Market », sans
+MATERIAL_NUMBER (jointure par description). Les concurrents font dériver
+leurs prix à chaque round, en baissent parfois un franchement, et se
+lancent de temps en temps dans une guerre des prix sur un produit.
+
+Les lignes sont générées par blocs vectorisés (numpy) et gardées en colonnes :
+une partie de plusieurs millions de lignes de ventes se construit en quelques
+secondes, ce qui permet de mesurer les performances hors ligne.
+
+Usage:
+    game = SyntheticGame(seed=42, sales_per_step=200)
+    game.advance(20)                 # un round complet
+    sales = game.view('Sales')
+
+    game = SyntheticGame.for_rows(1_000_000, seed=1)   # ~1M lignes de ventes
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from finance_engine import RATING_DISCOUNT_RATES, RATING_LABELS, rating_index
+from market_intelligence import MARKET_ORG
+
+logger = logging.getLogger(__name__)
+
+STEPS_PER_ROUND = 20
+
+# Produits finis : (MATERIAL_NUMBER, MATERIAL_DESCRIPTION, prix de base, coût unitaire)
+PRODUCTS = [
+    ('F01', '500g Nut Muesli', 4.10, 2.35),
+    ('F02', '500g Blueberry Muesli', 4.40, 2.60),
+    ('F03', '500g Strawberry Muesli', 4.30, 2.55),
+    ('F04', '500g Raisin Muesli', 3.90, 2.20),
+    ('F05', '500g Original Muesli', 3.60, 1.95),
+    ('F06', '500g Mixed Fruit Muesli', 4.50, 2.70),
+    ('F10', '1kg Premium Muesli', 8.90, 5.10),
+    ('F11', '1kg Nut Muesli', 7.40, 4.30),
+    ('F12', '1kg Blueberry Muesli', 7.90, 4.70),
+    ('F13', '1kg Strawberry Muesli', 7.80, 4.60),
+    ('F14', '1kg Raisin Muesli', 7.00, 4.00),
+    ('F15', '1kg Original Muesli', 6.50, 3.60),
+    ('F16', '1kg Mixed Fruit Muesli', 8.10, 4.90),
+]
+
+# Matières premières : (MATERIAL_NUMBER, MATERIAL_DESCRIPTION, prix d'achat)
+RAW_MATERIALS = [
+    ('R01', 'Oats (25 kg)', 18.75),
+    ('R02', 'Wheat (25 kg)', 16.50),
+    ('R03', 'Nuts (25 kg)', 112.50),
+    ('R04', 'Blueberries (25 kg)', 137.50),
+    ('R05', 'Strawberries (25 kg)', 125.00),
+    ('R06', 'Raisins (25 kg)', 75.00),
+    ('R07', 'Box 500g', 0.25),
+    ('R08', 'Box 1kg', 0.32),
+]
+
+AREAS = np.array(['North', 'South', 'West'], dtype=object)
+
+# Canaux de distribution : code, coefficient de prix, part des commandes, taille moyenne
+DISTRIBUTION_CHANNELS = np.array(['10', '12', '14'], dtype=object)
+DC_PRICE_FACTOR = np.array([0.95, 1.00, 1.15])
+DC_ORDER_SHARE = np.array([0.5, 0.3, 0.2])
+DC_ORDER_SIZE = np.array([24.0, 12.0, 6.0])
+
+VENDORS = np.array(['V100', 'V200', 'V300'], dtype=object)
+
+# Concurrents (SALES_ORGANIZATION de la vue Market) et leur comportement prix par round
+COMPETITOR_ORGS = ['A2', 'B2', 'C2', 'D2', 'E2', 'F2']
+COMPETITOR_ELASTICITY = -3.0   # Partage de la demande entre concurrents selon leur prix
+PRICE_CUT_PROB = 0.08          # Baisse franche (6-15%) d'un concurrent sur un produit
+PRICE_WAR_PROB = 0.3           # Un produit entre en guerre des prix (2 rounds de baisses)
+
+# Comptes généraux (1xxxxx-3xxxxx : bilan, voir ledger_engine)
+GL_ACCOUNTS = {
+    'BANK': ('100000', 'Bank'),
+    'RECEIVABLES': ('110000', 'Accounts Receivable'),
+    'INVENTORY': ('300000', 'Inventory'),
+    'PAYABLES': ('210000', 'Accounts Payable'),
+    'REVENUE': ('400000', 'Sales Revenue'),
+    'COGS': ('500000', 'Cost of Goods Sold'),
+}
+
+VIEWS = [
+    'Sales', 'Market', 'Current_Inventory', 'Company_Valuation', 'Purchase_Orders',
+    'Production_Orders', 'Current_Pricing_Conditions', 'Current_Game_Rules',
+    'Independent_Requirements', 'Financial_Postings'
+]
+
+# Coûts fixes par step (par ligne de vente moyenne) et taux d'intérêt du prêt par step
+FIXED_COST_PER_SALE = 15.0
+LOAN_RATE_PER_STEP = 0.0005
+INITIAL_CASH = 1_000_000.0
+PRODUCTION_LOT = 24_000
+PURCHASE_LOT = 2_000
+
+
+class SyntheticGame:
+    """
+    Partie ERPsim simulée pour une société
+
+    Les vues de flux (Sales, Market, ordres, écritures) grossissent à chaque
+    step ; les vues « Current_* » et Company_Valuation reflètent l'état courant.
+    """
+
+    def __init__(self, seed: int = 42, sales_per_step: int = 50,
+                 company_code: Optional[str] = None, steps_per_round: int = STEPS_PER_ROUND,
+                 competitors: int = 3):
+        """
+        Args:
+            seed: Graine (même graine et mêmes appels -> mêmes données)
+            sales_per_step: Nombre moyen de lignes de ventes par step
+            company_code: Société simulée (défaut: settings.COMPANY_CODE)
+            steps_per_round: Nombre de steps par round
+            competitors: Nombre d'organisations concurrentes dans la vue Market
+        """
+        self.rng = np.random.default_rng(seed)
+        self.seed = seed
+        self.sales_per_step = sales_per_step
+        self.company_code = company_code or settings.COMPANY_CODE
+        self.steps_per_round = steps_per_round
+
+        self.sim_round = 1
+        self.sim_step = 0
+        self.elapsed_steps = 0
+
+        n_products = len(PRODUCTS)
+        self.material = np.array([p[0] for p in PRODUCTS], dtype=object)
+        self.description = np.array([p[1] for p in PRODUCTS], dtype=object)
+        self.unit_cost = np.array([p[3] for p in PRODUCTS])
+        self.popularity = self.rng.dirichlet(np.full(n_products, 4.0))
+        self.market_share = self.rng.uniform(0.12, 0.35, n_products)
+        base_price = np.array([p[2] for p in PRODUCTS])
+        self.prices = np.round(base_price[:, None] * DC_PRICE_FACTOR[None, :], 2)
+
+        # Concurrents : générateur à part, les autres vues ne dépendent pas de leur nombre
+        self.market_rng = np.random.default_rng([seed, 1])
+        self.competitors = np.array([o for o in COMPETITOR_ORGS if o != self.company_code][:competitors],
+                                    dtype=object)
+        n_competitors = len(self.competitors)
+        self.competitor_weight = self.market_rng.dirichlet(np.full(n_competitors, 3.0), size=n_products).T
+        self.competitor_prices = np.round(
+            self.prices[None] * self.market_rng.uniform(0.92, 1.08, (n_competitors, n_products, 1)), 2)
+        self.price_war_rounds = np.zeros(n_products, dtype=np.int64)
+
+        self.raw_material = np.array([r[0] for r in RAW_MATERIALS], dtype=object)
+        self.raw_description = np.array([r[1] for r in RAW_MATERIALS], dtype=object)
+        self.raw_price = np.array([r[2] for r in RAW_MATERIALS])
+
+        self.finished_stock = np.full(n_products, 8_000.0)
+        self.raw_stock = np.full(len(RAW_MATERIALS), 4_000.0)
+
+        self.cash = INITIAL_CASH
+        self.loan = 0.0
+        self.profit = 0.0
+        self.fixed_cost = FIXED_COST_PER_SALE * sales_per_step
+
+        self._chunks: Dict[str, List[Dict[str, np.ndarray]]] = {v: [] for v in
+                                                                 ['Sales', 'Market', 'Company_Valuation',
+                                                                  'Purchase_Orders', 'Production_Orders']}
+        self._counters = {'Sales': 0, 'Purchase_Orders': 0, 'Production_Orders': 0}
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    @classmethod
+    def for_rows(cls, rows: int, seed: int = 42, steps: int = 3 * STEPS_PER_ROUND, **kwargs) -> 'SyntheticGame':
+        """
+        Partie avancée de `steps` steps dont la vue Sales compte environ `rows` lignes
+
+        Args:
+            rows: Nombre de lignes de ventes visé
+            seed: Graine
+            steps: Nombre de steps joués
+        """
+        game = cls(seed=seed, sales_per_step=max(1, rows // max(steps, 1)), **kwargs)
+        game.advance(steps)
+        logger.info(f"✓ Partie synthétique: {game.row_count('Sales')} ventes sur {steps} steps")
+        return game
+
+    # --- Avancement ---
+
+    def advance(self, steps: int = 1) -> 'SyntheticGame':
+        """Joue `steps` steps (passage au round suivant après steps_per_round)"""
+        for _ in range(steps):
+            self._next_step()
+        self._frames.clear()
+        return self
+
+    def _next_step(self):
+        if self.sim_step >= self.steps_per_round:
+            self.sim_round += 1
+            self.sim_step = 1
+            self._reprice()
+        else:
+            self.sim_step += 1
+        self.elapsed_steps += 1
+
+        revenue, cogs = self._sell()
+        self._produce()
+        purchases = self._purchase()
+        self._book(revenue, cogs, purchases)
+
+    def _reprice(self):
+        """Nouveau round : chaque prix bouge de -5% à +5%"""
+        drift = self.rng.uniform(-0.05, 0.05, self.prices.shape)
+        self.prices = np.round(self.prices * (1 + drift), 2)
+        self._reprice_competitors()
+
+    def _reprice_competitors(self):
+        """Dérive vers nos prix, baisses ponctuelles et guerres des prix (tous les concurrents)"""
+        rng = self.market_rng
+        n_competitors, n_products, n_dc = self.competitor_prices.shape
+        if n_competitors == 0:
+            return
+        factor = ((self.prices[None] / self.competitor_prices) ** 0.25
+                  * rng.uniform(0.98, 1.02, (n_competitors, n_products, 1)))
+
+        cut = rng.random((n_competitors, n_products)) < PRICE_CUT_PROB
+        factor *= np.where(cut, 1 - rng.uniform(0.06, 0.15, cut.shape), 1.0)[:, :, None]
+
+        if rng.random() < PRICE_WAR_PROB:
+            calm = np.flatnonzero(self.price_war_rounds == 0)
+            if calm.size:
+                self.price_war_rounds[rng.choice(calm)] = 2
+        war = self.price_war_rounds > 0
+        factor[:, war, :] = 1 - rng.uniform(0.05, 0.09, (n_competitors, int(war.sum()), 1))
+        self.price_war_rounds[war] -= 1
+
+        self.competitor_prices = np.round(self.competitor_prices * factor, 2)
+
+    def _stamp(self, n: int) -> Dict[str, np.ndarray]:
+        return {
+            'SIM_ROUND': np.full(n, self.sim_round, dtype=np.int64),
+            'SIM_STEP': np.full(n, self.sim_step, dtype=np.int64),
+        }
+
+    def _sell(self):
+        """Lignes de ventes du step et vue marché correspondante"""
+        rng = self.rng
+        n = max(1, int(rng.poisson(self.sales_per_step)))
+        product = rng.choice(len(PRODUCTS), size=n, p=self.popularity)
+        dc = rng.choice(len(DISTRIBUTION_CHANNELS), size=n, p=DC_ORDER_SHARE)
+        area = rng.integers(0, len(AREAS), size=n)
+        quantity = 1 + rng.poisson(DC_ORDER_SIZE[dc])
+
+        # Pas de vente au-delà du stock de produits finis
+        demand = np.bincount(product, weights=quantity, minlength=len(PRODUCTS))
+        fill = np.divide(self.finished_stock, demand, out=np.ones_like(demand), where=demand > 0).clip(0, 1)
+        quantity = np.floor(quantity * fill[product]).astype(np.int64)
+        self.finished_stock -= np.bincount(product, weights=quantity, minlength=len(PRODUCTS))
+
+        price = self.prices[product, dc]
+        net_value = np.round(quantity * price, 2)
+        cost = np.round(quantity * self.unit_cost[product], 2)
+
+        first = self._counters['Sales']
+        self._counters['Sales'] += n
+        chunk = {
+            'ID': np.arange(first + 1, first + n + 1, dtype=np.int64),
+            **self._stamp(n),
+            'SIM_ELAPSED_STEPS': np.full(n, self.elapsed_steps, dtype=np.int64),
+            'SALES_ORDER_NUMBER': np.arange(first + 10_000_001, first + n + 10_000_001, dtype=np.int64),
+            'product': product, 'dc': dc, 'area': area,
+            'QUANTITY': quantity,
+            'NET_PRICE': price,
+            'NET_VALUE': net_value,
+            'COST': cost,
+        }
+        self._chunks['Sales'].append(chunk)
+
+        self._market(product, dc, area, quantity, net_value)
+        return float(net_value.sum()), float(cost.sum())
+
+    def _market(self, product, dc, area, quantity, net_value):
+        """
+        Marché du step par produit, canal et zone : une ligne par organisation
+        (agrégat « Market », nous, concurrents)
+        """
+        shape = (len(PRODUCTS), len(DISTRIBUTION_CHANNELS), len(AREAS))
+        ours = np.zeros(shape)
+        our_value = np.zeros(shape)
+        np.add.at(ours, (product, dc, area), quantity)
+        np.add.at(our_value, (product, dc, area), net_value)
+
+        baseline = self.sales_per_step * DC_ORDER_SIZE.mean() / ours.size
+        market_qty = np.round(ours / self.market_share[:, None, None]
+                              + self.rng.poisson(baseline, shape)).astype(np.int64)
+        list_price = self.prices[:, :, None] * self.rng.normal(1.0, 0.04, shape)
+        our_price = np.divide(our_value, ours, out=list_price.copy(), where=ours > 0)
+
+        # Demande hors nous répartie entre concurrents : poids propre x attractivité prix
+        others = np.maximum(market_qty - ours, 0)
+        competitor_price = (self.competitor_prices[:, :, :, None]
+                            * self.market_rng.normal(1.0, 0.01, (len(self.competitors),) + shape))
+        attraction = (self.competitor_weight[:, :, None, None]
+                      * (competitor_price / self.prices[None, :, :, None]) ** COMPETITOR_ELASTICITY)
+        split = attraction / np.maximum(attraction.sum(axis=0), 1e-12)
+        competitor_qty = np.round(others[None] * split)
+        competitor_value = competitor_qty * competitor_price
+
+        total_qty = ours + competitor_qty.sum(axis=0)
+        total_value = our_value + competitor_value.sum(axis=0)
+        total_price = np.divide(total_value, total_qty, out=list_price.copy(), where=total_qty > 0)
+
+        # Axe 0 : organisation (0 = agrégat, 1 = nous, 2.. = concurrents)
+        qty = np.concatenate([total_qty[None], ours[None], competitor_qty]).astype(np.int64)
+        price = np.round(np.concatenate([total_price[None], our_price[None], competitor_price]), 2)
+        org_idx, p_idx, dc_idx, area_idx = (a.ravel() for a in np.indices(qty.shape))
+        n = org_idx.size
+        self._chunks['Market'].append({
+            **self._stamp(n),
+            'SIMULATION_PERIOD': np.full(n, self.sim_round, dtype=np.int64),
+            'org': org_idx, 'product': p_idx, 'dc': dc_idx, 'area': area_idx,
+            'QUANTITY': qty.ravel(),
+            'AVERAGE_PRICE': price.ravel(),
+            'NET_VALUE': np.round(qty.ravel() * price.ravel(), 2),
+        })
+
+    def _produce(self):
+        """Lance un ordre de fabrication pour les produits sous un step de stock moyen"""
+        low = np.flatnonzero(self.finished_stock < PRODUCTION_LOT / 4)
+        if low.size == 0:
+            return
+        boxes = np.where(np.char.startswith(self.description[low].astype(str), '500g'), 6, 7)
+        np.subtract.at(self.raw_stock, boxes, PRODUCTION_LOT)
+        self.raw_stock[:6] -= PRODUCTION_LOT * low.size / 500
+        self.raw_stock = self.raw_stock.clip(0)
+        self.finished_stock[low] += PRODUCTION_LOT
+
+        first = self._counters['Production_Orders']
+        self._counters['Production_Orders'] += low.size
+        self._chunks['Production_Orders'].append({
+            'PRODUCTION_ORDER': np.arange(first + 1_000_001, first + low.size + 1_000_001, dtype=np.int64),
+            'product': low,
+            'TARGET_QUANTITY': np.full(low.size, PRODUCTION_LOT, dtype=np.int64),
+            'BEGIN_ROUND': np.full(low.size, self.sim_round, dtype=np.int64),
+            'BEGIN_STEP': np.full(low.size, self.sim_step, dtype=np.int64),
+            'BEGIN_ELAPSED': np.full(low.size, self.elapsed_steps, dtype=np.int64),
+        })
+
+    def _purchase(self) -> float:
+        """Commande les matières premières sous le point de commande"""
+        low = np.flatnonzero(self.raw_stock < PURCHASE_LOT)
+        if low.size == 0:
+            return 0.0
+        quantity = np.full(low.size, PURCHASE_LOT * 5, dtype=np.int64)
+        quantity[low >= 6] *= 20  # Emballages
+        self.raw_stock[low] += quantity
+
+        price = self.raw_price[low]
+        first = self._counters['Purchase_Orders']
+        self._counters['Purchase_Orders'] += low.size
+        self._chunks['Purchase_Orders'].append({
+            'PURCHASING_ORDER': np.arange(first + 4_500_000_001, first + low.size + 4_500_000_001, dtype=np.int64),
+            'raw': low,
+            'vendor': self.rng.integers(0, len(VENDORS), size=low.size),
+            'QUANTITY': quantity,
+            'NET_PRICE': price,
+            'NET_VALUE': np.round(quantity * price, 2),
+            **self._stamp(low.size),
+            'ORDER_ELAPSED': np.full(low.size, self.elapsed_steps, dtype=np.int64),
+        })
+        return float((quantity * price).sum())
+
+    def _book(self, revenue: float, cogs: float, purchases: float):
+        """Trésorerie, dette et valorisation en fin de step"""
+        interest = self.loan * LOAN_RATE_PER_STEP
+        self.profit += revenue - cogs - self.fixed_cost - interest
+        self.cash += revenue - purchases - self.fixed_cost - interest
+
+        if self.cash < 0:  # Tirage sur la ligne de crédit
+            draw = -self.cash + 100_000
+            self.loan += draw
+            self.cash += draw
+        elif self.loan > 0 and self.cash > 2 * INITIAL_CASH:
+            repay = min(self.loan, self.cash - INITIAL_CASH)
+            self.loan -= repay
+            self.cash -= repay
+
+        receivables = 2 * revenue
+        payables = 1.5 * purchases
+        net_debt = self.loan - self.cash
+        idx = int(rating_index(self.loan))
+        valuation = max(0.0, max(self.profit, 0.0) / RATING_DISCOUNT_RATES[idx] - max(net_debt, 0.0))
+
+        self._chunks['Company_Valuation'].append({
+            **self._stamp(1),
+            'SIM_ELAPSED_STEPS': np.array([self.elapsed_steps], dtype=np.int64),
+            'COMPANY_VALUATION': np.array([round(valuation, 2)]),
+            'BANK_CASH_ACCOUNT': np.array([round(self.cash, 2)]),
+            'ACCOUNTS_RECEIVABLE': np.array([round(receivables, 2)]),
+            'BANK_LOAN': np.array([round(self.loan, 2)]),
+            'ACCOUNTS_PAYABLE': np.array([round(payables, 2)]),
+            'PROFIT': np.array([round(self.profit, 2)]),
+            'CREDIT_RATING': np.array([RATING_LABELS[idx]], dtype=object),
+        })
+
+    # --- Vues ---
+
+    def row_count(self, view_name: str) -> int:
+        """Nombre de lignes d'une vue (sans la construire pour les vues de flux)"""
+        if view_name in self._chunks:
+            return sum(len(next(iter(c.values()))) for c in self._chunks[view_name])
+        return len(self.view(view_name))
+
+    def view(self, view_name: str) -> pd.DataFrame:
+        """
+        Vue au step courant (colonnes OData, types pandas)
+
+        Le DataFrame est partagé jusqu'au prochain `advance` : ne pas le modifier.
+        """
+        if view_name not in self._frames:
+            builder = getattr(self, f"_view_{view_name.lower()}", None)
+            if builder is None:
+                raise KeyError(f"Vue inconnue: {view_name}")
+            self._frames[view_name] = builder()
+        return self._frames[view_name]
+
+    def _columns(self, view_name: str) -> Dict[str, np.ndarray]:
+        chunks = self._chunks[view_name]
+        if not chunks:
+            return {}
+        return {col: np.concatenate([c[col] for c in chunks]) for col in chunks[0]}
+
+    def _view_sales(self) -> pd.DataFrame:
+        cols = self._columns('Sales')
+        if not cols:
+            return pd.DataFrame()
+        n = len(cols['ID'])
+        product, dc, area = cols.pop('product'), cols.pop('dc'), cols.pop('area')
+        return pd.DataFrame({
+            'ID': cols['ID'],
+            'SIM_ROUND': cols['SIM_ROUND'],
+            'SIM_STEP': cols['SIM_STEP'],
+            'SIM_ELAPSED_STEPS': cols['SIM_ELAPSED_STEPS'],
+            'SALES_ORGANIZATION': np.full(n, self.company_code, dtype=object),
+            'SALES_ORDER_NUMBER': cols['SALES_ORDER_NUMBER'],
+            'AREA': AREAS[area],
+            'DISTRIBUTION_CHANNEL': DISTRIBUTION_CHANNELS[dc],
+            'MATERIAL_NUMBER': self.material[product],
+            'MATERIAL_DESCRIPTION': self.description[product],
+            'QUANTITY': cols['QUANTITY'],
+            'UNIT': np.full(n, 'PC', dtype=object),
+            'NET_PRICE': cols['NET_PRICE'],
+            'NET_VALUE': cols['NET_VALUE'],
+            'COST': cols['COST'],
+            'CONTRIBUTION_MARGIN': np.round(cols['NET_VALUE'] - cols['COST'], 2),
+            'CURRENCY': np.full(n, 'EUR', dtype=object),
+        })
+
+    def _view_market(self) -> pd.DataFrame:
+        cols = self._columns('Market')
+        if not cols:
+            return pd.DataFrame()
+        n = len(cols['QUANTITY'])
+        product, dc, area = cols.pop('product'), cols.pop('dc'), cols.pop('area')
+        organizations = np.array([MARKET_ORG, self.company_code, *self.competitors], dtype=object)
+        return pd.DataFrame({
+            'SIM_ROUND': cols['SIM_ROUND'],
+            'SIM_STEP': cols['SIM_STEP'],
+            'SIMULATION_PERIOD': cols['SIMULATION_PERIOD'],
+            'SALES_ORGANIZATION': organizations[cols['org']],
+            'MATERIAL_DESCRIPTION': self.description[product],
+            'DISTRIBUTION_CHANNEL': DISTRIBUTION_CHANNELS[dc],
+            'AREA': AREAS[area],
+            'QUANTITY': cols['QUANTITY'],
+            'AVERAGE_PRICE': cols['AVERAGE_PRICE'],
+            'NET_VALUE': cols['NET_VALUE'],
+            'CURRENCY': np.full(n, 'EUR', dtype=object),
+        })
+
+    def _view_company_valuation(self) -> pd.DataFrame:
+        cols = self._columns('Company_Valuation')
+        return pd.DataFrame(cols)
+
+    def _view_purchase_orders(self) -> pd.DataFrame:
+        cols = self._columns('Purchase_Orders')
+        if not cols:
+            return pd.DataFrame(columns=['PURCHASING_ORDER', 'VENDOR', 'MATERIAL_NUMBER', 'MATERIAL_DESCRIPTION',
+                                         'QUANTITY', 'NET_PRICE', 'NET_VALUE', 'STATUS', 'SIM_ROUND', 'SIM_STEP'])
+        raw = cols['raw']
+        # Livraison au step suivant la commande
+        delivered = cols['ORDER_ELAPSED'] < self.elapsed_steps
+        return pd.DataFrame({
+            'PURCHASING_ORDER': cols['PURCHASING_ORDER'].astype(str),
+            'VENDOR': VENDORS[cols['vendor']],
+            'MATERIAL_NUMBER': self.raw_material[raw],
+            'MATERIAL_DESCRIPTION': self.raw_description[raw],
+            'QUANTITY': cols['QUANTITY'],
+            'NET_PRICE': cols['NET_PRICE'],
+            'NET_VALUE': cols['NET_VALUE'],
+            'STATUS': np.where(delivered, 'Delivered', 'Open').astype(object),
+            'SIM_ROUND': cols['SIM_ROUND'],
+            'SIM_STEP': cols['SIM_STEP'],
+        })
+
+    def _view_production_orders(self) -> pd.DataFrame:
+        cols = self._columns('Production_Orders')
+        if not cols:
+            return pd.DataFrame(columns=['PRODUCTION_ORDER', 'MATERIAL_NUMBER', 'MATERIAL_DESCRIPTION',
+                                         'TARGET_QUANTITY', 'CONFIRMED_QUANTITY', 'STATUS',
+                                         'BEGIN_ROUND', 'BEGIN_STEP'])
+        product = cols['product']
+        # Fabrication sur deux steps : confirmée à moitié puis terminée
+        age = self.elapsed_steps - cols['BEGIN_ELAPSED']
+        confirmed = np.minimum(cols['TARGET_QUANTITY'], cols['TARGET_QUANTITY'] * age // 2)
+        return pd.DataFrame({
+            'PRODUCTION_ORDER': cols['PRODUCTION_ORDER'].astype(str),
+            'MATERIAL_NUMBER': self.material[product],
+            'MATERIAL_DESCRIPTION': self.description[product],
+            'TARGET_QUANTITY': cols['TARGET_QUANTITY'],
+            'CONFIRMED_QUANTITY': confirmed,
+            'STATUS': np.where(confirmed >= cols['TARGET_QUANTITY'], 'Completed', 'In Process').astype(object),
+            'BEGIN_ROUND': cols['BEGIN_ROUND'],
+            'BEGIN_STEP': cols['BEGIN_STEP'],
+        })
+
+    def _view_current_inventory(self) -> pd.DataFrame:
+        n_finished, n_raw = len(self.material), len(self.raw_material)
+        return pd.DataFrame({
+            'PLANT': np.full(n_finished + n_raw, settings.PLANT, dtype=object),
+            'STORAGE_LOCATION': np.array(['02'] * n_finished + ['01'] * n_raw, dtype=object),
+            'MATERIAL_NUMBER': np.concatenate([self.material, self.raw_material]),
+            'MATERIAL_DESCRIPTION': np.concatenate([self.description, self.raw_description]),
+            'STOCK': np.concatenate([self.finished_stock, self.raw_stock]).round().astype(np.int64),
+            'RESTRICTED': np.zeros(n_finished + n_raw, dtype=np.int64),
+            'UNIT': np.array(['PC'] * n_finished + ['KG'] * n_raw, dtype=object),
+        })
+
+    def _view_current_pricing_conditions(self) -> pd.DataFrame:
+        n_products, n_dc = self.prices.shape
+        product = np.repeat(np.arange(n_products), n_dc)
+        dc = np.tile(np.arange(n_dc), n_products)
+        return pd.DataFrame({
+            'SALES_ORGANIZATION': np.full(product.size, self.company_code, dtype=object),
+            'DISTRIBUTION_CHANNEL': DISTRIBUTION_CHANNELS[dc],
+            'MATERIAL_NUMBER': self.material[product],
+            'MATERIAL_DESCRIPTION': self.description[product],
+            'PRICE': self.prices.ravel(),
+            'CURRENCY': np.full(product.size, 'EUR', dtype=object),
+        })
+
+    def _view_current_game_rules(self) -> pd.DataFrame:
+        return pd.DataFrame([{
+            'ROW_ID': 1,
+            'GAME': f"SYNTH-{self.seed}",
+            'SCENARIO': 'Manufacturing',
+            'ROUND': self.sim_round,
+            'STEP': self.sim_step,
+            'STEPS_PER_ROUND': self.steps_per_round,
+            'ELAPSED_TIME': self.elapsed_steps,
+            'SIMULATION_PERIOD': self.sim_round,
+        }])
+
+    def _view_independent_requirements(self) -> pd.DataFrame:
+        expected = self.sales_per_step * self.steps_per_round * self.popularity * DC_ORDER_SIZE.mean()
+        return pd.DataFrame({
+            'MATERIAL_NUMBER': self.material,
+            'MATERIAL_DESCRIPTION': self.description,
+            'QUANTITY': expected.round().astype(np.int64),
+            'SIM_ROUND': np.full(len(self.material), self.sim_round + 1, dtype=np.int64),
+        })
+
+    def _view_financial_postings(self) -> pd.DataFrame:
+        """Écritures dérivées des ventes (facture + sortie de stock) et des achats"""
+        sales = self._columns('Sales')
+        purchases = self._columns('Purchase_Orders')
+        parts = []
+
+        def postings(account_key, side, amount, sim_round, sim_step):
+            number, name = GL_ACCOUNTS[account_key]
+            n = len(amount)
+            return pd.DataFrame({
+                'GL_ACCOUNT_NUMBER': np.full(n, number, dtype=object),
+                'GL_ACCOUNT_NAME': np.full(n, name, dtype=object),
+                'DEBIT_CREDIT': np.full(n, side, dtype=object),
+                'AMOUNT': amount,
+                'SIM_ROUND': sim_round,
+                'SIM_STEP': sim_step,
+            })
+
+        if sales:
+            r, s = sales['SIM_ROUND'], sales['SIM_STEP']
+            parts += [
+                postings('RECEIVABLES', 'S', sales['NET_VALUE'], r, s),
+                postings('REVENUE', 'H', sales['NET_VALUE'], r, s),
+                postings('COGS', 'S', sales['COST'], r, s),
+                postings('INVENTORY', 'H', sales['COST'], r, s),
+            ]
+        if purchases:
+            r, s = purchases['SIM_ROUND'], purchases['SIM_STEP']
+            parts += [
+                postings('INVENTORY', 'S', purchases['NET_VALUE'], r, s),
+                postings('PAYABLES', 'H', purchases['NET_VALUE'], r, s),
+            ]
+
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, ignore_index=True).sort_values(['SIM_ROUND', 'SIM_STEP'], kind='stable',
+                                                               ignore_index=True)
+
+    def state(self) -> Dict:
+        """Step courant et taille des vues de flux"""
+        return {
+            'sim_round': self.sim_round,
+            'sim_step': self.sim_step,
+            'elapsed_steps': self.elapsed_steps,
+            'rows': {v: self.row_count(v) for v in self._chunks}
+        }
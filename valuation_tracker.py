@@ -0,0 +1,169 @@
+"""
+Suivi incrémental de la valorisation (Company_Valuation)
+"""
+
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ValuationTracker:
+    """
+    Série compacte (une ligne par round/step) de la valorisation de l'entreprise.
+
+    Seules les nouvelles lignes de Company_Valuation sont téléchargées
+    ($skip sur le nombre de lignes déjà lues) ; la dernière valeur est gardée
+    en mémoire pour être servie sans recalcul.
+
+    Chaque lecture relit la dernière ligne déjà vue : si elle a disparu ou
+    changé, la vue a été remise à zéro (nouvelle partie) et `restarted`
+    passe à True jusqu'au prochain reset().
+    """
+
+    METRICS = [
+        'COMPANY_VALUATION', 'BANK_CASH_ACCOUNT', 'BANK_LOAN',
+        'ACCOUNTS_RECEIVABLE', 'ACCOUNTS_PAYABLE', 'PROFIT'
+    ]
+    STEP_COLS = ['SIM_ROUND', 'SIM_STEP']
+
+    def __init__(self, client, page_size: int = 1000):
+        self.client = client
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Oublie la série (nouvelle partie)"""
+        with self._lock:
+            self.series = pd.DataFrame(columns=self.STEP_COLS + self.METRICS + ['CREDIT_RATING'])
+            self._rows_seen = 0
+            self._latest = {}
+            self._last_row = None
+            self.restarted = False
+
+    def refresh(self) -> int:
+        """
+        Télécharge les lignes ajoutées depuis le dernier appel
+
+        Returns:
+            Nombre de nouvelles lignes lues
+        """
+        with self._lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> int:
+        if self.restarted:
+            return 0
+
+        # Relecture de la dernière ligne vue pour détecter une nouvelle partie
+        overlap = 1 if self._rows_seen else 0
+        pages = list(self.client.iter_pages("Company_Valuation", page_size=self.page_size,
+                                            start=self._rows_seen - overlap))
+
+        if not pages:
+            # Vue plus courte que ce qui a été lu (et non simplement injoignable) : nouvelle partie
+            if overlap and not self.client.fetch_view("Company_Valuation", top=1).empty:
+                self._flag_restart()
+            return 0
+
+        new_rows = self._compact(pd.concat(pages, ignore_index=True))
+        if overlap:
+            if self._signature(new_rows.iloc[0]) != self._last_row:
+                self._flag_restart()
+                return 0
+            new_rows = new_rows.iloc[1:]
+
+        if new_rows.empty:
+            return 0
+
+        self._rows_seen += len(new_rows)
+        self._last_row = self._signature(new_rows.iloc[-1])
+        self._append(new_rows)
+
+        return len(new_rows)
+
+    def _signature(self, row: pd.Series) -> Tuple:
+        return tuple(row[self.STEP_COLS + self.METRICS].tolist())
+
+    def _flag_restart(self):
+        logger.info(f"✓ Company_Valuation remise à zéro (step {self.current_step()}) : nouvelle partie")
+        self.restarted = True
+
+    def _compact(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Ne garde que les colonnes suivies, converties en numérique"""
+        compact = pd.DataFrame(index=df.index)
+
+        for col in self.STEP_COLS:
+            compact[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int) if col in df.columns else 0
+        for col in self.METRICS:
+            compact[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0) if col in df.columns else 0.0
+        # Rating absent -> None : chaque consommateur garde son propre libellé par défaut
+        if 'CREDIT_RATING' in df.columns:
+            ratings = df['CREDIT_RATING']
+            compact['CREDIT_RATING'] = ratings.astype(str).where(ratings.notna(), None)
+        else:
+            compact['CREDIT_RATING'] = None
+
+        return compact
+
+    def _append(self, new_rows: pd.DataFrame):
+        """Ajoute les nouvelles lignes (la dernière ligne d'un step l'emporte)"""
+        if self.series.empty:
+            series = new_rows
+        else:
+            series = pd.concat([self.series, new_rows], ignore_index=True)
+
+        self.series = (series
+                       .drop_duplicates(subset=self.STEP_COLS, keep='last')
+                       .sort_values(self.STEP_COLS)
+                       .reset_index(drop=True))
+
+        last = self.series.iloc[-1].to_dict() if not self.series.empty else {}
+        self._latest = {k: v for k, v in last.items() if v is not None and not pd.isna(v)}
+
+    def latest(self) -> Dict:
+        """Dernières valeurs connues (COMPANY_VALUATION, BANK_CASH_ACCOUNT, ... ; CREDIT_RATING si publié)"""
+        return self._latest
+
+    def current_step(self) -> Optional[Tuple[int, int]]:
+        """(SIM_ROUND, SIM_STEP) de la dernière ligne, None si aucune donnée"""
+        if not self._latest:
+            return None
+        return int(self._latest['SIM_ROUND']), int(self._latest['SIM_STEP'])
+
+    def deltas(self) -> Dict[str, float]:
+        """Variation de chaque métrique par rapport au step précédent"""
+        if len(self.series) < 2:
+            return {m: 0.0 for m in self.METRICS}
+
+        last, previous = self.series.iloc[-1], self.series.iloc[-2]
+        return {m: float(last[m] - previous[m]) for m in self.METRICS}
+
+    def growth_rates(self) -> Dict[str, float]:
+        """Croissance (%) de chaque métrique par rapport au step précédent"""
+        if len(self.series) < 2:
+            return {m: 0.0 for m in self.METRICS}
+
+        last, previous = self.series.iloc[-1], self.series.iloc[-2]
+        rates = {}
+        for m in self.METRICS:
+            base = previous[m]
+            rates[m] = float((last[m] - base) / abs(base) * 100) if base else 0.0
+        return rates
+
+    def rolling(self, window: int = 5) -> pd.DataFrame:
+        """Moyenne glissante de chaque métrique sur les derniers steps"""
+        if self.series.empty:
+            return self.series
+
+        trend = self.series[self.METRICS].rolling(window, min_periods=1).mean()
+        return pd.concat([self.series[self.STEP_COLS], trend], axis=1)
+
+    def sparkline(self, metric: str, points: int = 30) -> List[float]:
+        """Derniers points d'une métrique (pour mini-graphiques)"""
+        if self.series.empty or metric not in self.series.columns:
+            return []
+        return self.series[metric].tail(points).tolist()
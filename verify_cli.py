@@ -0,0 +1,100 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+import cli
+from frame_client import FrameClient
+from synthetic_game import SyntheticGame
+
+
+class TestCli(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.game = SyntheticGame(seed=5, sales_per_step=40).advance(4)
+
+    def setUp(self):
+        from analyzer import ERPSimAnalyzer
+
+        client = FrameClient(self.game)
+        patcher = patch.object(cli, '_analyzer', side_effect=lambda: ERPSimAnalyzer(client=client))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_cli(self, *argv):
+        """(code de sortie, stdout)"""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = cli.main(list(argv))
+        return code, out.getvalue()
+
+    def test_formats(self):
+        sales = self.game.view('Sales')
+        products = sales['MATERIAL_NUMBER'].nunique()
+
+        code, table = self.run_cli('sales')
+        self.assertEqual(code, 0)
+        self.assertIn('MATERIAL_NUMBER', table.splitlines()[0])
+        self.assertEqual(len(table.splitlines()), products + 1)
+
+        code, text = self.run_cli('sales', '--format', 'json')
+        records = json.loads(text)
+        self.assertEqual(len(records), products)
+        self.assertAlmostEqual(sum(r['NET_VALUE'] for r in records), sales['NET_VALUE'].sum(), places=2)
+
+        code, text = self.run_cli('sales', '-f', 'csv')
+        self.assertEqual(len(pd.read_csv(io.StringIO(text))), products)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ventes.parquet')
+            code, text = self.run_cli('sales', '-f', 'parquet', '-o', path)
+            self.assertEqual((code, text), (0, ''))
+            self.assertEqual(len(pd.read_parquet(path)), products)
+
+    def test_parquet_needs_output(self):
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err), self.assertRaises(SystemExit) as exit_:
+            cli.main(['sales', '--format', 'parquet'])
+        self.assertEqual(exit_.exception.code, 2)
+        self.assertIn('--format parquet nécessite --output', err.getvalue())
+
+    def test_sales_by(self):
+        _, text = self.run_cli('sales', '--by', 'area', '-f', 'json')
+        by_area = pd.DataFrame(json.loads(text))
+        self.assertEqual(sorted(by_area['AREA']), sorted(self.game.view('Sales')['AREA'].unique()))
+
+        _, text = self.run_cli('sales', '--by', 'dc', '-f', 'csv')
+        self.assertIn('DISTRIBUTION_CHANNEL', text.splitlines()[0])
+
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            cli.main(['sales', '--by', 'color'])
+
+    def test_summary_dict_as_json(self):
+        _, text = self.run_cli('summary')
+        summary = json.loads(text)
+        last = self.game.view('Company_Valuation').iloc[-1]
+        self.assertEqual((summary['sim_round'], summary['sim_step']), (last['SIM_ROUND'], last['SIM_STEP']))
+        self.assertAlmostEqual(summary['revenue'], self.game.view('Sales')['NET_VALUE'].sum(), places=2)
+
+    def test_export_exit_codes(self):
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stderr(io.StringIO()):
+            code, text = self.run_cli('export', tmp, '--format', 'csv')
+            self.assertEqual(code, 0)
+            result = json.loads(text)
+            self.assertEqual(result['status'], 'done')
+            self.assertGreater(sum(result['rows'].values()), 0)
+            self.assertTrue(os.listdir(tmp))
+
+            # Dossier parent absent : l'export échoue, code de sortie 1
+            code, text = self.run_cli('export', os.path.join(tmp, 'absent', 'rapport.xlsx'))
+            self.assertEqual(code, 1)
+            self.assertEqual(json.loads(text)['status'], 'error')
+
+
+if __name__ == '__main__':
+    unittest.main()
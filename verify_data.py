@@ -0,0 +1,301 @@
+import gc
+import os
+import tempfile
+import unittest
+import weakref
+from unittest.mock import patch
+
+import pandas as pd
+
+from frame_client import FrameClient
+
+
+class TestDataService(unittest.TestCase):
+    def service(self, frame, **kwargs):
+        from data_service import DataService
+
+        service = DataService(ttl=60, sync_interval=60, **kwargs)
+        service.client = FrameClient.from_frames({'Sales': frame}, record=True)
+        return service
+
+    def sap_down(self, service, down=True):
+        service.client.error = '503 Service Unavailable' if down else None
+
+    def test_empty_pages_cached_errors_not(self):
+        from odata_client import is_upstream_error
+
+        # Lecture $skip au-delà de la fin : page vide gardée jusqu'au TTL
+        service = self.service(pd.DataFrame({'ID': [1, 2]}))
+        self.assertTrue(service.get_view('Sales', top=5, skip=2).empty)
+        self.assertTrue(service.get_view('Sales', top=5, skip=2).empty)
+        self.assertEqual(len(service.client.requests), 1)
+        self.assertEqual(service.evict(), 1)
+
+        # Erreur SAP : signalée, jamais gardée
+        service = self.service(pd.DataFrame({'ID': [1, 2]}))
+        self.sap_down(service)
+        self.assertTrue(is_upstream_error(service.get_view('Sales')))
+        service.get_view('Sales')
+        self.assertEqual(len(service.client.requests), 2)
+        self.assertEqual(service.evict(), 0)
+
+        self.sap_down(service, False)
+        service.get_view('Sales')
+        self.sap_down(service)
+        # Une erreur SAP pendant la synchro n'écrase pas la copie valide
+        service._fetch_upstream(service.make_key('Sales', None, None, None))
+        self.assertEqual(service.get_view('Sales')['ID'].tolist(), [1, 2])
+
+    def test_incremental_keys_are_bounded(self):
+        service = self.service(pd.DataFrame({'ID': range(100)}), max_entries=5)
+        for skip in range(0, 50, 5):
+            service.get_view('Sales', top=5, skip=skip)
+        self.assertEqual(service.evict(), 5)
+        self.assertEqual(len(service._key_locks), 5)
+        self.assertEqual(service.stats['evictions'], 5)
+
+        # Au-delà de la fenêtre chaude, tout est oublié
+        last = max(service._last_requested.values())
+        with patch('data_service.time.monotonic', return_value=last + 10 * 60 + 1):
+            self.assertEqual(service.evict(), 0)
+        self.assertFalse(service._last_requested)
+
+
+class ReportAnalyzer:
+    """Analyseur factice : une vue par section, dont on suit la libération"""
+
+    def __init__(self, rows=3):
+        self.rows, self.refs = rows, {}
+
+    def section(self, name):
+        def fetch():
+            df = pd.DataFrame({'NAME': [name] * self.rows, 'VALUE': range(self.rows), '__metadata': None})
+            self.refs[name] = weakref.ref(df)
+            return df
+        return fetch
+
+    def __getattr__(self, method):
+        if method.startswith('get_'):
+            return self.section(method[4:])
+        raise AttributeError(method)
+
+
+class TestExportPipeline(unittest.TestCase):
+    SECTIONS = {'a': 'get_a', 'b': 'get_b', 'c': 'get_c'}
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def job(self, name, **kwargs):
+        from export_pipeline import ExportJob
+
+        return ExportJob(ReportAnalyzer(), os.path.join(self.tmp.name, name), sections=self.SECTIONS, **kwargs)
+
+    def test_format_from_extension(self):
+        from export_pipeline import ExportJob
+
+        self.assertEqual(ExportJob.infer_format('rapport.xlsx'), 'xlsx')
+        self.assertEqual(ExportJob.infer_format('rapport.parquet'), 'parquet')
+        self.assertEqual(ExportJob.infer_format('out/rapport.CSV/'), 'csv')
+        self.assertEqual(ExportJob.infer_format('rapport'), 'csv')
+        with self.assertRaises(ValueError):
+            ExportJob.infer_format('rapport.json')
+
+    def test_parquet_export(self):
+        job = self.job('rapport.parquet').run()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.fmt, 'parquet')
+        self.assertEqual(sorted(os.listdir(job.path)), ['a.parquet', 'b.parquet', 'c.parquet'])
+        written = pd.read_parquet(os.path.join(job.path, 'b.parquet'))
+        self.assertEqual(written.columns.tolist(), ['NAME', 'VALUE'])
+        self.assertEqual(job.rows_written, {'a': 3, 'b': 3, 'c': 3})
+
+    def test_xlsx_summary_sheet_first(self):
+        job = self.job('rapport.xlsx', summary=True).run()
+        self.assertEqual(job.status, 'done')
+        sheets = pd.read_excel(job.path, sheet_name=None)
+        self.assertEqual(list(sheets)[0], 'RESUME')
+        self.assertEqual(sorted(sheets), ['RESUME', 'a', 'b', 'c'])
+        self.assertEqual(sheets['c']['VALUE'].tolist(), [0, 1, 2])
+
+    def test_sections_freed_once_written(self):
+        job = self.job('rapport', max_workers=1)
+        write_csv, written, alive = job._write_csv, [], []
+
+        def checked_write(name, df):
+            gc.collect()
+            alive.append(sorted(n for n, ref in job.analyzer.refs.items() if n != name and ref() is not None))
+            write_csv(name, df)
+            written.append(name)
+
+        job._write_csv = checked_write
+        self.assertEqual(job.run().status, 'done')
+        self.assertEqual(written, ['a', 'b', 'c'])
+        # Les feuilles déjà écrites sont libérées ; seule la suivante est en cours de récupération
+        for i, still_alive in enumerate(alive):
+            self.assertFalse(set(written[:i]) & set(still_alive))
+            self.assertLessEqual(len(still_alive), 1)
+
+
+class TestFrameCompaction(unittest.TestCase):
+    def odata_sales(self, n=2000):
+        """Réponse OData brute : tout en texte, `__metadata` sur chaque ligne"""
+        import numpy as np
+
+        rng = np.random.default_rng(3)
+        net_value = np.round(rng.uniform(1, 5000, n), 2)
+        return pd.DataFrame({
+            '__metadata': [{'uri': f"Sales('{i}')", 'type': 'Sales'} for i in range(n)],
+            'MATERIAL_DESCRIPTION': rng.choice(['500g Raisin Muesli', '1kg Nut Muesli', 'Granola'], n),
+            'AREA': rng.choice(['North', 'South', 'West'], n),
+            'SALES_ORDER_NUMBER': [f'SO{i:08d}' for i in range(n)],
+            'QUANTITY': rng.integers(1, 500, n).astype(str),
+            'NET_VALUE': net_value.astype(str),
+            'COST': np.round(net_value * np.pi, 7).astype(str),
+            'BIG_COUNTER': (np.arange(n) + 3_000_000_000).astype(float),
+        })
+
+    def test_round_trip_restores_values_and_types(self):
+        from frame_compaction import compact_frame, expand_frame
+
+        raw = self.odata_sales()
+        compact = compact_frame(raw)
+        self.assertNotIn('__metadata', compact.columns)
+        self.assertEqual(str(compact['QUANTITY'].dtype), 'int32')
+        self.assertEqual(str(compact['NET_VALUE'].dtype), 'float32')
+        # Trop de décimales pour float32, trop grand pour int32 : gardés en float64
+        self.assertEqual(str(compact['COST'].dtype), 'float64')
+        self.assertEqual(str(compact['BIG_COUNTER'].dtype), 'float64')
+        self.assertEqual(str(compact['AREA'].dtype), 'category')
+        # Identifiant quasi unique : laissé en texte
+        self.assertEqual(compact['SALES_ORDER_NUMBER'].dtype, raw['SALES_ORDER_NUMBER'].dtype)
+
+        expanded = expand_frame(compact)
+        self.assertEqual(list(expanded.columns), [c for c in raw.columns if c != '__metadata'])
+        self.assertEqual(expanded['QUANTITY'].dtype, 'int64')
+        self.assertTrue((expanded['QUANTITY'] == pd.to_numeric(raw['QUANTITY'])).all())
+        for col in ['NET_VALUE', 'COST', 'BIG_COUNTER']:
+            self.assertEqual(expanded[col].dtype, 'float64', msg=col)
+            self.assertTrue((expanded[col] == pd.to_numeric(raw[col])).all(), msg=col)
+        for col in ['MATERIAL_DESCRIPTION', 'AREA', 'SALES_ORDER_NUMBER']:
+            self.assertEqual(expanded[col].dtype, raw[col].dtype, msg=col)
+            self.assertEqual(expanded[col].tolist(), raw[col].tolist(), msg=col)
+
+    def test_int32_only_when_lossless(self):
+        from frame_compaction import compact_frame, expand_frame
+
+        raw = pd.DataFrame({'STOCK': [1.0, 2.0, 2.0 ** 40 + 1], 'QUANTITY': [1.0, 2.5, None],
+                            'AMOUNT': ['7', '8', '9']})
+        compact = compact_frame(raw)
+        self.assertEqual(compact['STOCK'].dtype, 'float64')
+        self.assertEqual(compact['QUANTITY'].dtype, 'float32')
+        self.assertEqual(compact['AMOUNT'].dtype, 'int32')
+
+        expanded = expand_frame(compact)
+        self.assertEqual(expanded['STOCK'].tolist(), raw['STOCK'].tolist())
+        self.assertTrue(expanded['QUANTITY'].equals(raw['QUANTITY']))
+        self.assertEqual(expanded['AMOUNT'].tolist(), [7, 8, 9])
+
+    def test_memory_reduction(self):
+        from frame_compaction import compact_frame, memory_report
+
+        raw = self.odata_sales()
+        report = memory_report(raw, compact_frame(raw))
+        self.assertGreater(report['saved_bytes'], 0)
+        self.assertGreater(report['ratio'], 2)
+
+
+class TestQueryPlanner(unittest.TestCase):
+    SALES = [{'SIM_ROUND': 1, 'AREA': 'North', 'MATERIAL_NUMBER': 'F01', 'NET_VALUE': 10.0, 'STEP': '2'},
+             {'SIM_ROUND': 1, 'AREA': 'South', 'MATERIAL_NUMBER': 'F02', 'NET_VALUE': 20.0, 'STEP': '3'},
+             {'SIM_ROUND': 2, 'AREA': 'North', 'MATERIAL_NUMBER': 'F01', 'NET_VALUE': 30.0, 'STEP': '2'}]
+
+    def test_needs_merged_into_one_request(self):
+        from query_planner import QueryPlanner
+
+        client = FrameClient.from_frames({'Sales': pd.DataFrame(self.SALES)}, record=True)
+        planner = QueryPlanner(client)
+        planner.declare('nord', 'Sales', columns=['MATERIAL_NUMBER', 'NET_VALUE'], filters={'SIM_ROUND': 1, 'AREA': 'North'})
+        planner.declare('zones', 'Sales', columns=['AREA'], filters={'SIM_ROUND': '01'}, top=1)
+        [request] = planner.plan()
+        # Filtre commun (1 == '01') envoyé au serveur, AREA appliqué localement
+        self.assertEqual(request.filters, {'SIM_ROUND': 1})
+        self.assertEqual(request.select, ['MATERIAL_NUMBER', 'NET_VALUE', 'AREA'])
+        self.assertIsNone(request.top)
+
+        results = planner.execute()
+        self.assertEqual(client.requests,
+                         [('Sales', {'SIM_ROUND': 1}, None, None, ['MATERIAL_NUMBER', 'NET_VALUE', 'AREA'])])
+        self.assertEqual(results['nord']['Sales'].to_dict('records'), [{'MATERIAL_NUMBER': 'F01', 'NET_VALUE': 10.0}])
+        self.assertEqual(results['zones']['Sales']['AREA'].tolist(), ['North'])
+
+    def test_residual_filters_are_typed(self):
+        from query_planner import QueryPlanner, merge_needs
+
+        planner = QueryPlanner(FrameClient.from_frames({'Sales': pd.DataFrame(self.SALES)}))
+        planner.declare('valeur', 'Sales', filters={'NET_VALUE': '20'})
+        planner.declare('step', 'Sales', filters={'STEP': 2.0})
+        planner.declare('tout', 'Sales', columns=['AREA'])
+        results = planner.execute()
+        self.assertEqual(results['valeur']['Sales']['MATERIAL_NUMBER'].tolist(), ['F02'])
+        self.assertEqual(results['step']['Sales']['SIM_ROUND'].tolist(), [1, 2])
+        self.assertEqual(len(results['tout']['Sales']), 3)
+
+        self.assertEqual(merge_needs({'Sales': ['A'], 'Market': ['X']}, {'Sales': ['B', 'A'], 'Market': None}),
+                         {'Sales': ['A', 'B'], 'Market': None})
+
+    def test_engine_needs_serve_the_same_bundle(self):
+        from analyzer import ERPSimAnalyzer
+        from snapshot import GameSnapshot, compute_all_recommendations
+        from synthetic_game import SyntheticGame
+
+        game = SyntheticGame(seed=3, sales_per_step=40).advance(12)
+        client = FrameClient(game, record=True)
+        analyzer = ERPSimAnalyzer(client=client)
+        projected = compute_all_recommendations(analyzer)
+
+        # Lectures complètes (hors pages incrémentales des suivis) : une par vue
+        reads = [(view, select) for view, _, _, skip, select in client.requests if skip is None]
+        selects = dict(reads)
+        self.assertEqual(len(selects), len(reads))
+        self.assertNotIn('NET_VALUE', selects['Sales'])
+        self.assertIsNone(selects['Market'])
+
+        full_analyzer = ERPSimAnalyzer(client=FrameClient(game))
+        snapshot = GameSnapshot(full_analyzer.client).prefetch(list(selects))
+        full = compute_all_recommendations(full_analyzer, snapshot)
+        self.assertFalse(projected['pricing'].empty)
+        pd.testing.assert_frame_equal(projected['pricing'], full['pricing'])
+        pd.testing.assert_frame_equal(projected['marketing'], full['marketing'])
+        self.assertEqual(projected['reorder'], full['reorder'])
+        self.assertEqual(projected['finance']['stock_costs']['cash_trap'], full['finance']['stock_costs']['cash_trap'])
+
+        # Une colonne non déclarée repart vers le client
+        bundle_snapshot = analyzer.cache['snapshot']
+        self.assertEqual(bundle_snapshot.fetch_view('Sales', select=['NET_VALUE']).columns.tolist(), ['NET_VALUE'])
+        self.assertEqual(client.requests[-1][-1], ['NET_VALUE'])
+
+    def test_graph_reads_declared_columns_once(self):
+        from analyzer import ERPSimAnalyzer
+        from derived_graph import build_default_graph
+        from synthetic_game import SyntheticGame
+
+        game = SyntheticGame(seed=3, sales_per_step=40).advance(6)
+        client = FrameClient(game, record=True)
+        graph = build_default_graph(ERPSimAnalyzer(client=client))
+        summary = graph.get('sales_summary', step=(1, 6))
+        by_area = graph.get('sales_by_area', step=(1, 6))
+
+        [(_, _, _, _, select)] = [r for r in client.requests if r[0] == 'Sales']
+        # Union des nœuds qui lisent Sales, même ceux pas encore évalués
+        self.assertTrue({'AREA', 'SIM_STEP', 'SIM_ROUND', 'COST'} <= set(select))
+        self.assertNotIn('CURRENCY', select)
+
+        direct = ERPSimAnalyzer(client=FrameClient(game))
+        pd.testing.assert_frame_equal(summary, direct.get_sales_summary())
+        pd.testing.assert_frame_equal(by_area, direct.get_sales_by_area())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from finance_engine import FinanceEngine, RATING_LABELS, rating_index
+
+
+START = {'cash': 1_000_000.0, 'receivables': 500_000.0, 'payables': 200_000.0,
+         'loan': 3_000_000.0, 'profit': 400_000.0, 'net_debt': 1_700_000.0,
+         'credit_rating': 'AA+'}
+
+
+def engine_at(start=START, revenue=100_000.0, cost=60_000.0, commitments=()):
+    engine = FinanceEngine(MagicMock(), client=MagicMock())
+    patch.object(engine, 'analyze_cash_position', return_value=dict(start)).start()
+    patch.object(engine, 'get_daily_sales_baseline', return_value={'revenue': revenue, 'cost': cost}).start()
+    patch.object(engine, 'calculate_stock_costs', return_value={'storage_fees_daily': 0}).start()
+    patch.object(engine, 'get_open_purchase_commitments',
+                 side_effect=lambda horizon, **kw: np.resize(np.r_[commitments, np.zeros(horizon)], horizon)).start()
+    return engine
+
+
+class TestCashProjection(unittest.TestCase):
+    def tearDown(self):
+        patch.stopall()
+
+    def test_roll_forward_collects_and_pays(self):
+        out = FinanceEngine.roll_forward_cash(START, np.zeros((1, 2)), np.zeros((1, 2)), np.zeros((1, 2)),
+                                              np.zeros((1, 2)), annual_interest_rate=0.0)
+        # 1/5 des créances encaissées, 1/5 des dettes fournisseurs payées par jour
+        self.assertAlmostEqual(out['cash'][0, 0], 1_000_000 + 100_000 - 40_000)
+        self.assertAlmostEqual(out['receivables'][0, 1], 500_000 * 0.8 ** 2)
+        self.assertAlmostEqual(out['net_debt'][0, 0], 3_000_000 + 160_000 - 1_060_000 - 400_000)
+
+    def test_payoff_capped_by_loan_and_cash(self):
+        payoff = np.array([[500_000.0, 0.0], [5_000_000.0, 0.0], [0.0, 0.0]])
+        start = dict(START, receivables=0.0, payables=0.0)
+        out = FinanceEngine.roll_forward_cash(start, np.zeros((1, 2)), np.zeros((1, 2)), np.zeros((1, 2)),
+                                              payoff, annual_interest_rate=0.0)
+        self.assertEqual(out['paid_off'][:, 0].tolist(), [500_000.0, 1_000_000.0, 0.0])
+        self.assertEqual(out['cash'][:, 0].tolist(), [500_000.0, 0.0, 1_000_000.0])
+        self.assertTrue((out['cash'] >= 0).all())
+        # Rembourser sur le cash ne change pas la dette nette
+        self.assertTrue(np.allclose(out['net_debt'][:, -1], out['net_debt'][2, -1]))
+
+    def test_project_cash_flow_scenarios(self):
+        engine = engine_at()
+        projection = engine.project_cash_flow(horizon=3, scenarios={
+            'Base': {}, 'Remboursement': {'debt_payoff': 400_000, 'payoff_step': 1}
+        })
+        self.assertEqual(len(projection), 6)
+        by_name = projection.set_index(['SCENARIO', 'STEP'])
+        self.assertEqual(by_name.loc[('Remboursement', 1), 'LOAN'], 3_000_000)
+        self.assertEqual(by_name.loc[('Remboursement', 2), 'LOAN'], 2_600_000)
+        self.assertLess(by_name.loc[('Remboursement', 3), 'INTEREST'], by_name.loc[('Base', 3), 'INTEREST'])
+
+    def test_open_purchase_orders_paid_before_cost_baseline(self):
+        import pandas as pd
+
+        engine = FinanceEngine(MagicMock(), client=MagicMock())
+        engine.analyzer.valuation_tracker.current_step.return_value = (2, 5)
+        engine.client.fetch_view.return_value = pd.DataFrame({
+            'STATUS': ['Delivered', 'Open', 'Open', 'Open'],
+            'NET_VALUE': [999.0, 100.0, 200.0, 50.0],
+            'SIM_ROUND': [2, 1, 2, 2], 'SIM_STEP': [5, 20, 5, 4],
+        })
+        # Livraison à 3 jours : commande du jour -> jour 2, de la veille -> jour 1, round précédent -> jour 0
+        commitments = engine.get_open_purchase_commitments(horizon=5, lead_days=3)
+        self.assertEqual(commitments.tolist(), [100.0, 50.0, 200.0, 0.0, 0.0])
+
+        # Coût des ventes seulement une fois les commandes ouvertes épuisées
+        schedule = FinanceEngine.purchase_schedule(commitments, [60.0, 30.0])
+        self.assertEqual(schedule.tolist(), [[100.0, 50.0, 200.0, 60.0, 60.0], [100.0, 50.0, 200.0, 30.0, 30.0]])
+
+        engine = engine_at(start=dict(START, payables=0.0), commitments=[500_000.0])
+        projection = engine.project_cash_flow(horizon=2).set_index('STEP')
+        # Dettes fournisseurs : commande ouverte le jour 1, coût des ventes le jour 2
+        self.assertEqual(projection.loc[1, 'PAYABLES'], 500_000)
+        self.assertEqual(projection.loc[2, 'PAYABLES'], 500_000 * 0.8 + 60_000)
+
+
+class TestDebtPayoffGrid(unittest.TestCase):
+    def tearDown(self):
+        patch.stopall()
+
+    def test_rating_bounds_inclusive(self):
+        self.assertEqual(RATING_LABELS[rating_index([999_999, 1_000_000, 1_000_001])].tolist(),
+                         ['AAA+', 'AAA+', 'AA+'])
+        self.assertEqual(RATING_LABELS[rating_index(8_000_001)], 'B')
+
+    def test_payoff_moves_loan_rating_not_net_debt(self):
+        engine = engine_at(dict(START, loan=2_300_000.0), revenue=0.0, cost=0.0)
+        result = engine.simulate_debt_payoff_grid(amounts=[0, 300_000, 1_000_000], steps=[0], horizon=5,
+                                                  annual_interest_rate=0.0)
+        grid = result['grid']
+        # Le remboursement pris sur le cash laisse la dette nette inchangée...
+        self.assertTrue(np.allclose(grid['NET_DEBT_AFTER'], grid['NET_DEBT_AFTER'].iloc[0]))
+        # ... mais le rating suit l'emprunt restant
+        self.assertEqual(grid['LOAN_AFTER'].tolist(), [2_300_000.0, 2_000_000.0, 1_300_000.0])
+        self.assertEqual(grid['RATING'].tolist(), ['A', 'AA+', 'AA+'])
+        # Le plancher de liquidité exclut le gros remboursement : l'optimum est le palier AA+ atteignable
+        self.assertEqual(grid['FEASIBLE'].tolist(), [True, True, False])
+        self.assertEqual(result['optimum']['AMOUNT'], 300_000)
+        self.assertEqual(result['optimum']['RATING'], 'AA+')
+
+    def test_payoff_recommendation_targets_next_loan_tier(self):
+        engine = engine_at(dict(START, loan=2_300_000.0))
+        recommendation = engine.get_debt_payoff_recommendation()
+        self.assertEqual((recommendation['target_loan'], recommendation['action']), (2_000_000.0, 'PAYER DETTE'))
+        self.assertEqual(recommendation['amount_to_pay'], 300_000.0)
+
+        # Le paiement ne descend pas sous le plancher de liquidité
+        engine = engine_at(dict(START, cash=1_200_000.0, loan=6_000_000.0))
+        self.assertEqual(engine.get_debt_payoff_recommendation()['amount_to_pay'], 700_000.0)
+
+
+class TestInventoryValuation(unittest.TestCase):
+    def setUp(self):
+        import pandas as pd
+        from frame_client import FrameClient
+
+        self.frames = {
+            # HH-F01 : 30 € pour 10 unités ; HH-F02 jamais vendu en quantité
+            'Sales': pd.DataFrame({'MATERIAL_NUMBER': ['HH-F01', 'HH-F01', 'HH-F02'],
+                                   'COST': ['20.0', '10.0', '5.0'], 'QUANTITY': ['5', '5', '0']}),
+            # Le prix d'achat de HH-F01 est ignoré, le coût de revient des ventes l'emporte
+            'Purchase_Orders': pd.DataFrame({'MATERIAL_NUMBER': ['HH-F01', 'HH-R01', 'HH-R01'],
+                                             'NET_PRICE': ['9.0', '0.5', '0.7']}),
+            'Current_Inventory': pd.DataFrame({'MATERIAL_NUMBER': ['HH-F01', 'HH-R01', 'HH-X99'],
+                                               'STORAGE_LOCATION': ['02', '01', '03'],
+                                               'STOCK': ['1000', '500', '10']}),
+        }
+        self.client = FrameClient.from_frames(self.frames)
+        self.analyzer = MagicMock()
+        self.analyzer.valuation_tracker.current_step.return_value = (1, 1)
+
+    def engine(self):
+        from inventory_valuation import InventoryValuationEngine
+        return InventoryValuationEngine(self.analyzer, client=self.client)
+
+    def test_unit_costs_from_sales_then_purchase_orders(self):
+        import pandas as pd
+
+        costs = self.engine().get_unit_costs().set_index('MATERIAL_NUMBER')
+        self.assertEqual(costs['COST_SOURCE'].to_dict(), {'HH-F01': 'Sales', 'HH-R01': 'Purchase_Orders'})
+        self.assertAlmostEqual(costs.loc['HH-F01', 'UNIT_COST'], 3.0)
+        self.assertAlmostEqual(costs.loc['HH-R01', 'UNIT_COST'], 0.6)
+
+        # Sans prix unitaire, valeur / quantité de la commande
+        self.frames['Purchase_Orders'] = pd.DataFrame({'MATERIAL_NUMBER': ['HH-R01'], 'NET_VALUE': ['100.0'],
+                                                       'QUANTITY': ['200']})
+        self.client.clear()
+        costs = self.engine().get_unit_costs().set_index('MATERIAL_NUMBER')
+        self.assertAlmostEqual(costs.loc['HH-R01', 'UNIT_COST'], 0.5)
+
+    def test_unknown_material_falls_back_to_default_cost(self):
+        from inventory_valuation import DEFAULT_UNIT_COST
+
+        detail = self.engine().value_inventory()['detail'].set_index('MATERIAL_NUMBER')
+        self.assertEqual(detail.loc['HH-X99', ['UNIT_COST', 'COST_SOURCE', 'CATEGORY']].tolist(),
+                         [DEFAULT_UNIT_COST, 'Défaut', 'Autre'])
+        self.assertEqual(detail['CATEGORY'].to_dict()['HH-F01'], 'Produits finis')
+
+    def test_valuation_cached_per_step(self):
+        engine = self.engine()
+        with patch.object(self.client, 'fetch_view', wraps=self.client.fetch_view) as fetch:
+            first = engine.value_inventory()
+            self.assertIs(engine.value_inventory(), first)
+            self.assertEqual(fetch.call_count, 3)
+
+            self.analyzer.valuation_tracker.current_step.return_value = (1, 2)
+            self.assertIsNot(engine.value_inventory(), first)
+            self.assertEqual(fetch.call_count, 6)
+
+    def test_stock_costs_use_material_costs(self):
+        engine = FinanceEngine(self.analyzer, client=self.client)
+        costs = engine.calculate_stock_costs()
+        self.assertEqual(costs['total_units'], 1510)
+        # 1000 x 3 € + 500 x 0,60 € + 10 x 1,38 € (au lieu de 1510 x 1,38 €)
+        self.assertAlmostEqual(costs['cash_trap'], 3313.8)
+        self.assertEqual(costs['storage_fees_daily'], 0)
+
+
+class TestGeneralLedger(unittest.TestCase):
+    def test_incremental_matches_full_read(self):
+        from frame_client import FrameClient
+        from ledger_engine import GeneralLedgerEngine
+        from synthetic_game import SyntheticGame
+
+        game = SyntheticGame(seed=4, sales_per_step=30).advance(3)
+        client = FrameClient(game)
+        streaming = GeneralLedgerEngine(client, page_size=100)
+        streaming.refresh()
+        for _ in range(25):
+            game.advance(1)
+            client.clear()
+            streaming.refresh()
+
+        full = GeneralLedgerEngine(FrameClient(game))
+        full.refresh()
+        self.assertEqual(streaming.get_steps(), full.get_steps())
+        self.assertEqual(streaming.latest_step(), (2, 8))
+        step = streaming.latest_step()
+        for period in ['step', 'round', 'game']:
+            self.assertTrue(streaming.income_statement(*step, period).equals(full.income_statement(*step, period)))
+        self.assertTrue(streaming.balance_sheet(*step).equals(full.balance_sheet(*step)))
+
+        sales = game.view('Sales')
+        self.assertAlmostEqual(full.net_income(*step, period='game'),
+                               sales['NET_VALUE'].sum() - sales['COST'].sum(), places=2)
+
+    def test_late_step_and_new_account(self):
+        import pandas as pd
+        from frame_client import FrameClient
+        from ledger_engine import GeneralLedgerEngine
+
+        def postings(*rows):
+            return pd.DataFrame(rows, columns=['GL_ACCOUNT_NUMBER', 'DEBIT_CREDIT', 'AMOUNT', 'SIM_ROUND', 'SIM_STEP'])
+
+        frames = {'Financial_Postings': postings(('400000', 'H', 100.0, 1, 1), ('110000', 'S', 100.0, 1, 1),
+                                                 ('400000', 'H', 50.0, 1, 3), ('110000', 'S', 50.0, 1, 3))}
+        client = FrameClient.from_frames(frames)
+        ledger = GeneralLedgerEngine(client)
+        ledger.refresh()
+
+        frames['Financial_Postings'] = pd.concat([frames['Financial_Postings'], postings(
+            ('400000', 'H', 20.0, 1, 2), ('100000', 'S', 20.0, 1, 2), ('400000', 'H', 5.0, 1, 3),
+            ('100000', 'S', 5.0, 1, 3))], ignore_index=True)
+        client.clear()
+        self.assertEqual(ledger.refresh(), 4)
+
+        self.assertEqual(ledger.get_steps(), [(1, 1), (1, 2), (1, 3)])
+        self.assertEqual(ledger.net_income(1, 2), 20.0)
+        self.assertEqual(ledger.net_income(1, 3, period='round'), 175.0)
+        balance = ledger.balance_sheet(1, 3).set_index('GL_ACCOUNT')['AMOUNT']
+        self.assertEqual(balance.to_dict(), {'100000': 25.0, '110000': 150.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
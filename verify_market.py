@@ -0,0 +1,191 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from frame_client import FrameClient
+from market_analysis import (DIMENSIONS, NICHE, OPPORTUNITY, STAR, VALUES, WEAK, build_share_cube,
+                             classify_quadrants, share_analysis, share_matrix)
+from market_intelligence import MarketIntelligence
+from product_index import ProductIndex
+
+
+def index_of(*products):
+    index = ProductIndex()
+    index.extend(pd.DataFrame(products, columns=['MATERIAL_NUMBER', 'MATERIAL_DESCRIPTION']))
+    return index
+
+
+class TestShareAnalysis(unittest.TestCase):
+    def segments(self, values, shares, periods=None):
+        n = len(values)
+        return pd.DataFrame({
+            'MATERIAL_NUMBER': [f'P{i}' for i in range(n)],
+            'DISTRIBUTION_CHANNEL': '10', 'AREA': 'North',
+            'PERIOD': periods if periods is not None else [1] * n,
+            'MARKET_VALUE': np.asarray(values, dtype=float), 'MARKET_QUANTITY': 1.0,
+            'MY_VALUE': np.asarray(values, dtype=float) * np.asarray(shares) / 100, 'MY_QUANTITY': 0.0,
+        })
+
+    def test_median_ties_count_as_big_and_strong(self):
+        status = classify_quadrants(np.array([100.0, 100.0, 50.0, 50.0]), np.array([10.0, 5.0, 10.0, 5.0]),
+                                    100.0, 10.0)
+        self.assertEqual(status.tolist(), [STAR, OPPORTUNITY, NICHE, WEAK])
+
+        # Trois segments à la valeur médiane (gros marché), deux à la part médiane (grosse part)
+        analysis = share_analysis(self.segments([100, 100, 100, 40], [20, 10, 20, 30]))
+        self.assertEqual(analysis['STATUS'].tolist(), [STAR, OPPORTUNITY, STAR, NICHE])
+
+    def test_medians_per_period(self):
+        # La période 2 est dix fois plus petite : contre la médiane globale, P0 y serait « Faible »
+        cube = self.segments([1000, 500, 100, 50], [5, 20, 5, 20], periods=[1, 1, 2, 2])
+        cube['MATERIAL_NUMBER'] = ['P0', 'P1', 'P0', 'P1']
+        by_period = share_analysis(cube, by=('MATERIAL_NUMBER', 'PERIOD')).set_index(['MATERIAL_NUMBER', 'PERIOD'])
+        self.assertEqual(by_period['STATUS'].to_dict(), {('P0', 1): OPPORTUNITY, ('P1', 1): NICHE,
+                                                         ('P0', 2): OPPORTUNITY, ('P1', 2): NICHE})
+
+        # Sans PERIOD, les périodes sont cumulées avant la médiane
+        overall = share_analysis(cube).set_index('MATERIAL_NUMBER')
+        self.assertEqual(overall['MARKET_VALUE'].to_dict(), {'P0': 1100.0, 'P1': 550.0})
+        self.assertEqual(overall['STATUS'].to_dict(), {'P0': OPPORTUNITY, 'P1': NICHE})
+
+    def test_cube_rolls_up_to_every_granularity(self):
+        index = index_of(('HH-F01', '500g Raisin Muesli'), ('HH-F02', '1kg Nut Muesli'))
+        market = pd.DataFrame({
+            'MATERIAL_DESCRIPTION': ['500g Raisin Muesli', '500g raisin muesli ', '1kg Nut Muesli',
+                                     '1kg Nut Muesli', 'Inconnu'],
+            'SALES_ORGANIZATION': ['Market', 'Market', 'Market', 'A2', 'Market'],
+            'DISTRIBUTION_CHANNEL': ['10', '12', '10', '10', '10'],
+            'AREA': ['North', 'South', 'North', 'North', 'North'],
+            'SIMULATION_PERIOD': [1, 2, 1, 1, 1],
+            'QUANTITY': [10, 20, 5, 4, 7],
+            'NET_VALUE': [100.0, 180.0, 80.0, 60.0, 70.0],
+        })
+        sales = pd.DataFrame({
+            'MATERIAL_NUMBER': ['HH-F01', 'HH-F01', 'HH-F02'],
+            'DISTRIBUTION_CHANNEL': ['10', '10', '10'], 'AREA': ['North', 'North', 'North'],
+            'SIM_ROUND': [1, 1, 1], 'QUANTITY': [2, 1, 3], 'NET_VALUE': [20.0, 10.0, 48.0],
+        })
+
+        cube = build_share_cube(market, sales, product_index=index)
+        self.assertEqual(list(cube.columns), DIMENSIONS + VALUES)
+        # Agrégat « Market » seul (A2 ignorée), description inconnue écartée
+        self.assertEqual(cube['MARKET_VALUE'].sum(), 360.0)
+        cell = cube.set_index(DIMENSIONS).loc[('HH-F01', '10', 'North', 1)]
+        self.assertEqual((cell['MARKET_VALUE'], cell['MY_VALUE'], cell['MY_QUANTITY']), (100.0, 30.0, 3.0))
+
+        matrix = share_matrix(cube)
+        self.assertEqual(len(matrix), 2 ** len(DIMENSIONS) - 1)
+        for by, analysis in matrix.items():
+            self.assertAlmostEqual(analysis['MARKET_VALUE'].sum(), 360.0, msg=by)
+            self.assertAlmostEqual(analysis['MY_VALUE'].sum(), 78.0, msg=by)
+        by_product = matrix[('MATERIAL_NUMBER',)].set_index('MATERIAL_NUMBER')
+        self.assertEqual(by_product['MARKET_SHARE'].to_dict(), {'HH-F01': 10.7, 'HH-F02': 60.0})
+
+
+class TestMarketIntelligence(unittest.TestCase):
+    PRODUCT = '500g Raisin Muesli'
+
+    def market(self, period, channel, offers):
+        """Lignes Market d'une période : (quantité, prix) par organisation + agrégat"""
+        rows = [{'SALES_ORGANIZATION': org, 'MATERIAL_DESCRIPTION': self.PRODUCT, 'DISTRIBUTION_CHANNEL': channel,
+                 'AREA': 'North', 'SIMULATION_PERIOD': period, 'QUANTITY': q, 'AVERAGE_PRICE': p}
+                for org, (q, p) in offers.items()]
+        quantity = sum(q for q, _ in offers.values())
+        value = sum(q * p for q, p in offers.values())
+        return rows + [dict(rows[0], SALES_ORGANIZATION='Market', QUANTITY=quantity, AVERAGE_PRICE=value / quantity)]
+
+    def period(self, period, ours, a2, b2, c2):
+        stable = {'H2': (25, 10.0), 'A2': (25, 10.0), 'B2': (25, 10.0), 'C2': (25, 10.0)}
+        return (self.market(period, '10', {'H2': (ours, 10.0), 'A2': (30, a2), 'B2': (30, b2), 'C2': (40 - ours, c2)})
+                + self.market(period, '12', stable))
+
+    def test_moves_wars_and_shares(self):
+        frames = {
+            'Market': pd.DataFrame(self.period(1, 30, 10.0, 10.0, 10.0) + self.period(2, 20, 8.5, 10.0, 10.0)),
+            # Nos ventes (quantités différentes) : ignorées, Market détaille H2
+            'Sales': pd.DataFrame([{'SALES_ORGANIZATION': 'H2', 'MATERIAL_DESCRIPTION': self.PRODUCT,
+                                    'DISTRIBUTION_CHANNEL': '10', 'AREA': 'North', 'SIM_ROUND': 1,
+                                    'QUANTITY': 999, 'NET_VALUE': 9990.0}]),
+        }
+        client = FrameClient.from_frames(frames)
+        intelligence = MarketIntelligence(client, page_size=4)
+        self.assertEqual(intelligence.refresh(), 21)
+        self.assertEqual(intelligence.own_org, 'H2')
+
+        # A2 baisse de 15 % : seul mouvement concurrent, guerre pas encore déclarée
+        moves = intelligence.competitor_moves()
+        self.assertEqual(moves[['SALES_ORGANIZATION', 'DISTRIBUTION_CHANNEL', 'MOVE', 'PRICE_CHANGE_PCT']]
+                         .values.tolist(), [['A2', '10', 'CUT', -15.0]])
+        self.assertTrue(intelligence.price_wars().empty)
+
+        # Période 3 : B2 et C2 suivent, le prix du marché baisse deux fois de suite
+        frames['Market'] = pd.concat([frames['Market'], pd.DataFrame(self.period(3, 10, 8.5, 9.0, 9.5))],
+                                     ignore_index=True)
+        client.clear()
+        self.assertEqual(intelligence.refresh(), 10)
+
+        wars = intelligence.price_wars()
+        self.assertEqual(wars['DISTRIBUTION_CHANNEL'].tolist(), ['10'])
+        war = wars.iloc[0]
+        self.assertEqual((war['CUTTERS'], war['CONSECUTIVE_DROPS']), (2, 2))
+        self.assertAlmostEqual(war['AVG_CUT_PCT'], -7.5)
+
+        # Notre part passe de 30 % à 10 % sur le canal 10, stable sur le canal 12
+        trends = intelligence.share_trends().set_index('DISTRIBUTION_CHANNEL')
+        self.assertEqual(trends.loc['10', ['SHARE_START', 'SHARE', 'TREND']].tolist(), [30.0, 10.0, -10.0])
+        self.assertEqual(trends.loc['12', 'TREND'], 0.0)
+
+
+class TestProductIndex(unittest.TestCase):
+    def test_lookup_normalizes_and_parses(self):
+        index = index_of(('HH-F01', '500g Raisin Muesli'), ('HH-F02', '1kg Nut Muesli'), ('HH-F03', 'Granola'))
+        self.assertEqual(index.lookup(['  1KG  nut MUESLI ', '500g Raisin Muesli', 'Inconnu', '1kg Nut']).tolist(),
+                         ['HH-F02', 'HH-F01', None, None])
+        self.assertEqual(index.lookup([' hh-f01', 'HH-F02', 'HH-F99'], by='number', field='SIZE').tolist(),
+                         ['500g', '1kg', None])
+        self.assertEqual(index.lookup(['HH-F01', 'HH-F03'], by='number', field='FLAVOR').tolist(),
+                         ['Raisin', 'Granola'])
+        self.assertEqual(index.lookup(['hh-f03'], by='number', field='CODE').tolist(), ['F03'])
+        # Un numéro déjà connu n'est pas réindexé
+        self.assertEqual(index.extend(pd.DataFrame({'MATERIAL_NUMBER': ['HH-F01'],
+                                                    'MATERIAL_DESCRIPTION': ['Autre']})), 0)
+
+    def test_extended_each_step_and_reset_on_new_game(self):
+        from analyzer import ERPSimAnalyzer
+
+        def valuation(*steps):
+            return pd.DataFrame([{'SIM_ROUND': r, 'SIM_STEP': s, 'COMPANY_VALUATION': 1.0} for r, s in steps])
+
+        def pricing(*products):
+            return pd.DataFrame(products, columns=['MATERIAL_NUMBER', 'MATERIAL_DESCRIPTION'])
+
+        frames = {'Company_Valuation': valuation((1, 1)),
+                  'Current_Pricing_Conditions': pricing(('HH-F01', '500g Raisin Muesli'))}
+        client = FrameClient.from_frames(frames)
+        analyzer = ERPSimAnalyzer(client=client)
+
+        analyzer.get_step_key()
+        self.assertEqual(len(analyzer.get_product_index()), 1)
+
+        # Nouveau produit au step suivant : ajouté sans reconstruire l'index
+        frames['Company_Valuation'] = valuation((1, 1), (1, 2))
+        frames['Current_Pricing_Conditions'] = pricing(('HH-F01', '500g Raisin Muesli'), ('HH-F02', '1kg Nut Muesli'))
+        client.clear()
+        analyzer.get_step_key()
+        self.assertEqual(analyzer.get_product_index().lookup(['1kg nut muesli']).tolist(), ['HH-F02'])
+
+        # Nouvelle partie : la vue repart de zéro, détectée sans reset manuel ;
+        # les produits de l'ancienne partie disparaissent
+        frames['Company_Valuation'] = valuation((1, 1))
+        frames['Current_Pricing_Conditions'] = pricing(('JJ-F01', '500g Raisin Muesli'))
+        client.clear()
+        self.assertEqual(analyzer.get_step_key(), (1, 1))
+        index = analyzer.get_product_index()
+        self.assertEqual(index.lookup(['500g Raisin Muesli']).tolist(), ['JJ-F01'])
+        self.assertEqual(len(index), 1)
+        self.assertEqual(analyzer.valuation_tracker.series[['SIM_ROUND', 'SIM_STEP']].values.tolist(), [[1, 1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
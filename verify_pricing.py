@@ -51,7 +51,7 @@ class TestPricing(unittest.TestCase):
         game_rules = pd.DataFrame({'SIMULATION_PERIOD': [1]})
 
         # Configure side_effect for fetch_view
-        def side_effect(view_name, top=None):
+        def side_effect(view_name, top=None, **kwargs):
             if view_name == "Market": return market_data
             if view_name == "Current_Pricing_Conditions": return my_prices
             if view_name == "Current_Inventory": return inventory
@@ -85,5 +85,46 @@ class TestPricing(unittest.TestCase):
         # P7 (0 sales) should be excluded
         self.assertNotIn('P7', recommendations['Produit'].values)
 
+
+class TestBacktester(unittest.TestCase):
+    def history(self):
+        from backtester import GameHistory
+        import numpy as np
+
+        # Un produit, un canal : 10 unités par step à 100 contre un marché à 80,
+        # stock de fin de step enregistré 5, 0, 0 -> 30 unités disponibles au total
+        steps = [(1, 1), (1, 2), (1, 3)]
+        ones = np.ones((3, 1))
+        return GameHistory(steps, [('M1', '10')], ['M1'], quantity=10 * ones, revenue=1000 * ones,
+                           cost=500 * ones, price=100 * ones, market=80 * ones,
+                           stock=np.array([[5.0], [0.0], [0.0]]), valuation=np.array([1e6, 1e6, 1e6]))
+
+    def test_recorded_prices_replay_recorded_sales(self):
+        from backtester import simulate
+
+        result = simulate(self.history(), top_n=0)
+        self.assertEqual((result['UNITS'], result['LOST_UNITS'], result['PRICE_CHANGES']), (30, 0, 0))
+        self.assertEqual(result['PROFIT'], 1500.0)
+
+    def test_price_changes_follow_rules_and_sales_capped_by_stock(self):
+        import backtester
+        from sales_engine import PRICING_RULES, decide_price_action
+
+        rules = dict(PRICING_RULES, LOW_VELOCITY=1000, UNDERCUT=0.9)
+        with patch.object(backtester, 'decide_price_action', wraps=decide_price_action) as decide:
+            result = backtester.simulate(self.history(), rules)
+
+        calls = [c.args for c in decide.call_args_list]
+        # Prix au-dessus du marché, ventes faibles -> baisse à 72 ; puis prix
+        # bas et stock en rupture -> remontée à mi-chemin du marché
+        self.assertEqual(calls[0][:4], (100.0, 80.0, 10.0, 5.0))
+        self.assertEqual(calls[1][:2], (72.0, 80.0))
+        self.assertEqual([decide_price_action(*c)[0] for c in calls], ['DECREASE', 'INCREASE'])
+        self.assertEqual(result['PRICE_CHANGES'], 2)
+
+        # La baisse de prix gonfle la demande, mais on ne vend pas plus que le stock
+        self.assertEqual(result['UNITS'], 30)
+        self.assertGreater(result['LOST_UNITS'], 0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,164 @@
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from config import settings
+from synthetic_game import SyntheticGame
+import odata_standin
+
+
+class TestODataStandIn(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.game = SyntheticGame(seed=7, sales_per_step=40).advance(25)
+        cls.server, cls.state = odata_standin.serve(0, game=cls.game)
+        cls.url = odata_standin.base_url(cls.server)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def client(self):
+        from odata_client import ODataClient
+        with patch.object(settings, 'ODATA_BASE_URL', self.url):
+            client = ODataClient(use_service=False)
+        self.addCleanup(client.session.close)
+        return client
+
+    def test_same_seed_same_game(self):
+        other = SyntheticGame(seed=7, sales_per_step=40).advance(25)
+        self.assertTrue(other.view('Sales').equals(self.game.view('Sales')))
+        self.assertEqual((self.game.sim_round, self.game.sim_step), (2, 5))
+
+    def test_odata_paging_and_filters(self):
+        client = self.client()
+        sales = self.game.view('Sales')
+
+        page = client.fetch_view('Sales', top=10, skip=5)
+        self.assertEqual(page['ID'].tolist(), sales['ID'].iloc[5:15].tolist())
+        self.assertIn('__metadata', page.columns)
+        self.assertEqual(page['NET_VALUE'].iloc[0], f"{sales['NET_VALUE'].iloc[5]:.2f}")
+
+        filtered = client.fetch_view('Sales', filters={'DISTRIBUTION_CHANNEL': '12', 'SIM_ROUND': 2},
+                                     select=['ID', 'DISTRIBUTION_CHANNEL'])
+        expected = sales[(sales['DISTRIBUTION_CHANNEL'] == '12') & (sales['SIM_ROUND'] == 2)]
+        self.assertEqual(filtered['ID'].tolist(), expected['ID'].tolist())
+
+        pages = list(client.iter_pages('Company_Valuation', page_size=10))
+        self.assertEqual(sum(len(p) for p in pages), 25)
+
+    def test_analyzer_end_to_end(self):
+        from analyzer import ERPSimAnalyzer
+
+        with patch.object(settings, 'ODATA_BASE_URL', self.url):
+            analyzer = ERPSimAnalyzer()
+        self.addCleanup(analyzer.client.session.close)
+        summary = analyzer.get_sales_summary()
+        self.assertAlmostEqual(summary['NET_VALUE'].sum(), self.game.view('Sales')['NET_VALUE'].sum(), places=2)
+
+
+class TestSyntheticMarket(unittest.TestCase):
+    def test_competitors_priced_on_their_own(self):
+        from frame_client import FrameClient
+        from market_intelligence import MarketIntelligence
+
+        game = SyntheticGame(seed=42, sales_per_step=50).advance(60)
+        market = game.view('Market')
+        self.assertNotIn('MATERIAL_NUMBER', market.columns)
+        self.assertEqual(sorted(market['SALES_ORGANIZATION'].unique()), ['A2', 'B2', 'C2', 'H2', 'Market'])
+
+        # L'agrégat « Market » est la somme des organisations
+        by_org = market.pivot_table(index=['SIM_ROUND', 'SIM_STEP', 'MATERIAL_DESCRIPTION', 'DISTRIBUTION_CHANNEL', 'AREA'],
+                                    columns='SALES_ORGANIZATION', values='QUANTITY', aggfunc='sum')
+        self.assertTrue((by_org.drop(columns='Market').sum(axis=1) == by_org['Market']).all())
+        prices = market[market['SIMULATION_PERIOD'] == 3].groupby('SALES_ORGANIZATION')['AVERAGE_PRICE'].mean()
+        self.assertGreater(prices[['A2', 'B2', 'C2']].nunique(), 1)
+
+        # Nos lignes Market reprennent nos ventes
+        ours = market[market['SALES_ORGANIZATION'] == 'H2']['NET_VALUE'].sum()
+        self.assertAlmostEqual(ours, game.view('Sales')['NET_VALUE'].sum(), delta=ours * 1e-3)
+
+        intelligence = MarketIntelligence(FrameClient(game))
+        intelligence.refresh()
+        self.assertEqual(intelligence.own_org, 'H2')
+        moves = intelligence.competitor_moves()
+        self.assertFalse(moves.empty)
+        self.assertFalse(moves['SALES_ORGANIZATION'].isin(['H2', 'Market']).any())
+        self.assertFalse(intelligence.price_wars().empty)
+
+
+class TestReplay(unittest.TestCase):
+    def test_record_then_replay(self):
+        import replay
+        from odata_client import ODataClient
+
+        game = SyntheticGame(seed=11, sales_per_step=20)
+        server, state = odata_standin.serve(0, game=game)
+        directory = tempfile.mkdtemp()
+        expected = []
+        try:
+            with patch.object(settings, 'ODATA_BASE_URL', odata_standin.base_url(server)):
+                recorder = replay.ReplayRecorder(directory, page_size=50)
+                self.addCleanup(recorder.client.session.close)
+                for _ in range(3):
+                    state.advance(1)
+                    self.assertIsNotNone(recorder.poll())
+                    expected.append(game.view('Sales')['ID'].tolist())
+                self.assertIsNone(recorder.poll())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        with patch.object(settings, 'REPLAY_DIR', directory), patch.object(settings, 'REPLAY_SPEED', 0):
+            client = ODataClient()
+        self.addCleanup(client.session.close)
+        for ids in expected:
+            self.assertEqual(client.fetch_view('Sales')['ID'].tolist(), ids)
+            client.service.advance()
+        self.assertEqual(client.service.current_step(), (1, 3))
+
+
+class TestSalesAnomalies(unittest.TestCase):
+    def test_stockout_flagged_from_new_rows_only(self):
+        import numpy as np
+        import pandas as pd
+        from anomaly_detector import SalesAnomalyDetector, DROP
+        from frame_client import FrameClient
+
+        feed, rng = FrameClient.from_frames({'Sales': pd.DataFrame()}, record=True), np.random.default_rng(0)
+        detector = SalesAnomalyDetector(feed)
+        alerts = []
+        detector.on_alert(alerts.append)
+        for step in range(1, 31):
+            quantities = [0 if step >= 25 else rng.normal(100, 5), rng.normal(50, 3)]
+            feed.frames['Sales'] = pd.concat([feed.frames['Sales'], pd.DataFrame({
+                'SIM_ROUND': 1, 'SIM_STEP': step, 'MATERIAL_NUMBER': ['F01', 'F02'],
+                'DISTRIBUTION_CHANNEL': '10', 'AREA': 'North', 'QUANTITY': quantities})], ignore_index=True)
+            feed.clear()
+            self.assertEqual(detector.refresh(), 2)
+        detector.flush()
+
+        self.assertEqual(feed.requests[-1][3], len(feed.frames['Sales']) - 2)
+        self.assertEqual(detector.steps_seen, 30)
+        strongest = detector.alerts.loc[detector.alerts['ZSCORE'].idxmin()]
+        self.assertEqual([strongest['MATERIAL_NUMBER'], strongest['SIM_STEP'], strongest['KIND']], ['F01', 25, DROP])
+        self.assertTrue(alerts)
+
+    def test_stationary_game_stays_quiet(self):
+        from frame_client import FrameClient
+        from anomaly_detector import SalesAnomalyDetector
+
+        # Ventes par commandes (Poisson surdispersé), sans rupture ni dérive voulue
+        game = SyntheticGame(seed=5, sales_per_step=300).advance(60)
+        detector = SalesAnomalyDetector(FrameClient(game))
+        detector.refresh()
+        detector.flush()
+
+        self.assertEqual(detector.steps_seen, 60)
+        self.assertGreater(len(detector.state), 100)
+        self.assertLessEqual(len(detector.alerts), len(detector.state) // 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+import pandas as pd
+
+from frame_client import FrameClient
+
+
+def feed_client(**views):
+    """Vues construites à la main, qui grandissent entre deux refresh"""
+    return FrameClient.from_frames({name: pd.DataFrame(rows) for name, rows in views.items()}, record=True)
+
+
+def append(client, view_name: str, rows):
+    client.frames[view_name] = pd.concat([client.frames.get(view_name), pd.DataFrame(rows)], ignore_index=True)
+    client.clear()
+
+
+def skips(client):
+    return [(view_name, skip or 0) for view_name, _, _, skip, _ in client.requests]
+
+
+class TestValuationTracker(unittest.TestCase):
+    def row(self, sim_round, sim_step, valuation, rating='AA+'):
+        return {'SIM_ROUND': sim_round, 'SIM_STEP': sim_step, 'COMPANY_VALUATION': valuation,
+                'BANK_CASH_ACCOUNT': 100.0, 'BANK_LOAN': 50.0, 'PROFIT': 10.0, 'CREDIT_RATING': rating}
+
+    def test_incremental_append_and_dedup(self):
+        from valuation_tracker import ValuationTracker
+
+        client = feed_client(Company_Valuation=[self.row(1, 1, 1000.0), self.row(1, 2, 1100.0)])
+        tracker = ValuationTracker(client, page_size=2)
+        self.assertEqual(tracker.refresh(), 2)
+        self.assertEqual(tracker.current_step(), (1, 2))
+
+        # Une nouvelle ligne pour le step 2 remplace l'ancienne, le step 3 s'ajoute
+        append(client, 'Company_Valuation', [self.row(1, 2, 1150.0), self.row(1, 3, 1200.0, rating=None)])
+        self.assertEqual(tracker.refresh(), 2)
+        # La dernière ligne déjà lue est relue pour détecter une nouvelle partie
+        self.assertEqual(skips(client)[-2:], [('Company_Valuation', 1), ('Company_Valuation', 3)])
+        self.assertEqual(tracker.series['COMPANY_VALUATION'].tolist(), [1000.0, 1150.0, 1200.0])
+        self.assertEqual(tracker.deltas()['COMPANY_VALUATION'], 50.0)
+        self.assertNotIn('CREDIT_RATING', tracker.latest())
+        self.assertEqual(tracker.refresh(), 0)
+
+    def test_restart_detected_when_view_shrinks_or_changes(self):
+        from valuation_tracker import ValuationTracker
+
+        client = feed_client(Company_Valuation=[self.row(1, 1, 1000.0), self.row(1, 2, 1100.0)])
+        tracker = ValuationTracker(client)
+        tracker.refresh()
+
+        # Vue plus courte : nouvelle partie, la série n'est pas mélangée
+        client.frames['Company_Valuation'] = pd.DataFrame([self.row(1, 1, 1000.0)])
+        client.clear()
+        self.assertEqual(tracker.refresh(), 0)
+        self.assertTrue(tracker.restarted)
+        self.assertEqual(tracker.current_step(), (1, 2))
+
+        tracker.reset()
+        self.assertEqual(tracker.refresh(), 1)
+        self.assertFalse(tracker.restarted)
+
+        # Même longueur mais la dernière ligne lue a changé
+        client.frames['Company_Valuation'] = pd.DataFrame([self.row(1, 1, 900.0), self.row(1, 2, 950.0)])
+        client.clear()
+        tracker.refresh()
+        self.assertTrue(tracker.restarted)
+
+    def test_analyzer_resets_every_tracker_on_new_game(self):
+        from unittest.mock import patch
+        from analyzer import ERPSimAnalyzer
+
+        client = feed_client(Company_Valuation=[self.row(1, 1, 1000.0), self.row(1, 2, 1100.0)])
+        analyzer = ERPSimAnalyzer(client=client)
+        self.assertEqual(analyzer.get_step_key(), (1, 2))
+
+        trackers = [analyzer.valuation_tracker, analyzer.ledger, analyzer.market_intelligence,
+                    analyzer.anomaly_detector, analyzer.product_index]
+        resets = [patch.object(t, 'reset', wraps=t.reset).start() for t in trackers]
+        self.addCleanup(patch.stopall)
+
+        client.frames['Company_Valuation'] = pd.DataFrame([self.row(1, 1, 500.0)])
+        client.clear()
+        self.assertEqual(analyzer.get_step_key(), (1, 1))
+        self.assertEqual([r.call_count for r in resets], [1] * len(trackers))
+        self.assertFalse(analyzer.valuation_tracker.restarted)
+
+    def test_missing_rating_keeps_finance_label(self):
+        from unittest.mock import MagicMock
+        from finance_engine import FinanceEngine
+        from valuation_tracker import ValuationTracker
+
+        rows = [{k: v for k, v in self.row(1, 1, 1000.0).items() if k != 'CREDIT_RATING'}]
+        analyzer = MagicMock()
+        analyzer.valuation_tracker = ValuationTracker(feed_client(Company_Valuation=rows))
+        engine = FinanceEngine(analyzer, client=MagicMock())
+        self.assertEqual(engine.analyze_cash_position()['credit_rating'], 'Unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()